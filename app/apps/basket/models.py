@@ -1,39 +1,77 @@
 """Basket models."""
 
+import asyncio
+import logging
 from decimal import Decimal
+from typing import ClassVar
 
+from beanie import Insert, Replace, Save, SaveChanges, before_event
+from fastapi_mongo_base.errors import BadRequestError
 from fastapi_mongo_base.models import TenantUserEntity
 from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+from apps.product.models import Product, ProductSnapshot
+from utils.exchange import exchange_rates
+from utils.pagination import keyset_index
 
 from .schemas import (
     BasketDataSchema,
     BasketDetailSchema,
     BasketItemChangeSchema,
     BasketItemSchema,
+    BasketLineSchema,
 )
 
 
+class MissingSnapshotError(BadRequestError):
+    """Raised when checking out a line whose product snapshot is gone."""
+
+    error_code = "missing_snapshot"
+    message_en = "Some basket items are no longer available"
+    message_fa = "برخی از اقلام سبد خرید دیگر در دسترس نیستند"
+
+
 class Basket(BasketDataSchema, TenantUserEntity):
     """Basket model."""
 
-    items: dict[str, BasketItemSchema] = Field(default_factory=dict)
+    items: dict[str, BasketLineSchema] = Field(default_factory=dict)
+    # Denormalized item keys, multikey-indexed to find baskets by product
+    product_uids: list[str] = Field(default_factory=list)
+    # SaaS enrollment uid per line, so a retry only sends the lines that failed
+    enrollment_ids: dict[str, str] = Field(default_factory=dict)
+
+    class Settings(TenantUserEntity.Settings):
+        """Beanie settings with keyset pagination and product lookup indexes."""
+
+        indexes: ClassVar[list[IndexModel]] = [
+            *TenantUserEntity.Settings.indexes,
+            keyset_index(),
+            IndexModel([
+                ("tenant_id", ASCENDING),
+                ("product_uids", ASCENDING),
+                ("status", ASCENDING),
+            ]),
+        ]
+
+    @before_event([Insert, Replace, Save, SaveChanges])
+    def sync_product_uids(self) -> None:
+        """Keep the product index in step with the items."""
+        self.product_uids = list(self.items)
 
     @property
     def subtotal(self) -> Decimal:
-        """Calculate subtotal."""
-        total = Decimal(
-            sum(
-                item.price * item.exchange_fee(self.currency)
-                for item in self.items.values()
-            )
+        """Calculate subtotal in the basket currency from cached rates."""
+        return exchange_rates.table.convert_total(
+            ((item.price, item.currency) for item in self.items.values()),
+            self.currency,
         )
-        return total
 
     @property
     def amount(self) -> Decimal:
-        """Calculate amount after discount."""
+        """Calculate amount after discount, never below zero."""
         if self.discount:
-            return self.subtotal - self.discount.discount
+            return max(self.subtotal - self.discount.discount, Decimal(0))
         return self.subtotal
 
     @property
@@ -42,7 +80,7 @@ class Basket(BasketDataSchema, TenantUserEntity):
         return f"basket id = {self.uid} - total price = {self.subtotal}"
 
     async def add_basket_item(
-        self, item: BasketItemSchema, exclusive: bool = False
+        self, item: BasketLineSchema, exclusive: bool = False
     ) -> None:
         """Add item to basket."""
         item_dict = item.model_dump(exclude=["uid", "quantity"])
@@ -63,7 +101,7 @@ class Basket(BasketDataSchema, TenantUserEntity):
         self, item_id: str, data: BasketItemChangeSchema, **kwargs: object
     ) -> None:
         """Update basket item."""
-        basket_item: BasketItemSchema | None = self.items.get(item_id)
+        basket_item: BasketLineSchema | None = self.items.get(item_id)
 
         if basket_item is None:
             if kwargs.get("raise_error"):
@@ -85,14 +123,74 @@ class Basket(BasketDataSchema, TenantUserEntity):
         self.items.pop(item_id, None)
         await self.save()
 
-    @property
-    def detail(self) -> BasketDetailSchema:
-        """Basket detail."""
-        return BasketDetailSchema.model_validate(
-            self.model_dump(exclude={"items"})
-            | {
-                "items": list(self.items.values()),
-                "amount": self.amount,
-                "subtotal": self.subtotal,
+    async def record_enrollments(self, enrollment_ids: dict[str, str]) -> None:
+        """Record the enrollments created for some lines."""
+        self.enrollment_ids |= enrollment_ids
+        await Basket.find_one({"uid": self.uid}).update({
+            "$set": {
+                f"enrollment_ids.{line}": uid for line, uid in enrollment_ids.items()
             }
+        })
+
+    async def _snapshot_legacy_lines(self) -> None:
+        """Snapshot the products of lines stored before snapshots, once."""
+        legacy = {key: line for key, line in self.items.items() if not line.snapshot_id}
+        if not legacy:
+            return
+        products = await Product.find({
+            "uid": {"$in": [line.uid for line in legacy.values()]}
+        }).to_list()
+        snapshots = await asyncio.gather(*[
+            ProductSnapshot.from_product(product) for product in products
+        ])
+        snapshot_ids = {snap.product_uid: snap.uid for snap in snapshots}
+        changes = {}
+        for key, line in legacy.items():
+            if snapshot_id := snapshot_ids.get(line.uid):
+                line.snapshot_id = snapshot_id
+                changes[f"items.{key}.snapshot_id"] = snapshot_id
+        if changes:
+            # Only lines still without a snapshot, so a concurrent reprice wins.
+            await Basket.find_one({"uid": self.uid} | dict.fromkeys(changes)).update({
+                "$set": changes
+            })
+
+    async def get_items(self, *, strict: bool = False) -> dict[str, BasketItemSchema]:
+        """
+        Basket lines hydrated with their product snapshots.
+
+        A line whose snapshot is gone, e.g. a legacy line of a deleted
+        product, keeps its stored price and is flagged unavailable, unless
+        ``strict`` asks for a MissingSnapshotError instead.
+        """
+        await self._snapshot_legacy_lines()
+        snapshots = await ProductSnapshot.get_many(
+            line.snapshot_id for line in self.items.values() if line.snapshot_id
+        )
+        if missing := [
+            key for key, line in self.items.items() if line.snapshot_id not in snapshots
+        ]:
+            logging.warning("Basket %s lines without snapshot: %s", self.uid, missing)
+            if strict:
+                raise MissingSnapshotError(detail=", ".join(missing))
+        return {
+            key: BasketItemSchema.hydrate(line, snapshots[line.snapshot_id])
+            if line.snapshot_id in snapshots
+            else BasketItemSchema.unavailable(line)
+            for key, line in self.items.items()
+        }
+
+    async def get_detail(self) -> BasketDetailSchema:
+        """
+        Basket detail with hydrated items.
+
+        Built from the already validated fields, so the response is only
+        serialized once instead of being dumped and validated first.
+        """
+        items = await self.get_items()
+        return BasketDetailSchema.model_construct(
+            **{name: getattr(self, name) for name in BasketDataSchema.model_fields},
+            items=list(items.values()),
+            amount=self.amount,
+            subtotal=self.subtotal,
         )
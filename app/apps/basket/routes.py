@@ -1,20 +1,33 @@
 """Basket routes."""
 
+import asyncio
 import logging
 
-from fastapi import Query, Request
+from fastapi import Query, Request, Response
 from fastapi.responses import RedirectResponse
 from fastapi_mongo_base.errors import BadRequestError, BaseHTTPException
 from fastapi_mongo_base.schemas import PaginatedResponse
 from fastapi_mongo_base.utils import usso_routes
 
 from server.config import Settings
+from utils.export import ExportMixin
+from utils.fields import parse_fields, sparse_response
+from utils.pagination import (
+    CursorPaginatedResponse,
+    CursorPaginationMixin,
+    PaginationMode,
+    check_sort_field,
+    list_cursor,
+    sparse_page,
+)
 from utils.schemas import RedirectUrlSchema
 from utils.texttools import add_query_params
+from utils.usso import USSOUserMixin
 
 from .models import Basket
 from .schemas import (
     BasketCreateSchema,
+    BasketDataSchema,
     BasketDetailSchema,
     BasketItemChangeSchema,
     BasketItemCreateSchema,
@@ -29,7 +42,12 @@ from .services import (
 )
 
 
-class BasketRouter(usso_routes.AbstractTenantUSSORouter):
+class BasketRouter(
+    USSOUserMixin,
+    ExportMixin,
+    CursorPaginationMixin,
+    usso_routes.AbstractTenantUSSORouter,
+):
     """Basket router."""
 
     model = Basket
@@ -121,7 +139,7 @@ class BasketRouter(usso_routes.AbstractTenantUSSORouter):
         """Retrieve basket item."""
         basket: Basket = await super().retrieve_item(request, uid)
 
-        return basket.detail
+        return await basket.get_detail()
 
     async def list_items(
         self,
@@ -131,9 +149,56 @@ class BasketRouter(usso_routes.AbstractTenantUSSORouter):
         status: BasketStatusEnum | None = None,
         sort_field: str = "created_at",
         sort_direction: int = -1,
-    ) -> PaginatedResponse[BasketDetailSchema]:
-        """List basket items."""
+        pagination: PaginationMode = PaginationMode.offset,
+        cursor: str | None = None,
+        with_total: bool = False,
+        fields: str | None = Query(None, description="Comma separated fields"),
+    ) -> PaginatedResponse[BasketDetailSchema] | Response:
+        """
+        List basket items.
+
+        With ``fields`` naming only stored basket fields, Mongo returns just
+        those; hydrated fields (items, amounts) still need the full basket.
+        """
+        check_sort_field(Basket, sort_field)
         user = await self.get_user(request)
+        query = Basket.get_queryset(
+            user_id=user.user_id, tenant_id=user.tenant_id, status=status
+        )
+        names = parse_fields(fields, BasketDetailSchema)
+        if names and names <= BasketDataSchema.model_fields.keys():
+            return await sparse_page(
+                Basket,
+                query,
+                BasketDetailSchema,
+                names,
+                offset=offset,
+                limit=limit,
+                pagination=pagination,
+                cursor=cursor,
+                sort_field=sort_field,
+                sort_direction=sort_direction,
+                with_total=with_total,
+            )
+
+        if pagination == PaginationMode.cursor or cursor:
+            items, next_cursor, total = await list_cursor(
+                Basket,
+                query,
+                cursor=cursor,
+                limit=limit,
+                sort_field=sort_field,
+                sort_direction=sort_direction,
+                with_total=with_total,
+            )
+            page = CursorPaginatedResponse(
+                items=await asyncio.gather(*[basket.get_detail() for basket in items]),
+                total=total,
+                limit=limit,
+                next_cursor=next_cursor,
+            )
+            return sparse_response(page, names) if names else page
+
         items, total = await Basket.list_total_combined(
             user_id=user.user_id,
             tenant_id=user.tenant_id,
@@ -144,11 +209,14 @@ class BasketRouter(usso_routes.AbstractTenantUSSORouter):
             sort_direction=sort_direction,
         )
 
-        items_in_schema = [basket.detail for basket in items]
+        items_in_schema = await asyncio.gather(*[
+            basket.get_detail() for basket in items
+        ])
 
-        return PaginatedResponse(
+        page = PaginatedResponse(
             items=items_in_schema, offset=offset, limit=limit, total=total
         )
+        return sparse_response(page, names) if names else page
 
     async def create_item(
         self, request: Request, data: BasketCreateSchema
@@ -167,7 +235,7 @@ class BasketRouter(usso_routes.AbstractTenantUSSORouter):
             "user_id": data.user_id or user.user_id,
             **data.model_dump(exclude=["user_id"]),
         })
-        return basket.detail
+        return await basket.get_detail()
 
     async def update_item(
         self, request: Request, uid: str, data: BasketUpdateSchema
@@ -178,14 +246,14 @@ class BasketRouter(usso_routes.AbstractTenantUSSORouter):
         )
         basket = await apply_discount(basket, data.voucher)
 
-        return basket.detail
+        return await basket.get_detail()
 
     async def delete_item(self, request: Request, uid: str) -> BasketDetailSchema:
         """Delete basket item."""
         basket: Basket = await super(
             usso_routes.AbstractTenantUSSORouter, self
         ).delete_item(request, uid)
-        return basket.detail
+        return await basket.get_detail()
 
     async def purchasse_exclusive_item(
         self,
@@ -245,7 +313,7 @@ class BasketRouter(usso_routes.AbstractTenantUSSORouter):
                 },
             )
         await basket.add_basket_item(await data.get_basket_item(), exclusive=exclusive)
-        return basket.detail
+        return await basket.get_detail()
 
     async def update_basket_item(
         self,
@@ -269,7 +337,7 @@ class BasketRouter(usso_routes.AbstractTenantUSSORouter):
                 },
             )
         await basket.update_basket_item(item_uid, data)
-        return basket.detail
+        return await basket.get_detail()
 
     async def delete_basket_item(
         self, request: Request, uid: str, item_uid: str
@@ -282,7 +350,7 @@ class BasketRouter(usso_routes.AbstractTenantUSSORouter):
         if not basket.is_modifiable:
             raise BaseHTTPException(400, "Basket is not active")
         await basket.delete_basket_item(item_uid)
-        return basket.detail
+        return await basket.get_detail()
 
     async def checkout_url(
         self,
@@ -9,10 +9,11 @@ from fastapi_mongo_base.schemas import TenantUserEntitySchema
 from fastapi_mongo_base.utils.bsontools import decimal_amount
 from pydantic import BaseModel, Field, field_validator, model_validator
 
-from apps.product.models import Product
+from apps.product.models import Product, ProductSnapshot
 from apps.product.schemas import ItemType
 from server.config import Settings
 from utils.currency import Currency
+from utils.exchange import exchange_rates
 
 
 class DiscountSchema(BaseModel):
@@ -48,40 +49,28 @@ class BasketItemCreateSchema(BaseModel):
         """Validate quantity."""
         return decimal_amount(value)
 
-    async def get_basket_item(self) -> Self:
-        """Get basket item from product."""
+    async def get_basket_item(self) -> "BasketLineSchema":
+        """Get a basket line priced from the product's current snapshot."""
         product = await Product.get_by_uid(self.uid)
         if product is None:
             raise ValueError
-        return BasketItemSchema.model_validate(product.model_dump())
+        snapshot = await ProductSnapshot.from_product(product)
+        return BasketLineSchema(
+            uid=product.uid,
+            snapshot_id=snapshot.uid,
+            unit_price=snapshot.unit_price,
+            currency=snapshot.currency,
+            quantity=self.quantity,
+        )
 
 
-class BasketItemSchema(BasketItemCreateSchema):
-    """Basket item schema."""
+class BasketLineSchema(BasketItemCreateSchema):
+    """Stored basket line referencing an immutable product snapshot."""
 
-    name: str
-    description: str | None = None
+    snapshot_id: str | None = None
     unit_price: Decimal
-    currency: str = Settings.currency
-    quantity: Decimal = Decimal(1)
-
-    # Item type to distinguish between SaaS and e-commerce
-    item_type: ItemType = ItemType.saas_package  # Default to e-commerce product
-
-    revenue_share_id: str | None = None
-    tax_id: str | None = None
-    merchant: str | None = None
-
     discount: DiscountSchema | None = None
 
-    # SaaS-specific fields
-    plan_duration: int | None = None  # Only for SaaS packages
-    bundles: list | None = None  # Optional field for SaaS packages
-    variant: dict[str, str] | None = None
-
-    # Optional additional data field for future extensions or custom data
-    meta_data: dict | None = None
-
     @property
     def price(self) -> Decimal:
         """Calculate price."""
@@ -90,12 +79,9 @@ class BasketItemSchema(BasketItemCreateSchema):
             price -= self.discount.discount
         return price
 
-    def exchange_fee(self, currency: str) -> int:
-        """Calculate exchange fee."""
-        if self.currency != currency:
-            # TODO: Implement currency exchange
-            raise NotImplementedError("Currency exchange not implemented")
-        return 1
+    def exchange_fee(self, currency: str) -> Decimal:
+        """Exchange rate from the item's currency to ``currency``."""
+        return exchange_rates.table.rate(self.currency, currency)
 
     @field_validator("unit_price", mode="before")
     @classmethod
@@ -103,12 +89,6 @@ class BasketItemSchema(BasketItemCreateSchema):
         """Validate unit price."""
         return decimal_amount(value)
 
-    @field_validator("quantity", mode="before")
-    @classmethod
-    def validate_quantity(cls, value: Decimal) -> Decimal:
-        """Validate quantity."""
-        return decimal_amount(value)
-
     async def reserve_product(self) -> None:
         """Reserve product."""
         return
@@ -122,6 +102,57 @@ class BasketItemSchema(BasketItemCreateSchema):
         return
 
 
+class BasketItemSchema(BasketLineSchema):
+    """Basket line hydrated with its product snapshot."""
+
+    name: str
+    description: str | None = None
+
+    # Item type to distinguish between SaaS and e-commerce
+    item_type: ItemType = ItemType.saas_package  # Default to e-commerce product
+
+    revenue_share_id: str | None = None
+    tax_id: str | None = None
+    merchant: str | None = None
+
+    # SaaS-specific fields
+    plan_duration: int | None = None  # Only for SaaS packages
+    bundles: list | None = None  # Optional field for SaaS packages
+    variant: dict[str, str] | str | None = None
+
+    # Optional additional data field for future extensions or custom data
+    meta_data: dict | None = None
+    available: bool = Field(
+        default=True, description="False when the product snapshot is gone"
+    )
+
+    @classmethod
+    def unavailable(cls, line: BasketLineSchema) -> Self:
+        """Describe a line whose snapshot is gone from its stored fields."""
+        return cls.model_construct(
+            **{name: getattr(line, name) for name in type(line).model_fields},
+            name=line.uid,
+            available=False,
+        )
+
+    @classmethod
+    def hydrate(cls, line: BasketLineSchema, snapshot: ProductSnapshot) -> Self:
+        """Combine a stored line with its snapshot without revalidating either."""
+        fields = cls.model_fields.keys()
+        return cls.model_construct(
+            **(
+                {
+                    name: getattr(snapshot, name)
+                    for name in ProductSnapshot.content_fields() & fields
+                }
+                | {
+                    name: getattr(line, name)
+                    for name in type(line).model_fields & fields
+                }
+            )
+        )
+
+
 class QuantityChangeRequiredError(ValueError):
     """Quantity change required error."""
 
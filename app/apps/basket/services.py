@@ -1,16 +1,35 @@
 """Basket services."""
 
 import asyncio
+import functools
 import logging
+from datetime import datetime
 
+import httpx
+from beanie.odm.utils.encoder import Encoder
 from fastapi_mongo_base.errors import BadRequestError, BaseHTTPException, NotFoundError
+from fastapi_mongo_base.utils import timezone
 from ufaas.services import AccountingClient
 
+from apps.outbox.models import OutboxMessage
+from apps.outbox.schemas import OutboxKind
+from apps.outbox.services import enqueue, outbox_handler
+from apps.product.models import Product, ProductSnapshot
 from apps.purchase.models import Purchase, PurchaseStatus
 from apps.tenant.models import Tenant
 from server.config import Settings
-from utils.saas import AcquisitionType, EnrollmentCreateSchema, EnrollmentSchema
-from utils.wallets import get_or_create_owner_wallet
+from utils.accounting import accounting_client
+from utils.saas import (
+    AcquisitionType,
+    EnrollmentBatchCreateSchema,
+    EnrollmentBatchResultSchema,
+    EnrollmentCreateSchema,
+    EnrollmentFailedError,
+    EnrollmentResultSchema,
+    EnrollmentSchema,
+)
+from utils.tracing import annotate, traced
+from utils.wallets import get_default_wallet_id
 
 from .models import Basket
 from .schemas import (
@@ -32,15 +51,24 @@ async def reserve_basket(basket: Basket, *, save: bool = True) -> Basket:
     return basket
 
 
-async def buy_basket(basket: Basket, *, save: bool = True) -> Basket:
-    """Buy basket."""
+async def buy_basket(basket: Basket) -> Basket:
+    """
+    Buy basket, deferring its SaaS enrollments to the outbox.
+
+    The enrollments are enqueued before the basket is saved as paid, so a
+    failure in between leaves the basket unpaid and a retried validation
+    records both; the handler waits until the basket is paid.
+    """
     buy_tasks = [item.buy_product() for item in basket.items.values()]
     asyncio.gather(*buy_tasks)
+    await enqueue(
+        tenant_id=basket.tenant_id,
+        kind=OutboxKind.saas_enrollments,
+        dedup_key=f"saas_enrollments:{basket.uid}",
+        payload={"basket_uid": basket.uid},
+    )
     basket.status = BasketStatusEnum.paid
-    await purchase_basket_saas(basket, basket.tenant_id)
-    if save:
-        return await basket.save()
-    return basket
+    return await basket.save()
 
 
 async def cancel_basket(basket: Basket, *, save: bool = True) -> Basket:
@@ -53,17 +81,15 @@ async def cancel_basket(basket: Basket, *, save: bool = True) -> Basket:
     return basket
 
 
+@traced("basket.create_payment")
 async def create_basket_payment(
     basket: Basket, callback_url: str | None = None
 ) -> Purchase:
     """Create basket payment."""
-    async with AccountingClient(basket.tenant_id) as client:
-        await client.get_token([
-            "create:finance/accounting/wallet",
-            "create:finance/cashier/payment",
-        ])
+    annotate(basket_uid=basket.uid)
+    async with accounting_client(basket.tenant_id) as client:
         owner_id = (basket.meta_data or {}).get("owner_id", basket.user_id)
-        wallet = await get_or_create_owner_wallet(client, owner_id)
+        wallet_id = await get_default_wallet_id(client, owner_id)
         tenant = await Tenant.get_by_tenant_id(basket.tenant_id)
 
         callback_url = (
@@ -72,7 +98,7 @@ async def create_basket_payment(
         payment = await Purchase(
             tenant_id=basket.tenant_id,
             user_id=basket.user_id,
-            wallet_id=wallet.uid,
+            wallet_id=wallet_id,
             basket_id=basket.uid,
             amount=basket.amount,
             currency=basket.currency,
@@ -82,14 +108,17 @@ async def create_basket_payment(
             accept_wallet=True,
             voucher_code=basket.voucher.code if basket.voucher else None,
         ).save()
+    annotate(purchase_uid=payment.uid)
     return payment
 
 
+@traced("basket.checkout")
 async def create_checkout_basket_url(
     basket: Basket,
     callback_url: str | None = None,
 ) -> str:
     """Create checkout basket URL."""
+    annotate(basket_uid=basket.uid, purchase_uid=basket.purchase_id)
     if basket.status in [BasketStatusEnum.locked, BasketStatusEnum.reserved]:
         if not basket.purchase_detail_url:
             raise BadRequestError(
@@ -110,6 +139,7 @@ async def create_checkout_basket_url(
                 "fa": "سبد خرید فعال نیست. وضعیت سبد خرید: {basket.status.value}",
             },
         )
+    await basket.get_items(strict=True)
     if callback_url is not None:
         basket.callback_url = callback_url
         await basket.save()
@@ -123,49 +153,151 @@ async def create_checkout_basket_url(
     return f"{basket.purchase_detail_url}/start"
 
 
+def saas_url(path: str) -> str:
+    """URL of a SaaS API path, on this server unless SAAS_BASE_URL is set."""
+    return f"{Settings.saas_base_url or Settings.root_url}{path}"
+
+
+def enrollment_requests(
+    basket: Basket, items: dict[str, BasketItemSchema]
+) -> list[EnrollmentCreateSchema]:
+    """SaaS enrollments of a basket, keyed by basket uid and line."""
+    return [
+        EnrollmentCreateSchema(
+            user_id=basket.user_id,
+            bundles=item.bundles,
+            price=item.unit_price,
+            invoice_id=basket.invoice_id,
+            duration=item.plan_duration,
+            status="active",
+            acquisition_type=AcquisitionType.purchased,
+            idempotency_key=f"{basket.uid}:{line}",
+        )
+        for line, item in items.items()
+        if item.item_type == ItemType.saas_package and item.bundles
+    ]
+
+
 async def create_saas_enrollment(
-    client: AccountingClient, basket: Basket, item: BasketItemSchema
-) -> EnrollmentSchema | None:
-    """Create SaaS enrollment."""
-    if item.item_type != ItemType.saas_package or not item.bundles:
-        return None
-    enrollment_data = EnrollmentCreateSchema(
-        user_id=basket.user_id,
-        bundles=item.bundles,
-        price=item.unit_price,
-        invoice_id=basket.invoice_id,
-        # start_at=,
-        duration=item.plan_duration,
-        status="active",
-        acquisition_type=AcquisitionType.purchased,
+    client: AccountingClient, enrollment: EnrollmentCreateSchema
+) -> EnrollmentResultSchema:
+    """Create one SaaS enrollment, reporting failure in the result."""
+    try:
+        response = await client.post(
+            url=saas_url("/api/saas/v1/enrollments"),
+            json=enrollment.model_dump(mode="json"),
+            headers={"Idempotency-Key": enrollment.idempotency_key},
+        )
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        return EnrollmentResultSchema(
+            idempotency_key=enrollment.idempotency_key, error=repr(e)
+        )
+    return EnrollmentResultSchema(
+        idempotency_key=enrollment.idempotency_key,
+        enrollment=EnrollmentSchema.model_validate_json(response.content),
     )
-    logging.info("enrollment_data %s", enrollment_data)
-    enrollment_response = await client.post(
-        url=f"{Settings.root_url}/api/saas/v1/enrollments",
-        json=enrollment_data.model_dump(mode="json"),
+
+
+async def create_saas_enrollments(
+    client: AccountingClient, enrollments: list[EnrollmentCreateSchema]
+) -> EnrollmentBatchResultSchema:
+    """
+    Create enrollments in a single batch request.
+
+    Services without the batch endpoint get one keyed request per item.
+    """
+    response = await client.post(
+        url=saas_url("/api/saas/v1/enrollments/batch"),
+        json=EnrollmentBatchCreateSchema(items=enrollments).model_dump(mode="json"),
     )
-    enrollment_response.raise_for_status()
-    enrollment = EnrollmentSchema.model_validate(enrollment_response.json())
-    return enrollment
+    if response.status_code not in {404, 405}:
+        response.raise_for_status()
+        return EnrollmentBatchResultSchema.model_validate_json(response.content)
+    results = await asyncio.gather(*[
+        create_saas_enrollment(client, enrollment) for enrollment in enrollments
+    ])
+    return EnrollmentBatchResultSchema(results=results)
 
 
+async def enroll_basket(
+    client: AccountingClient, basket: Basket
+) -> list[EnrollmentSchema]:
+    """
+    Create the SaaS enrollments of the basket lines not yet enrolled.
+
+    The SaaS API has no idempotency guarantee, so each created enrollment
+    is recorded on the basket and a retry only sends the failed lines.
+    """
+    items = await basket.get_items(strict=True)
+    enrollments = enrollment_requests(
+        basket,
+        {
+            line: item
+            for line, item in items.items()
+            if line not in basket.enrollment_ids
+        },
+    )
+    if not enrollments:
+        return []
+    batch = await create_saas_enrollments(client, enrollments)
+    lines = {f"{basket.uid}:{line}": line for line in items}
+    created = {
+        lines[result.idempotency_key]: result.enrollment.uid
+        for result in batch.results
+        if result.enrollment and result.idempotency_key in lines
+    }
+    if created:
+        await basket.record_enrollments(created)
+    if batch.failed:
+        raise EnrollmentFailedError(
+            detail=", ".join(
+                f"{result.idempotency_key}: {result.error}" for result in batch.failed
+            )
+        )
+    return batch.enrollments
+
+
+@traced("basket.enroll_saas")
 async def purchase_basket_saas(
     basket: Basket, tenant_id: str
 ) -> list[EnrollmentSchema]:
     """Purchase basket SaaS."""
+    annotate(basket_uid=basket.uid, purchase_uid=basket.purchase_id)
     try:
-        async with AccountingClient(tenant_id) as client:
+        async with accounting_client(tenant_id) as client:
             await client.get_token("create:finance/saas/enrollment")
-            enrollments = await asyncio.gather(*[
-                create_saas_enrollment(client, basket, item)
-                for item in basket.items.values()
-            ])
-            return [enrollment for enrollment in enrollments if enrollment]
+            return await enroll_basket(client, basket)
     except Exception:
         logging.exception("Error purchasing basket saas")
         raise
 
 
+@outbox_handler(OutboxKind.saas_enrollments)
+async def enroll_paid_basket(message: OutboxMessage) -> None:
+    """
+    Create the SaaS enrollments of a paid basket.
+
+    The message is recorded just before the basket is saved as paid, so a
+    basket that is not paid yet is retried later rather than skipped.
+    """
+    basket = await Basket.get_by_uid(message.payload["basket_uid"])
+    if basket is None or basket.status == BasketStatusEnum.cancelled:
+        logging.warning(
+            "Skipping enrollments of basket %s: %s",
+            message.payload["basket_uid"],
+            "not found" if basket is None else basket.status,
+        )
+        return
+    if basket.status != BasketStatusEnum.paid:
+        raise BadRequestError(
+            error_code="basket_not_paid",
+            detail=f"Basket is {basket.status}",
+            message={"en": "Basket is not paid", "fa": "سبد خرید پرداخت نشده است"},
+        )
+    await purchase_basket_saas(basket, basket.tenant_id)
+
+
 async def apply_discount(basket: Basket, voucher_code: VoucherSchema | None) -> Basket:
     """Apply discount to basket."""
     from apps.voucher.models import Voucher
@@ -175,15 +307,8 @@ async def apply_discount(basket: Basket, voucher_code: VoucherSchema | None) ->
         return basket
 
     discount_code = voucher_code.code
-    if basket.discount:
-        prev_discount = await Voucher.get_by_code(
-            basket.tenant_id, basket.discount.code
-        )
-        if prev_discount:
-            prev_discount.redeemed -= 1
-            await prev_discount.save()
-
     if not discount_code:
+        await release_discount(basket)
         basket.discount = None
         await basket.save()
         return basket
@@ -212,17 +337,57 @@ async def apply_discount(basket: Basket, voucher_code: VoucherSchema | None) ->
     if voucher.status != VoucherStatus.ACTIVE:
         return basket
 
+    if not await voucher.redeem(basket.user_id, basket.uid):
+        raise BadRequestError(
+            error_code="voucher_limit_reached",
+            detail=f"Voucher {discount_code} usage limit reached",
+            message={
+                "en": f"Voucher {discount_code} usage limit reached",
+                "fa": f"سقف استفاده از ووچر {discount_code} تکمیل شده است",
+            },
+        )
+    # The previous voucher stays redeemed until the new one is secured.
+    if basket.discount and basket.discount.code != voucher.code:
+        await release_discount(basket)
+
     # TODO check if voucher is limited products
     discount_value = voucher.calculate_discount(basket.subtotal)
     basket.discount = DiscountSchema(
         code=voucher.code, discount=discount_value, user_id=basket.user_id
     )
     await basket.save()
+    return basket
 
-    voucher.redeemed += 1
-    await voucher.save()
 
-    return basket
+async def refresh_discount(basket: Basket) -> Basket:
+    """
+    Recompute the basket's voucher discount against its current subtotal.
+
+    A voucher that is no longer active keeps its discount, capped at the
+    subtotal so the amount never goes negative.
+    """
+    from apps.voucher.models import Voucher
+
+    if not basket.discount:
+        return basket
+    subtotal = basket.subtotal
+    voucher = await Voucher.get_by_code(basket.tenant_id, basket.discount.code)
+    basket.discount.discount = min(
+        voucher.calculate_discount(subtotal) if voucher else basket.discount.discount,
+        subtotal,
+    )
+    return await basket.save()
+
+
+async def release_discount(basket: Basket) -> None:
+    """Release the voucher redemption held by the basket's discount."""
+    from apps.voucher.models import Voucher
+
+    if not basket.discount:
+        return
+    voucher = await Voucher.get_by_code(basket.tenant_id, basket.discount.code)
+    if voucher:
+        await voucher.release(basket.user_id, basket.uid)
 
 
 async def validate_basket(basket: Basket) -> None:
@@ -259,3 +424,65 @@ async def validate_basket(basket: Basket) -> None:
                 "fa": "پرداخت موفق نیست",
             },
         )
+
+
+@functools.cache
+def reprice_slots() -> asyncio.Semaphore:
+    """Get the semaphore bounding concurrent repricing runs."""
+    return asyncio.Semaphore(Settings.basket_reprice_concurrency)
+
+
+async def reprice_active_baskets(product: Product) -> int:
+    """
+    Point active baskets' lines for a product at its current snapshot.
+
+    Baskets are found through the multikey ``product_uids`` index, or by
+    their items when stored before that field existed, and updated in
+    batches, pausing between batches so catalog-wide price changes
+    trickle into the primary instead of flooding it. Discounts of the
+    repriced baskets are recomputed against their new subtotal.
+    """
+    snapshot = await ProductSnapshot.from_product(product)
+    line = f"items.{product.uid}"
+    query = {
+        "tenant_id": product.tenant_id,
+        "$or": [
+            {"product_uids": product.uid},
+            {"product_uids": {"$exists": False}, line: {"$exists": True}},
+        ],
+        "status": BasketStatusEnum.active,
+        f"{line}.snapshot_id": {"$ne": snapshot.uid},
+    }
+    collection = Basket.get_pymongo_collection()
+    repriced = 0
+    async with reprice_slots():
+        while True:
+            ids = [
+                doc["_id"]
+                async for doc in collection.find(
+                    query, {"_id": 1}, limit=Settings.basket_reprice_batch_size
+                )
+            ]
+            if not ids:
+                break
+            result = await collection.update_many(
+                {"_id": {"$in": ids}, **query},
+                Encoder().encode({
+                    "$set": {
+                        f"{line}.snapshot_id": snapshot.uid,
+                        f"{line}.unit_price": snapshot.unit_price,
+                        f"{line}.currency": snapshot.currency,
+                        "updated_at": datetime.now(timezone.tz),
+                    }
+                }),
+            )
+            repriced += result.modified_count
+            async for basket in Basket.find({
+                "_id": {"$in": ids},
+                f"{line}.snapshot_id": snapshot.uid,
+                "discount": {"$ne": None},
+            }):
+                await refresh_discount(basket)
+            await asyncio.sleep(Settings.basket_reprice_batch_interval)
+    logging.info("Repriced %s baskets for product %s", repriced, product.uid)
+    return repriced
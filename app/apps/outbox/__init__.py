@@ -0,0 +1 @@
+"""Outbox app package."""
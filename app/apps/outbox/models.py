@@ -0,0 +1,138 @@
+"""Outbox models."""
+
+import logging
+from datetime import datetime, timedelta
+from typing import ClassVar, Self
+
+from fastapi_mongo_base.models import TenantScopedEntity
+from fastapi_mongo_base.utils import timezone
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+
+from server.config import Settings
+from utils.resilience import backoff_delay
+
+from .schemas import OutboxKind, OutboxMessageSchema, OutboxStatus
+
+
+class OutboxMessage(OutboxMessageSchema, TenantScopedEntity):
+    """
+    Pending side effect of a committed state change.
+
+    Messages are keyed by ``dedup_key`` so recording the same effect twice
+    is a no-op, and are leased to one worker at a time; a lease that
+    expires (a worker died mid-flight) makes the message claimable again.
+    """
+
+    class Settings(TenantScopedEntity.Settings):
+        """Beanie settings with dedup and due-message indexes."""
+
+        name = "outbox"
+        indexes: ClassVar[list[IndexModel]] = [
+            *TenantScopedEntity.Settings.indexes,
+            IndexModel([("dedup_key", ASCENDING)], unique=True),
+            IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)]),
+            IndexModel([("status", ASCENDING), ("locked_until", ASCENDING)]),
+        ]
+
+    @classmethod
+    async def enqueue(
+        cls,
+        *,
+        tenant_id: str,
+        kind: OutboxKind,
+        dedup_key: str,
+        payload: dict[str, str],
+        trace_context: dict[str, str] | None = None,
+    ) -> None:
+        """Record a side effect unless one with the same key exists."""
+        now = datetime.now(timezone.tz)
+        message = cls(
+            tenant_id=tenant_id,
+            kind=kind,
+            dedup_key=dedup_key,
+            payload=payload,
+            trace_context=trace_context or {},
+            next_attempt_at=now,
+            created_at=now,
+            updated_at=now,
+        )
+        await cls.find_one({"dedup_key": dedup_key}).update(
+            {"$setOnInsert": message.model_dump(exclude={"id"})},
+            upsert=True,
+        )
+
+    @classmethod
+    async def claim(cls, limit: int) -> list[Self]:
+        """Lease up to ``limit`` due messages, oldest first."""
+        now = datetime.now(timezone.tz)
+        query = {
+            "$or": [
+                {"status": OutboxStatus.pending, "next_attempt_at": {"$lte": now}},
+                {"status": OutboxStatus.processing, "locked_until": {"$lte": now}},
+            ]
+        }
+        lease = {
+            "$set": {
+                "status": OutboxStatus.processing,
+                "locked_until": now + timedelta(seconds=Settings.outbox_lease_timeout),
+                "updated_at": now,
+            },
+            "$inc": {"attempts": 1},
+        }
+        collection = cls.get_pymongo_collection()
+        claimed = []
+        for _ in range(limit):
+            doc = await collection.find_one_and_update(
+                query,
+                lease,
+                sort=[("next_attempt_at", ASCENDING)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if doc is None:
+                break
+            claimed.append(cls.model_validate(doc))
+        return claimed
+
+    async def _release_lease(self, **changes: object) -> bool:
+        """
+        Apply ``changes`` if this worker still holds the lease.
+
+        Every claim bumps ``attempts``, so a worker whose lease expired and
+        was claimed again cannot overwrite the new holder's outcome.
+        """
+        changes |= {"locked_until": None, "updated_at": datetime.now(timezone.tz)}
+        result = await self.get_pymongo_collection().update_one(
+            {
+                "_id": self.id,
+                "status": OutboxStatus.processing,
+                "attempts": self.attempts,
+            },
+            {"$set": changes},
+        )
+        if not result.modified_count:
+            logging.warning("Outbox message %s lease was lost", self.dedup_key)
+            return False
+        for name, value in changes.items():
+            setattr(self, name, value)
+        return True
+
+    async def complete(self) -> bool:
+        """Mark the side effect as delivered."""
+        return await self._release_lease(status=OutboxStatus.done, last_error=None)
+
+    async def retry_later(self, error: str) -> bool:
+        """Schedule another attempt, giving up after the configured maximum."""
+        if self.attempts >= Settings.outbox_max_attempts:
+            return await self._release_lease(
+                status=OutboxStatus.failed, last_error=error
+            )
+        delay = backoff_delay(
+            self.attempts,
+            Settings.outbox_retry_backoff,
+            Settings.outbox_retry_backoff_cap,
+        )
+        return await self._release_lease(
+            status=OutboxStatus.pending,
+            last_error=error,
+            next_attempt_at=datetime.now(timezone.tz) + timedelta(seconds=delay),
+        )
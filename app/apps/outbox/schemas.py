@@ -0,0 +1,37 @@
+"""Outbox schemas."""
+
+from datetime import datetime
+from enum import StrEnum
+
+from fastapi_mongo_base.schemas import TenantScopedEntitySchema
+from pydantic import Field
+
+
+class OutboxKind(StrEnum):
+    """Side effects deferred to the outbox worker."""
+
+    saas_enrollments = "saas_enrollments"
+    proposal = "proposal"
+
+
+class OutboxStatus(StrEnum):
+    """Outbox message status."""
+
+    pending = "pending"
+    processing = "processing"
+    done = "done"
+    failed = "failed"
+
+
+class OutboxMessageSchema(TenantScopedEntitySchema):
+    """A side effect recorded alongside the state change that caused it."""
+
+    kind: OutboxKind
+    dedup_key: str
+    payload: dict[str, str] = Field(default_factory=dict)
+    trace_context: dict[str, str] = Field(default_factory=dict)
+    status: OutboxStatus = OutboxStatus.pending
+    attempts: int = 0
+    next_attempt_at: datetime | None = None
+    locked_until: datetime | None = None
+    last_error: str | None = None
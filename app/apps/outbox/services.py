@@ -0,0 +1,80 @@
+"""Outbox services."""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+
+from server.config import Settings
+from utils.tracing import annotate, continued, current_context, span
+
+from .models import OutboxMessage
+from .schemas import OutboxKind
+
+type OutboxHandler = Callable[[OutboxMessage], Awaitable[object]]
+
+_handlers: dict[OutboxKind, OutboxHandler] = {}
+_ready = asyncio.Event()
+
+
+def outbox_handler(kind: OutboxKind) -> Callable[[OutboxHandler], OutboxHandler]:
+    """Register the function that delivers messages of ``kind``."""
+
+    def register(handler: OutboxHandler) -> OutboxHandler:
+        _handlers[kind] = handler
+        return handler
+
+    return register
+
+
+async def enqueue(
+    *, tenant_id: str, kind: OutboxKind, dedup_key: str, payload: dict[str, str]
+) -> None:
+    """Record a side effect and wake the worker."""
+    await OutboxMessage.enqueue(
+        tenant_id=tenant_id,
+        kind=kind,
+        dedup_key=dedup_key,
+        payload=payload,
+        trace_context=current_context(),
+    )
+    _ready.set()
+
+
+async def dispatch(message: OutboxMessage) -> None:
+    """
+    Deliver one message, rescheduling it on failure.
+
+    The handler runs in the trace of the request that enqueued the message.
+    """
+    try:
+        with continued(message.trace_context), span(f"outbox.{message.kind}"):
+            annotate(attempt=message.attempts, **message.payload)
+            await _handlers[message.kind](message)
+    except Exception as e:
+        logging.exception("Outbox message %s failed", message.dedup_key)
+        await message.retry_later(repr(e))
+        return
+    await message.complete()
+
+
+async def drain_outbox(batch_size: int | None = None) -> int:
+    """Deliver one batch of due messages concurrently."""
+    messages = await OutboxMessage.claim(batch_size or Settings.outbox_batch_size)
+    await asyncio.gather(*[dispatch(message) for message in messages])
+    return len(messages)
+
+
+async def drain_outbox_forever() -> None:
+    """Drain the outbox until cancelled, waking early on new messages."""
+    while True:
+        _ready.clear()
+        try:
+            drained = await drain_outbox()
+        except Exception:
+            logging.exception("Outbox drain failed")
+            drained = 0
+        if drained:
+            continue
+        with suppress(TimeoutError):
+            await asyncio.wait_for(_ready.wait(), Settings.outbox_poll_interval)
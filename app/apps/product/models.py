@@ -1,11 +1,125 @@
 """Product models."""
 
-from fastapi_mongo_base.models import TenantUserEntity
+from collections import OrderedDict
+from collections.abc import Iterable
+from datetime import datetime
+from typing import ClassVar, Self
 
-from .schemas import ProductSchema
+from fastapi_mongo_base.models import TenantScopedEntity, TenantUserEntity
+from fastapi_mongo_base.utils import timezone
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+
+from server.config import Settings
+
+from .schemas import ProductSchema, ProductSnapshotSchema
 
 
 class Product(ProductSchema, TenantUserEntity):
     """Product model."""
 
-    pass
+    class Settings(TenantUserEntity.Settings):
+        """Beanie settings with catalog filter and search indexes."""
+
+        indexes: ClassVar[list[IndexModel]] = [
+            *TenantUserEntity.Settings.indexes,
+            IndexModel([
+                ("tenant_id", ASCENDING),
+                ("is_deleted", ASCENDING),
+                ("created_at", DESCENDING),
+                ("uid", DESCENDING),
+            ]),
+            IndexModel([
+                ("tenant_id", ASCENDING),
+                ("status", ASCENDING),
+                ("item_type", ASCENDING),
+                ("currency", ASCENDING),
+                ("unit_price", ASCENDING),
+            ]),
+            IndexModel([
+                ("tenant_id", ASCENDING),
+                ("merchant", ASCENDING),
+                ("status", ASCENDING),
+                ("created_at", DESCENDING),
+            ]),
+            IndexModel([
+                ("tenant_id", ASCENDING),
+                ("variant", ASCENDING),
+                ("status", ASCENDING),
+            ]),
+            IndexModel(
+                [("tenant_id", ASCENDING), ("external_id", ASCENDING)],
+                unique=True,
+                partialFilterExpression={"external_id": {"$type": "string"}},
+                name="product_external_id",
+            ),
+            IndexModel(
+                [
+                    ("tenant_id", ASCENDING),
+                    ("name", TEXT),
+                    ("description", TEXT),
+                ],
+                weights={"name": 10, "description": 1},
+                name="product_text_search",
+            ),
+        ]
+
+    @classmethod
+    def get_queryset(cls, *, q: str | None = None, **kwargs: object) -> dict:
+        """Build a catalog query, adding full-text search on ``q``."""
+        query = super().get_queryset(**kwargs)
+        if q:
+            query["$text"] = {"$search": q}
+        return query
+
+
+class ProductSnapshot(ProductSnapshotSchema, TenantScopedEntity):
+    """
+    Content-addressed product snapshot shared by basket lines.
+
+    The uid is a hash of the content, so snapshots are only ever inserted
+    and can be cached without invalidation.
+    """
+
+    _cache: ClassVar[OrderedDict[str, "ProductSnapshot"]] = OrderedDict()
+
+    class Settings(TenantScopedEntity.Settings):
+        """Beanie settings."""
+
+        name = "product_snapshot"
+
+    @classmethod
+    def _remember(cls, snapshot: Self) -> Self:
+        cls._cache[snapshot.uid] = snapshot
+        cls._cache.move_to_end(snapshot.uid)
+        while len(cls._cache) > Settings.product_snapshot_cache_size:
+            cls._cache.popitem(last=False)
+        return snapshot
+
+    @classmethod
+    async def from_product(cls, product: Product) -> Self:
+        """Get or store the snapshot of a product's current content."""
+        data = product.model_dump(include=cls.content_fields() - {"product_uid"})
+        data["product_uid"] = product.uid
+        uid = cls.content_uid(data)
+        if snapshot := cls._cache.get(uid):
+            return snapshot
+
+        now = datetime.now(timezone.tz)
+        snapshot = cls.model_validate(
+            data | {"uid": uid, "created_at": now, "updated_at": now}
+        )
+        await cls.find_one({"uid": uid}).update(
+            {"$setOnInsert": snapshot.model_dump(exclude={"id", "uid"})},
+            upsert=True,
+        )
+        return cls._remember(snapshot)
+
+    @classmethod
+    async def get_many(cls, uids: Iterable[str]) -> dict[str, Self]:
+        """Get snapshots by uid, reading through the in-process cache."""
+        uids = set(uids)
+        found = {uid: cls._cache[uid] for uid in uids if uid in cls._cache}
+        if missing := uids - found.keys():
+            async for snapshot in cls.find({"uid": {"$in": list(missing)}}):
+                found[snapshot.uid] = cls._remember(snapshot)
+        return found
@@ -1,42 +1,191 @@
 """Product routes."""
 
-from fastapi import Request
+from collections.abc import Generator
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+
+from fastapi import BackgroundTasks, Query, Request, Response
+from fastapi_mongo_base.errors import ConflictError
+from fastapi_mongo_base.schemas import PaginatedResponse
 from fastapi_mongo_base.utils import usso_routes
+from pymongo.errors import DuplicateKeyError
 from usso import UserData
 
 import utils.usso
+from apps.basket.services import reprice_active_baskets
+from server.config import Settings
+from utils.export import ExportMixin
+from utils.http_cache import (
+    cache_control,
+    collection_etag,
+    is_not_modified,
+    not_modified,
+    set_cache_headers,
+)
+from utils.pagination import CursorPaginationMixin, PaginationMode
 
 from .models import Product
-from .schemas import ProductCreateSchema, ProductSchema, ProductUpdateSchema
+from .schemas import (
+    ItemType,
+    ProductCreateSchema,
+    ProductImportReportSchema,
+    ProductSchema,
+    ProductStatus,
+    ProductUpdateSchema,
+    ProductVersionSchema,
+)
+from .services import import_products
+
 
+@contextmanager
+def unique_external_id() -> Generator[None]:
+    """Report a reused external_id as a conflict instead of a server error."""
+    try:
+        yield
+    except DuplicateKeyError as e:
+        raise ConflictError(
+            error_code="duplicate_external_id",
+            detail="A product with this external_id already exists",
+            message={
+                "en": "A product with this external_id already exists",
+                "fa": "محصولی با این شناسه خارجی وجود دارد",
+            },
+        ) from e
 
-class ProductsRouter(usso_routes.AbstractTenantUSSORouter):
+
+class ProductsRouter(
+    ExportMixin, CursorPaginationMixin, usso_routes.AbstractTenantUSSORouter
+):
     """Products router."""
 
     model = Product
     schema = ProductSchema
 
     async def get_user(self, request: Request, **kwargs: object) -> UserData:
-        """Get the current user."""
-        usso = utils.usso.get_usso()
-        return usso(request)
+        """Get the current user without blocking on API-key lookups."""
+        return await utils.usso.get_usso().usso_access_security_async(request)
+
+    def config_routes(self, **kwargs: object) -> None:
+        """Configure routes."""
+        super().config_routes(**kwargs)
+
+        self.router.add_api_route(
+            "/import",
+            self.import_items,
+            methods=["POST"],
+            response_model=ProductImportReportSchema,
+            openapi_extra={
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "application/x-ndjson": {
+                            "schema": ProductCreateSchema.model_json_schema()
+                        }
+                    },
+                }
+            },
+        )
+
+    async def list_items(
+        self,
+        request: Request,
+        response: Response,
+        offset: int = Query(0, ge=0),
+        limit: int = Query(10, ge=1, le=Settings.page_max_limit),
+        created_at_from: datetime | None = None,
+        created_at_to: datetime | None = None,
+        pagination: PaginationMode = PaginationMode.offset,
+        cursor: str | None = None,
+        with_total: bool = False,
+        item_type: ItemType | None = None,
+        status: ProductStatus | None = None,
+        merchant: str | None = None,
+        variant: str | None = None,
+        currency: str | None = None,
+        unit_price_from: Decimal | None = None,
+        unit_price_to: Decimal | None = None,
+        q: str | None = Query(None, min_length=1, max_length=100),
+    ) -> PaginatedResponse[ProductSchema] | Response:
+        """List products with catalog filters, answering 304 when unchanged."""
+        page = await self._paginated_list_items(
+            request,
+            offset=offset,
+            limit=limit,
+            pagination=pagination,
+            cursor=cursor,
+            with_total=with_total,
+            created_at_from=created_at_from,
+            created_at_to=created_at_to,
+            item_type=item_type,
+            status=status,
+            merchant=merchant,
+            variant=variant,
+            currency=currency,
+            unit_price_from=unit_price_from,
+            unit_price_to=unit_price_to,
+            q=q,
+        )
+        etag = collection_etag(
+            (item.etag for item in page.items),
+            page.offset,
+            page.limit,
+            page.total,
+            getattr(page, "next_cursor", None),
+        )
+        control = cache_control(Settings.product_cache_max_age, public=False)
+        if is_not_modified(request, etag):
+            return not_modified(etag, control)
+        set_cache_headers(response, etag, control)
+        return page
+
+    async def retrieve_item(
+        self, request: Request, response: Response, uid: str
+    ) -> Product | Response:
+        """Retrieve a product by UID, answering 304 when unchanged."""
+        control = cache_control(
+            Settings.product_cache_max_age,
+            Settings.product_cache_stale_while_revalidate,
+        )
+        if request.headers.get("if-none-match"):
+            version = await Product.find_one(
+                {"uid": uid, "is_deleted": False},
+                projection_model=ProductVersionSchema,
+            )
+            if version and is_not_modified(request, version.etag):
+                return not_modified(version.etag, control)
 
-    async def retrieve_item(self, request: Request, uid: str) -> Product:
-        """Retrieve a product by UID."""
         item = await self.get_item(uid=uid)
+        set_cache_headers(response, item.etag, control)
         return item
 
+    async def import_items(self, request: Request) -> ProductImportReportSchema:
+        """Bulk upsert products from a streamed NDJSON body keyed on external_id."""
+        user = await self.get_user(request)
+        await self.authorize(action="create", user=user)
+        return await import_products(
+            request.stream(), tenant_id=user.tenant_id, user_id=user.user_id
+        )
+
     async def create_item(self, request: Request, data: ProductCreateSchema) -> Product:
         """Create a new product."""
-        return await super().create_item(request, data.model_dump())
+        with unique_external_id():
+            return await super().create_item(request, data.model_dump())
 
     async def update_item(
-        self, request: Request, uid: str, data: ProductUpdateSchema
+        self,
+        request: Request,
+        uid: str,
+        data: ProductUpdateSchema,
+        background_tasks: BackgroundTasks,
     ) -> Product:
-        """Update an existing product."""
-        return await super().update_item(
-            request, uid, data.model_dump(exclude_none=True)
-        )
+        """Update a product, repricing active baskets if its price changed."""
+        changes = data.model_dump(exclude_none=True)
+        with unique_external_id():
+            product: Product = await super().update_item(request, uid, changes)
+        if changes.keys() & {"unit_price", "currency", "bundles"}:
+            background_tasks.add_task(reprice_active_baskets, product)
+        return product
 
 
 router = ProductsRouter().router
@@ -1,13 +1,17 @@
 """Product schemas."""
 
+import hashlib
+import json
+from datetime import datetime
 from decimal import Decimal
 from enum import StrEnum
 
-from fastapi_mongo_base.schemas import TenantUserEntitySchema
+from fastapi_mongo_base.schemas import TenantScopedEntitySchema, TenantUserEntitySchema
 from fastapi_mongo_base.utils.bsontools import decimal_amount
-from pydantic import BaseModel, ConfigDict, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 from server.config import Settings
+from utils.http_cache import version_etag, version_of
 from utils.saas import Bundle
 
 
@@ -37,6 +41,8 @@ class ProductCreateSchema(BaseModel):
     currency: str = Settings.currency
     stock_quantity: Decimal | None = None
 
+    external_id: str | None = None  # Merchant catalog key used by imports
+
     item_type: ItemType = ItemType.saas_package  # Default to e-commerce product
 
     revenue_share_id: str | None = None
@@ -70,6 +76,71 @@ class ProductSchema(ProductCreateSchema, TenantUserEntitySchema):
 
     model_config = ConfigDict(allow_inf_nan=True)
 
+    @property
+    def version(self) -> int:
+        """Product version derived from updated_at."""
+        return version_of(self.updated_at)
+
+    @property
+    def etag(self) -> str:
+        """Product ETag derived from updated_at."""
+        return version_etag(self.uid, self.updated_at)
+
+
+class ProductVersionSchema(BaseModel):
+    """Projection of the fields a product ETag is derived from."""
+
+    uid: str
+    updated_at: datetime
+
+    @property
+    def etag(self) -> str:
+        """Product ETag derived from updated_at."""
+        return version_etag(self.uid, self.updated_at)
+
+
+class ProductSnapshotSchema(TenantScopedEntitySchema):
+    """Immutable copy of the product fields a basket line is priced from."""
+
+    product_uid: str
+
+    name: str
+    description: str | None = None
+    unit_price: Decimal
+    currency: str = Settings.currency
+
+    item_type: ItemType = ItemType.saas_package
+
+    revenue_share_id: str | None = None
+    tax_id: str | None = None
+    merchant: str | None = None
+
+    plan_duration: int | None = None
+    bundles: list[Bundle] | None = None
+    variant: str | None = None
+
+    @field_validator("unit_price", mode="before")
+    @classmethod
+    def validate_price(cls, value: Decimal) -> Decimal:
+        """Validate unit price."""
+        return decimal_amount(value)
+
+    @classmethod
+    def content_fields(cls) -> set[str]:
+        """Fields that identify a snapshot's content."""
+        return {"tenant_id", "product_uid", "meta_data"} | (
+            cls.model_fields.keys() - TenantScopedEntitySchema.model_fields.keys()
+        )
+
+    @classmethod
+    def content_uid(cls, data: dict) -> str:
+        """Content address of a snapshot payload."""
+        payload = cls.model_validate(data).model_dump(
+            mode="json", include=cls.content_fields()
+        )
+        encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()
+
 
 class ProductUpdateSchema(BaseModel):
     """Product update schema."""
@@ -93,3 +164,23 @@ class ProductUpdateSchema(BaseModel):
     bundles: list[Bundle] | None = None  # Optional field for SaaS packages
 
     meta_data: dict[str, object] | None = None
+
+
+class ProductImportErrorSchema(BaseModel):
+    """Product import row error schema."""
+
+    line: int
+    external_id: str | None = None
+    error: str
+
+
+class ProductImportReportSchema(BaseModel):
+    """Product import report schema."""
+
+    total: int = 0
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: list[ProductImportErrorSchema] = Field(
+        default_factory=list, description="The first failed rows, up to a limit"
+    )
@@ -1 +1,175 @@
 """Product services."""
+
+import asyncio
+import functools
+from collections.abc import AsyncIterable
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from beanie.odm.utils.encoder import Encoder
+from fastapi_mongo_base.utils import timezone
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from server.config import Settings
+from utils.ndjson import batched, iter_lines
+
+from .models import Product
+from .schemas import (
+    ProductCreateSchema,
+    ProductImportErrorSchema,
+    ProductImportReportSchema,
+    ProductStatus,
+)
+
+type ValidatedRow = tuple[int, dict | None, str | None]
+
+DUPLICATE_KEY = 11000
+
+
+@functools.cache
+def get_import_pool() -> ProcessPoolExecutor:
+    """Get the shared process pool for CPU-bound import validation."""
+    return ProcessPoolExecutor(max_workers=Settings.product_import_workers)
+
+
+def validate_product_rows(
+    rows: list[tuple[int, bytes | None]],
+) -> list[ValidatedRow]:
+    """Validate NDJSON rows as products; runs in-process or in the pool."""
+    results: list[ValidatedRow] = []
+    for line, raw in rows:
+        if raw is None:
+            results.append((line, None, "row: Line exceeds the maximum length"))
+            continue
+        try:
+            product = ProductCreateSchema.model_validate_json(raw)
+        except ValidationError as e:
+            error = "; ".join(
+                f"{'.'.join(map(str, err['loc'])) or 'row'}: {err['msg']}"
+                for err in e.errors(include_url=False)
+            )
+            results.append((line, None, error))
+            continue
+        if not product.external_id:
+            results.append((line, None, "external_id: Field required"))
+            continue
+        results.append((line, product.model_dump(), None))
+    return results
+
+
+async def validate_product_batch(
+    rows: list[tuple[int, bytes | None]],
+) -> list[ValidatedRow]:
+    """Validate a batch, off the event loop when import workers are set."""
+    if Settings.product_import_workers:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_import_pool(), validate_product_rows, rows
+        )
+    return validate_product_rows(rows)
+
+
+async def upsert_product_batch(
+    rows: list[tuple[int, dict]],
+    report: ProductImportReportSchema,
+    *,
+    tenant_id: str,
+    user_id: str,
+) -> None:
+    """Upsert validated rows by (tenant_id, external_id) in one bulk write."""
+    now = datetime.now(timezone.tz)
+    uid_field = Product.model_fields["uid"]
+    encoder = Encoder()
+    operations = [
+        UpdateOne(
+            {"tenant_id": tenant_id, "external_id": data["external_id"]},
+            encoder.encode({
+                "$set": data | {"is_deleted": False, "updated_at": now},
+                "$setOnInsert": {
+                    "uid": uid_field.get_default(call_default_factory=True),
+                    "user_id": user_id,
+                    "status": ProductStatus.active,
+                    "created_at": now,
+                },
+            }),
+            upsert=True,
+        )
+        for _, data in rows
+    ]
+
+    collection = Product.get_pymongo_collection()
+    pending = list(range(len(rows)))
+    for attempt in range(2):
+        try:
+            result = await collection.bulk_write(
+                [operations[index] for index in pending], ordered=False
+            )
+        except BulkWriteError as e:
+            report.created += e.details.get("nUpserted", 0)
+            report.updated += e.details.get("nMatched", 0)
+            retry = []
+            for error in e.details.get("writeErrors", []):
+                index = pending[error["index"]]
+                # A concurrent import inserted the same key first; retried,
+                # the row matches and updates it.
+                if error.get("code") == DUPLICATE_KEY and not attempt:
+                    retry.append(index)
+                    continue
+                line, data = rows[index]
+                report_error(
+                    report,
+                    ProductImportErrorSchema(
+                        line=line,
+                        external_id=data["external_id"],
+                        error=error.get("errmsg", "write failed"),
+                    ),
+                )
+            if not retry:
+                return
+            pending = retry
+            continue
+        report.created += result.upserted_count
+        report.updated += result.matched_count
+        return
+
+
+def report_error(
+    report: ProductImportReportSchema, error: ProductImportErrorSchema
+) -> None:
+    """Count a failed row, keeping the first ``product_import_max_errors``."""
+    report.failed += 1
+    if len(report.errors) < Settings.product_import_max_errors:
+        report.errors.append(error)
+
+
+async def import_products(
+    chunks: AsyncIterable[bytes],
+    *,
+    tenant_id: str,
+    user_id: str,
+    batch_size: int | None = None,
+) -> ProductImportReportSchema:
+    """
+    Stream an NDJSON product catalog into the tenant's products.
+
+    Rows are validated and written one batch at a time, so memory stays
+    bounded by the batch size rather than the upload size.
+    """
+    report = ProductImportReportSchema()
+    batch_size = batch_size or Settings.product_import_batch_size
+    lines = iter_lines(chunks, Settings.product_import_max_line_bytes)
+    async for rows in batched(lines, batch_size):
+        report.total += len(rows)
+        valid: list[tuple[int, dict]] = []
+        for line, data, error in await validate_product_batch(rows):
+            if data is None:
+                report_error(report, ProductImportErrorSchema(line=line, error=error))
+            else:
+                valid.append((line, data))
+        if valid:
+            await upsert_product_batch(
+                valid, report, tenant_id=tenant_id, user_id=user_id
+            )
+    return report
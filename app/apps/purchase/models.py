@@ -1,10 +1,13 @@
 """Purchase models."""
 
 from datetime import datetime
-from typing import Self
+from typing import ClassVar, Self
 
 from fastapi_mongo_base.models import TenantUserEntity
 from fastapi_mongo_base.utils import timezone
+from pymongo import IndexModel
+
+from utils.pagination import keyset_index
 
 from .schemas import PurchaseSchema, PurchaseStatus
 
@@ -12,6 +15,14 @@ from .schemas import PurchaseSchema, PurchaseStatus
 class Purchase(PurchaseSchema, TenantUserEntity):
     """Purchase model."""
 
+    class Settings(TenantUserEntity.Settings):
+        """Beanie settings."""
+
+        indexes: ClassVar[list[IndexModel]] = [
+            *TenantUserEntity.Settings.indexes,
+            keyset_index(),
+        ]
+
     @classmethod
     async def get_purchase_by_code(cls, tenant_id: str, code: str) -> Self:
         """Get purchase by tenant and code."""
@@ -1,21 +1,23 @@
 """Purchase routes."""
 
-import logging
 from decimal import Decimal
 
 from fastapi import Request
 from fastapi.responses import RedirectResponse
 from fastapi_mongo_base.errors import BadRequestError
 from fastapi_mongo_base.utils import usso_routes
-from ufaas.services import AccountingClient
 from usso import UserData
 
 from apps.tenant.models import Tenant
 from server.config import Settings
+from utils.accounting import accounting_client
 from utils.currency import Currency
+from utils.export import ExportMixin
+from utils.ipg_routing import ipg_router
+from utils.pagination import CursorPaginationMixin
 from utils.schemas import RedirectUrlSchema
 from utils.texttools import add_query_params
-from utils.usso import get_usso
+from utils.usso import USSOUserMixin, get_usso
 from utils.wallets import get_wallets
 
 from .models import Purchase
@@ -23,25 +25,29 @@ from .schemas import (
     PurchaseCreateSchema,
     PurchaseRetrieveSchema,
     PurchaseSchema,
-    PurchaseStatus,
 )
 from .services import (
-    create_proposal,
     start_purchase,
     verify_purchase,
 )
 
 
-class PurchaseRouter(usso_routes.AbstractTenantUSSORouter):
+class PurchaseRouter(
+    USSOUserMixin,
+    ExportMixin,
+    CursorPaginationMixin,
+    usso_routes.AbstractTenantUSSORouter,
+):
     """Purchase router."""
 
     model = Purchase
     schema = PurchaseSchema
 
-    def get_user_or_none(self, request: Request, **kwargs: object) -> UserData | None:
-        """Get user or return None."""
-        usso = get_usso(raise_exception=False)
-        return usso(request)
+    async def get_user_or_none(
+        self, request: Request, **kwargs: object
+    ) -> UserData | None:
+        """Get user or return None, without blocking on API-key lookups."""
+        return await get_usso(raise_exception=False).usso_access_security_async(request)
 
     def config_schemas(self, schema: type, **kwargs: object) -> None:
         """Configure request/response schemas."""
@@ -84,7 +90,7 @@ class PurchaseRouter(usso_routes.AbstractTenantUSSORouter):
         user = await self.get_user(request)
         item: Purchase = await self.get_item(uid, tenant_id=user.tenant_id)
         if user.user_id:
-            async with AccountingClient(user.tenant_id) as client:
+            async with accounting_client(user.tenant_id) as client:
                 owner_id = user.workspace_id or user.user_id
                 wallets = await get_wallets(client, owner_id)
         else:
@@ -151,11 +157,20 @@ class PurchaseRouter(usso_routes.AbstractTenantUSSORouter):
         amount: Decimal | None = None,
     ) -> RedirectUrlSchema:
         """Get purchase start URL."""
-        user = self.get_user_or_none(request)
+        user = await self.get_user_or_none(request)
         item: Purchase = await self.model.get_by_uid(uid)
 
         if ipg is None:
-            ipg = item.available_ipgs[0]
+            ipg = ipg_router.choose(item.available_ipgs)
+        if ipg is None:
+            raise BadRequestError(
+                error_code="no_ipg_available",
+                detail="No payment gateway is available for this purchase",
+                message={
+                    "en": "No payment gateway is available",
+                    "fa": "درگاه پرداختی در دسترس نیست",
+                },
+            )
 
         start_data = await start_purchase(
             purchase=item,
@@ -198,8 +213,6 @@ class PurchaseRouter(usso_routes.AbstractTenantUSSORouter):
     ) -> RedirectResponse:
         """Verify purchase and redirect."""
         item: Purchase = await self.model.get_by_uid(uid)
-        purchase_status = item.status
-
         purchase: Purchase = await verify_purchase(
             tenant_id=item.tenant_id, purchase=item
         )
@@ -207,17 +220,6 @@ class PurchaseRouter(usso_routes.AbstractTenantUSSORouter):
             purchase.callback_url,
             {"purchase_id": purchase.uid, "status": purchase.status.value},
         )
-
-        if purchase.status == PurchaseStatus.PENDING:
-            return RedirectResponse(url=purchase_redirect_url, status_code=303)
-            # return proper response
-            return purchase
-        if purchase.status == PurchaseStatus.SUCCESS:
-            if purchase_status == PurchaseStatus.PENDING:
-                await create_proposal(purchase)
-            else:
-                logging.info("purchase was not pending %s", purchase_status)
-
         return RedirectResponse(url=purchase_redirect_url, status_code=303)
 
 
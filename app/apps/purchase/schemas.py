@@ -92,6 +92,7 @@ class PurchaseSchema(PurchaseCreateSchema, TenantUserEntitySchema):
     status: PurchaseStatus = PurchaseStatus.INIT
     tries: dict[str, PaymentSchema] = Field(default_factory=dict)
     verified_at: datetime | None = None
+    proposal_id: str | None = None
 
     original_amount: Decimal = Decimal(0)
 
@@ -4,21 +4,30 @@ import asyncio
 import logging
 from decimal import Decimal
 
-from fastapi_mongo_base.errors import PaymentRequiredError
-from ufaas.proposal import ProposalSchema
+from fastapi_mongo_base.errors import BadRequestError, PaymentRequiredError
+from ufaas.proposal import Participant, ProposalCreateSchema, ProposalSchema
 from ufaas.services import AccountingClient
 
+from apps.outbox.models import OutboxMessage
+from apps.outbox.schemas import OutboxKind
+from apps.outbox.services import enqueue, outbox_handler
 from apps.tenant.models import Tenant
 from server.config import Settings
+from utils.accounting import accounting_client
 from utils.ipg import (
     IPGPaymentSchema,
     PaymentSchema,
     PaymentStatus,
+    call_ipg,
     create_payment,
     get_payment_ipg_url,
+    ipg_timeout,
 )
+from utils.ipg_routing import ipg_router
+from utils.tracing import annotate, traced
 
 from .models import Purchase
+from .schemas import PurchaseStatus
 
 
 async def purchases_options(purchase: Purchase) -> list[str]:
@@ -27,6 +36,7 @@ async def purchases_options(purchase: Purchase) -> list[str]:
     return tenant.ipgs
 
 
+@traced("purchase.start")
 async def start_purchase(
     purchase: Purchase,
     tenant_id: str,
@@ -38,6 +48,7 @@ async def start_purchase(
     **kwargs: object,
 ) -> dict:
     """Start a purchase with the given IPG."""
+    annotate(purchase_uid=purchase.uid, basket_uid=purchase.basket_id, ipg=ipg)
     if purchase.is_overdue():
         await purchase.fail("Purchase is overdue")
         return {
@@ -97,20 +108,36 @@ async def verify_payment(
         payment_trials.uid,
     ])
 
-    response = await client.get(url=url)
-    response.raise_for_status()
-    payment = PaymentSchema(**response.json(), ipg=payment_trials.ipg)
+    response = await call_ipg(
+        payment_trials.ipg,
+        lambda: client.get(url=url, timeout=ipg_timeout()),
+        idempotent=True,
+    )
+    payment = PaymentSchema(**(response.json() | {"ipg": payment_trials.ipg}))
+    if not payment.status.is_open():
+        ipg_router.get_stats(payment.ipg).record_payment(
+            success=payment.status == PaymentStatus.SUCCESS
+        )
     return payment.status
 
 
+@traced("purchase.verify")
 async def verify_purchase(
     tenant_id: str, purchase: Purchase, **kwargs: object
 ) -> Purchase:
-    """Verify purchase payments."""
+    """
+    Verify purchase payments, recording the proposal of a new success.
+
+    The proposal is enqueued before the success is saved, so a failure in
+    between leaves the purchase pending and a retried verify records both.
+    """
+    annotate(purchase_uid=purchase.uid, basket_uid=purchase.basket_id)
     if purchase.amount == 0:
         return await purchase.success(None)
 
-    async with AccountingClient(tenant_id) as client:
+    previous_status = purchase.status
+
+    async with accounting_client(tenant_id) as client:
         await client.get_token("read:finance/ipg/payment")
 
         payment_statuses = await asyncio.gather(*[
@@ -126,17 +153,27 @@ async def verify_purchase(
         elif payment_status == PaymentStatus.FAILED:
             await purchase.fail_purchase(payment_trial.uid, save=False)
 
+    annotate(status=purchase.status)
+    if previous_status == PurchaseStatus.PENDING and purchase.is_successful:
+        await enqueue(
+            tenant_id=purchase.tenant_id,
+            kind=OutboxKind.proposal,
+            dedup_key=f"proposal:{purchase.uid}",
+            payload={"purchase_uid": purchase.uid},
+        )
     return await purchase.save()
 
 
+@traced("purchase.create_proposal")
 async def create_proposal(purchase: Purchase) -> ProposalSchema | None:
     """Create a proposal for a successful purchase."""
+    annotate(purchase_uid=purchase.uid, basket_uid=purchase.basket_id)
     tenant_id = purchase.tenant_id
 
     if purchase.amount == 0:
         return
 
-    async with AccountingClient(tenant_id) as client:
+    async with accounting_client(tenant_id) as client:
         wallet = await client.get_wallet(purchase.wallet_id)
 
         balance = wallet.balance.get(purchase.currency)
@@ -168,11 +205,52 @@ async def create_proposal(purchase: Purchase) -> ProposalSchema | None:
 
         tenant = await Tenant.find_one({"tenant_id": purchase.tenant_id})
 
-        proposal = await client.create_proposal(
-            from_wallet_id=purchase.wallet_id,
-            to_wallet_id=tenant.wallet_id,
-            currency=purchase.currency,
-            amount=purchase.amount,
-            description=purchase.description,
+        # AccountingClient.create_proposal takes no idempotency key.
+        await client.get_token("create:finance/accounting/proposal")
+        response = await client.post(
+            "/proposals",
+            json=ProposalCreateSchema(
+                participants=[
+                    Participant(wallet_id=purchase.wallet_id, amount=-purchase.amount),
+                    Participant(wallet_id=tenant.wallet_id, amount=purchase.amount),
+                ],
+                amount=purchase.amount,
+                currency=purchase.currency,
+                description=purchase.description,
+            ).model_dump(mode="json"),
+            headers={"Idempotency-Key": f"proposal:{purchase.uid}"},
+        )
+        response.raise_for_status()
+    return ProposalSchema.model_validate_json(response.content)
+
+
+@outbox_handler(OutboxKind.proposal)
+async def propose_purchase(message: OutboxMessage) -> None:
+    """
+    Move the funds of a successful purchase to the tenant wallet.
+
+    Delivery is at least once: the proposal is created under an idempotency
+    key of the purchase, and its id is recorded so a later redelivery does
+    not even call accounting. A purchase still pending is retried later.
+    """
+    purchase = await Purchase.get_by_uid(message.payload["purchase_uid"])
+    if purchase is None:
+        logging.warning("Dropping %s: purchase not found", message.dedup_key)
+        return
+    if purchase.proposal_id:
+        return
+    if purchase.status not in {PurchaseStatus.PENDING, PurchaseStatus.SUCCESS}:
+        logging.warning("Dropping %s: purchase %s", message.dedup_key, purchase.status)
+        return
+    if not purchase.is_successful:
+        raise BadRequestError(
+            error_code="invalid_payment",
+            detail="Payment is not successful",
+            message={
+                "en": "Payment is not successful",
+                "fa": "پرداخت موفق نیست",
+            },
         )
-    return proposal
+    proposal = await create_proposal(purchase)
+    if proposal is not None:
+        await purchase.set({"proposal_id": proposal.uid})
@@ -3,10 +3,12 @@
 from fastapi import Request
 from fastapi_mongo_base.utils import usso_routes
 
+from utils.usso import USSOUserMixin
+
 from . import models, schemas
 
 
-class TenantRouter(usso_routes.AbstractTenantUSSORouter):
+class TenantRouter(USSOUserMixin, usso_routes.AbstractTenantUSSORouter):
     """Router for tenant endpoints."""
 
     model = models.Tenant
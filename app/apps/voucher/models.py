@@ -1,15 +1,107 @@
 """Voucher models."""
 
-from typing import Self
+from datetime import datetime
+from typing import ClassVar, Self
 
+from beanie import UpdateResponse
 from fastapi_mongo_base.models import TenantUserEntity
+from fastapi_mongo_base.utils import timezone
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError
 
-from .schemas import VoucherSchema, VoucherStatus
+from utils.pagination import keyset_index
+
+from .schemas import (
+    RedemptionStatus,
+    VoucherRedemptionSchema,
+    VoucherSchema,
+    VoucherStatus,
+)
+
+
+class VoucherRedemption(VoucherRedemptionSchema, TenantUserEntity):
+    """Voucher redemption ledger entry, unique per (voucher, user, basket)."""
+
+    class Settings(TenantUserEntity.Settings):
+        """Beanie settings with the redemption key and count indexes."""
+
+        indexes: ClassVar[list[IndexModel]] = [
+            *TenantUserEntity.Settings.indexes,
+            IndexModel(
+                [
+                    ("voucher_id", ASCENDING),
+                    ("user_id", ASCENDING),
+                    ("basket_id", ASCENDING),
+                ],
+                unique=True,
+            ),
+            IndexModel([
+                ("voucher_id", ASCENDING),
+                ("status", ASCENDING),
+                ("user_id", ASCENDING),
+            ]),
+        ]
+
+    @classmethod
+    async def claim(cls, voucher: "Voucher", user_id: str, basket_id: str) -> bool:
+        """Mark a redemption redeemed; return False when it already was."""
+        key = {"voucher_id": voucher.uid, "user_id": user_id, "basket_id": basket_id}
+        on_insert = cls(tenant_id=voucher.tenant_id, code=voucher.code, **key)
+        try:
+            before = await cls.find_one(key).update(
+                {
+                    "$set": {
+                        "status": RedemptionStatus.REDEEMED,
+                        "updated_at": datetime.now(timezone.tz),
+                    },
+                    "$setOnInsert": on_insert.model_dump(
+                        exclude={*key, "id", "status", "updated_at"}
+                    ),
+                },
+                upsert=True,
+                response_type=UpdateResponse.OLD_DOCUMENT,
+            )
+        except DuplicateKeyError:
+            # A concurrent claim of the same key inserted it first.
+            return False
+        return before is None or before.status != RedemptionStatus.REDEEMED
+
+    @classmethod
+    async def release(cls, voucher_id: str, user_id: str, basket_id: str) -> bool:
+        """Release a redemption; return False when it was not redeemed."""
+        result = await cls.find_one({
+            "voucher_id": voucher_id,
+            "user_id": user_id,
+            "basket_id": basket_id,
+            "status": RedemptionStatus.REDEEMED,
+        }).update({
+            "$set": {
+                "status": RedemptionStatus.RELEASED,
+                "updated_at": datetime.now(timezone.tz),
+            }
+        })
+        return bool(result.modified_count)
+
+    @classmethod
+    async def count_redeemed(cls, voucher_id: str, user_id: str | None = None) -> int:
+        """Count active redemptions of a voucher, optionally for one user."""
+        query = {"voucher_id": voucher_id, "status": RedemptionStatus.REDEEMED}
+        if user_id:
+            query["user_id"] = user_id
+        return await cls.find(query).count()
 
 
 class Voucher(VoucherSchema, TenantUserEntity):
     """Voucher model."""
 
+    class Settings(TenantUserEntity.Settings):
+        """Beanie settings."""
+
+        indexes: ClassVar[list[IndexModel]] = [
+            *TenantUserEntity.Settings.indexes,
+            keyset_index(),
+        ]
+
     @classmethod
     async def get_by_code(
         cls, tenant_id: str, code: str, user_id: str | None = None
@@ -21,3 +113,43 @@ class Voucher(VoucherSchema, TenantUserEntity):
         if user_id:
             base_query["$or"] = [{"user_id": user_id}, {"user_id": None}]
         return await cls.find_one(base_query)
+
+    async def redeem(self, user_id: str, basket_id: str) -> bool:
+        """
+        Redeem the voucher for a basket unless a usage limit is reached.
+
+        The ledger entry is claimed first, so a replay never counts twice.
+        The global limit is a conditional increment of ``redeemed`` and the
+        per-user limit a recount; exceeding either undoes the claim.
+        """
+        if not await VoucherRedemption.claim(self, user_id, basket_id):
+            return True
+        query = {"uid": self.uid}
+        if self.max_uses:
+            query["redeemed"] = {"$lt": self.max_uses}
+        if not await self._add_redeemed(query, 1):
+            await VoucherRedemption.release(self.uid, user_id, basket_id)
+            return False
+        if self.max_uses_per_user:
+            used = await VoucherRedemption.count_redeemed(self.uid, user_id)
+            if used > self.max_uses_per_user:
+                await self.release(user_id, basket_id)
+                return False
+        return True
+
+    async def release(self, user_id: str, basket_id: str) -> Self:
+        """Release the voucher from a basket and decrement the counter."""
+        if await VoucherRedemption.release(self.uid, user_id, basket_id):
+            await self._add_redeemed({"uid": self.uid}, -1)
+        return self
+
+    async def _add_redeemed(self, query: dict, delta: int) -> bool:
+        """Atomically add to ``redeemed`` where ``query`` matches."""
+        voucher = await Voucher.find_one(query).update(
+            {"$inc": {"redeemed": delta}},
+            response_type=UpdateResponse.NEW_DOCUMENT,
+        )
+        if voucher is None:
+            return False
+        self.redeemed = voucher.redeemed
+        return True
@@ -7,12 +7,16 @@ from fastapi_mongo_base.schemas import PaginatedResponse
 from fastapi_mongo_base.utils import usso_routes
 
 from server.config import Settings
+from utils.pagination import CursorPaginationMixin, PaginationMode
+from utils.usso import USSOUserMixin
 
 from .models import Voucher
 from .schemas import VoucherCreateSchema, VoucherSchema, VoucherUpdateSchema
 
 
-class VoucherRouter(usso_routes.AbstractTenantUSSORouter):
+class VoucherRouter(
+    USSOUserMixin, CursorPaginationMixin, usso_routes.AbstractTenantUSSORouter
+):
     """Router for voucher endpoints."""
 
     model = Voucher
@@ -25,9 +29,23 @@ class VoucherRouter(usso_routes.AbstractTenantUSSORouter):
         limit: int = Query(10, ge=0, le=Settings.page_max_limit),
         created_at_from: datetime | None = None,
         created_at_to: datetime | None = None,
+        pagination: PaginationMode = PaginationMode.offset,
+        cursor: str | None = None,
+        with_total: bool = False,
     ) -> PaginatedResponse[VoucherSchema]:
         """List vouchers with pagination and date filtering."""
         user = await self.get_user(request)
+        if pagination == PaginationMode.cursor or cursor:
+            return await self._cursor_list_items(
+                request,
+                cursor=cursor,
+                limit=limit,
+                with_total=with_total,
+                user=user,
+                user_id=user.user_id,
+                created_at_from=created_at_from,
+                created_at_to=created_at_to,
+            )
         return await self._list_items(
             request=request,
             offset=offset,
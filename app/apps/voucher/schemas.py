@@ -5,7 +5,7 @@ from datetime import datetime
 from decimal import Decimal
 from enum import StrEnum
 
-from fastapi_mongo_base.schemas import TenantScopedEntitySchema
+from fastapi_mongo_base.schemas import TenantScopedEntitySchema, TenantUserEntitySchema
 from fastapi_mongo_base.utils import bsontools
 from pydantic import BaseModel, Field, field_validator
 from ufaas.enums import Currency
@@ -46,6 +46,9 @@ class VoucherCreateSchema(BaseModel):
     max_uses: int | None = Field(
         default=None, ge=1, description="Maximum number of uses"
     )
+    max_uses_per_user: int | None = Field(
+        default=None, ge=1, description="Maximum number of uses per user"
+    )
     user_id: str | None = None
     limited_products: list[str] | None = None
     meta_data: dict | None = None
@@ -83,5 +86,23 @@ class VoucherSchema(VoucherCreateSchema, TenantScopedEntitySchema):
     """Voucher schema with entity and redemption fields."""
 
     redeemed: int = Field(
-        default=0, ge=0, description="Number of times the voucher has been used"
+        default=0,
+        ge=0,
+        description="Number of times the voucher has been used (ledger derived)",
     )
+
+
+class RedemptionStatus(StrEnum):
+    """Voucher redemption status options."""
+
+    REDEEMED = "redeemed"
+    RELEASED = "released"
+
+
+class VoucherRedemptionSchema(TenantUserEntitySchema):
+    """Schema for a voucher redemption ledger entry."""
+
+    voucher_id: str
+    code: str
+    basket_id: str
+    status: RedemptionStatus = RedemptionStatus.REDEEMED
@@ -0,0 +1 @@
+"""Benchmarks guarding throughput and latency: ``python -m benchmarks --help``."""
@@ -0,0 +1,124 @@
+"""
+Run a benchmark and compare it with its stored baseline.
+
+``python -m benchmarks checkout [--users 20] [--check]`` load tests the
+checkout flow; ``python -m benchmarks schemas [--cases basket_detail]``
+times schema validation and serialization.
+
+Baselines depend on the machine, so none are committed. Record one on
+the machine that will run the comparisons, from the commit to compare
+against, with the same arguments as the later runs::
+
+    python -m benchmarks checkout --users 20 --update-baseline
+
+It is written to ``benchmarks/baselines/checkout.json`` (or ``--baseline``)
+and later runs, e.g. ``python -m benchmarks checkout --users 20 --check``,
+report regressions against it. ``--check`` without a baseline fails
+rather than passing silently, so a CI job records one in the same run,
+e.g. from ``git merge-base HEAD origin/main`` checked out in a worktree,
+before checking the change.
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+from .stats import (
+    BASELINES_DIR,
+    format_table,
+    load_baseline,
+    regressions,
+    save_baseline,
+)
+
+
+def checkout(args: argparse.Namespace) -> list:
+    """Run the end-to-end checkout load test."""
+    from .checkout import run_checkout_benchmark
+
+    logging.getLogger().setLevel(logging.WARNING)
+    return asyncio.run(
+        run_checkout_benchmark(
+            users=args.users,
+            journeys=args.journeys,
+            items=args.items,
+            fake_latency=args.fake_latency,
+            mongo_uri=args.mongo_uri,
+        )
+    )
+
+
+def schemas(args: argparse.Namespace) -> list:
+    """Time schema validation and serialization hot paths."""
+    from .schemas import run_schema_benchmarks
+
+    return run_schema_benchmarks(
+        cases=args.cases.split(",") if args.cases else None,
+        sizes=tuple(int(size) for size in args.sizes.split(",")),
+        repeat=args.repeat,
+    )
+
+
+def main() -> None:
+    """Parse arguments, run, report and compare with the baseline."""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--baseline", type=Path, help="Baseline file (default: baselines/<name>.json)"
+    )
+    common.add_argument(
+        "--check",
+        action="store_true",
+        help="Exit non-zero when results regress past the baseline",
+    )
+    common.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.0,
+        help="Allowed relative slowdown; the default tolerates 2x p95 latency",
+    )
+    common.add_argument(
+        "--update-baseline", action="store_true", help="Store results as baseline"
+    )
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="name", required=True)
+
+    load = commands.add_parser("checkout", parents=[common], help=checkout.__doc__)
+    load.set_defaults(run=checkout)
+    load.add_argument("--users", type=int, default=10, help="Concurrent users")
+    load.add_argument("--journeys", type=int, default=5, help="Checkouts per user")
+    load.add_argument("--items", type=int, default=3, help="Products per basket")
+    load.add_argument(
+        "--fake-latency", default="fixed:0", help="Latency of the fake services"
+    )
+    load.add_argument("--mongo-uri", help="Local Mongo to use instead of mongomock")
+
+    micro = commands.add_parser("schemas", parents=[common], help=schemas.__doc__)
+    micro.set_defaults(run=schemas)
+    micro.add_argument("--cases", help="Comma separated cases (default: all)")
+    micro.add_argument("--sizes", default="1,10,100", help="Comma separated sizes")
+    micro.add_argument("--repeat", type=int, default=20, help="Samples per case")
+
+    args = parser.parse_args()
+    results = args.run(args)
+    print(format_table(results))  # ruff:ignore[print]
+
+    path = args.baseline or BASELINES_DIR / f"{args.name}.json"
+    if args.update_baseline:
+        save_baseline(path, results)
+        return
+    baseline = load_baseline(path)
+    if not baseline:
+        print(f"\nNo baseline at {path}; record one with --update-baseline")  # ruff:ignore[print]
+        if args.check:
+            sys.exit(1)
+        return
+    if found := regressions(results, baseline, args.tolerance):
+        print(f"\nRegressions against {path}:", *found, sep="\n  ")  # ruff:ignore[print]
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+End-to-end checkout load test.
+
+Virtual users drive the ASGI app through create basket, add items, apply
+voucher, checkout, start, verify and validate. External services are the
+fakes, served on a loopback port so the shop's clients make real HTTP
+calls; Mongo is mongomock unless a URI is given.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from collections.abc import Awaitable, Generator
+from contextlib import contextmanager
+from decimal import Decimal
+
+import httpx
+import uvicorn
+from fastapi_mongo_base.db.mongo import init_mongo_db
+
+from apps.product.models import Product
+from apps.tenant.models import Tenant
+from apps.voucher.models import Voucher
+from fakes import create_fake_app, fake_env
+from fakes.behavior import LatencyModel, ServiceBehavior
+from fakes.mongo import init_mock_db
+from server.config import Settings
+from server.server import app
+from utils import ratelimit
+from utils.usso import get_usso
+
+from .stats import StepResult
+
+STEPS = (
+    "create_basket",
+    "add_item",
+    "apply_voucher",
+    "checkout",
+    "start",
+    "verify",
+    "validate",
+)
+TENANT_ID = "benchmark"
+IPG = "zarinpal"
+VOUCHER_CODE = "BENCH10"
+CALLBACK_URL = "https://client.example/checkout/done"
+
+
+class StepFailedError(Exception):
+    """A step answered with an unexpected status; the journey stops."""
+
+
+@contextmanager
+def serve_fakes(latency: str) -> Generator[str]:
+    """Serve the fake services on a free loopback port; yield their URL."""
+    behavior = ServiceBehavior(LatencyModel.parse(latency))
+    app = create_fake_app(
+        payment_success_rate=1,
+        behaviors=dict.fromkeys(["ipg", "accounting", "saas", "usso"], behavior),
+    )
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", lifespan="off"))
+    thread = threading.Thread(
+        target=server.run, kwargs={"sockets": [sock]}, daemon=True
+    )
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{sock.getsockname()[1]}"
+    finally:
+        server.should_exit = True
+        thread.join()
+        sock.close()
+
+
+def configure(fakes_url: str) -> None:
+    """
+    Point the shop at the fakes and lift admission limits.
+
+    Every virtual user belongs to one tenant, so per-tenant limits would
+    measure the limiter instead of the service.
+    """
+    os.environ.update(fake_env(fakes_url))
+    Settings.ipg_base_url = fakes_url
+    Settings.saas_base_url = fakes_url
+    Settings.rate_limit_rate = 0
+    Settings.rate_limit_concurrency = ""
+    ratelimit.route_concurrency.cache_clear()
+    get_usso.cache_clear()
+
+
+async def init_database(mongo_uri: str | None) -> None:
+    """Initialize Beanie on ``mongo_uri``, or on mongomock when not given."""
+    if mongo_uri:
+        Settings.mongo_uri = mongo_uri
+        Settings.project_name = f"{Settings.project_name}_benchmark"
+        _, client = await init_mongo_db(Settings())
+        await client.drop_database(Settings.project_name)
+        await init_mongo_db(Settings())
+        return
+
+    from mongomock_motor import AsyncMongoMockClient
+
+    await init_mock_db(AsyncMongoMockClient().get_database("benchmark"))
+
+
+async def seed(items: int) -> list[str]:
+    """Create the tenant, a voucher and ``items`` products; return product uids."""
+    await Tenant(
+        tenant_id=TENANT_ID, name="Benchmark", ipgs=[IPG], wallet_id="benchmark"
+    ).save()
+    await Voucher(
+        tenant_id=TENANT_ID, user_id=None, code=VOUCHER_CODE, rate=Decimal(10)
+    ).save()
+    products = [
+        await Product(
+            tenant_id=TENANT_ID,
+            user_id="merchant",
+            name=f"Product {index}",
+            unit_price=Decimal(10_000 + index),
+            plan_duration=30,
+            bundles=[{"asset": "coin", "quota": 100}],
+        ).save()
+        for index in range(items)
+    ]
+    return [product.uid for product in products]
+
+
+class Recorder:
+    """Latencies and failures per step."""
+
+    def __init__(self) -> None:
+        """Start with no samples."""
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.errors: Counter[str] = Counter()
+
+    async def step(
+        self,
+        name: str,
+        request: Awaitable[httpx.Response],
+        expected: int | None = None,
+    ) -> httpx.Response:
+        """Time one request, failing the journey on an unexpected status."""
+        start = time.perf_counter()
+        response = await request
+        elapsed = time.perf_counter() - start
+        if not (response.status_code == expected if expected else response.is_success):
+            self.errors[name] += 1
+            raise StepFailedError(f"{name}: {response.status_code} {response.text}")
+        self.samples[name].append(elapsed)
+        return response
+
+    def results(self, elapsed: float) -> list[StepResult]:
+        """Summarize every step over the run's wall time."""
+        return [
+            StepResult.from_samples(
+                name, self.samples[name], self.errors[name], elapsed
+            )
+            for name in STEPS
+        ]
+
+
+async def journey(
+    shop: httpx.AsyncClient,
+    gateway: httpx.AsyncClient,
+    recorder: Recorder,
+    products: list[str],
+) -> None:
+    """Buy ``products`` as a new user, paying at the fake gateway."""
+    headers = {"x-api-key": f"{TENANT_ID}:user-{uuid.uuid4().hex[:12]}"}
+    basket = await recorder.step(
+        "create_basket",
+        shop.post("/baskets", json={"callback_url": CALLBACK_URL}, headers=headers),
+    )
+    basket_uid = basket.json()["uid"]
+    for product_uid in products:
+        await recorder.step(
+            "add_item",
+            shop.post(
+                f"/baskets/{basket_uid}/items",
+                json={"uid": product_uid},
+                headers=headers,
+            ),
+        )
+    await recorder.step(
+        "apply_voucher",
+        shop.patch(
+            f"/baskets/{basket_uid}",
+            json={"voucher": {"code": VOUCHER_CODE}},
+            headers=headers,
+        ),
+    )
+    checkout = await recorder.step(
+        "checkout", shop.post(f"/baskets/{basket_uid}/checkout", headers=headers)
+    )
+    purchase_uid = checkout.json()["redirect_url"].split("/purchases/")[1]
+    purchase_uid = purchase_uid.split("/")[0]
+    start = await recorder.step(
+        "start", shop.post(f"/purchases/{purchase_uid}/start", headers=headers)
+    )
+    paid = await gateway.get(start.json()["redirect_url"])
+    if paid.status_code != 303:
+        raise StepFailedError(f"payment: {paid.status_code} {paid.text}")
+    await recorder.step(
+        "verify", shop.get(f"/purchases/{purchase_uid}/verify"), expected=303
+    )
+    await recorder.step(
+        "validate", shop.get(f"/baskets/{basket_uid}/validate"), expected=307
+    )
+
+
+async def run_checkout_benchmark(
+    *,
+    users: int = 10,
+    journeys: int = 5,
+    items: int = 3,
+    fake_latency: str = "fixed:0",
+    mongo_uri: str | None = None,
+) -> list[StepResult]:
+    """
+    Run ``users`` concurrent users through ``journeys`` checkouts each.
+
+    One untimed journey warms up caches (USSO keys, wallets, snapshots)
+    before the measured run.
+    """
+    with serve_fakes(fake_latency) as fakes_url:
+        configure(fakes_url)
+        await init_database(mongo_uri)
+        products = await seed(items)
+
+        async with (
+            httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),
+                base_url=f"https://benchmark{Settings.base_path}",
+                timeout=60,
+            ) as shop,
+            httpx.AsyncClient(timeout=60) as gateway,
+        ):
+            await journey(shop, gateway, Recorder(), products)
+
+            recorder = Recorder()
+
+            async def virtual_user() -> None:
+                for _ in range(journeys):
+                    try:
+                        await journey(shop, gateway, recorder, products)
+                    except StepFailedError:
+                        logging.exception("Checkout journey failed")
+
+            start = time.perf_counter()
+            await asyncio.gather(*[virtual_user() for _ in range(users)])
+            return recorder.results(time.perf_counter() - start)
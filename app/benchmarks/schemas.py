@@ -0,0 +1,242 @@
+"""
+Micro-benchmarks of schema validation and serialization hot paths.
+
+Payloads look like what Mongo hands back (``Decimal128`` amounts, naive
+datetimes) and come in sizes of 1, 10 and 100 items, lines or bundles.
+"""
+
+import time
+import uuid
+from collections.abc import Callable, Coroutine
+from datetime import UTC, datetime
+
+from bson import Decimal128
+from fastapi_mongo_base.utils.bsontools import decimal_amount
+from pydantic import TypeAdapter
+
+from apps.basket.models import Basket
+from apps.basket.schemas import BasketDataSchema, BasketLineSchema
+from apps.product.models import ProductSnapshot
+from apps.product.schemas import ProductSchema, ProductSnapshotSchema
+from apps.purchase.schemas import PurchaseSchema
+from apps.voucher.schemas import VoucherSchema
+from utils.saas import EnrollmentCreateSchema
+
+from .stats import StepResult
+
+SIZES = (1, 10, 100)
+NOW = datetime.now(UTC).replace(tzinfo=None)
+
+type Case = Callable[[int], Callable[[], object]]
+
+
+def _uid() -> str:
+    return str(uuid.uuid4())
+
+
+def _entity(**fields: object) -> dict:
+    """Fields every stored tenant/user entity carries."""
+    return {
+        "uid": _uid(),
+        "created_at": NOW,
+        "updated_at": NOW,
+        "is_deleted": False,
+        "tenant_id": "bench",
+        "user_id": "user",
+        **fields,
+    }
+
+
+def _bundles(size: int) -> list[dict]:
+    return [
+        {"asset": f"asset-{index}", "quota": Decimal128(f"{100 + index}.5")}
+        for index in range(size)
+    ]
+
+
+def _run[R](coro: Coroutine[object, object, R]) -> R:
+    """Run a coroutine that never suspends, e.g. one served from caches."""
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coro.close()
+    raise RuntimeError("benchmarked coroutine tried to do I/O")
+
+
+def _basket(size: int) -> Basket:
+    """
+    Build a basket with ``size`` lines as Beanie loads it, snapshots cached.
+
+    Fields are validated once like a loaded document, then set without the
+    database Beanie would need to build the model.
+    """
+    lines = {}
+    for index in range(size):
+        snapshot = ProductSnapshotSchema.model_validate(
+            _entity(
+                product_uid=_uid(),
+                name=f"Product {index}",
+                unit_price=Decimal128(f"{10_000 + index}.25"),
+                plan_duration=30,
+                bundles=_bundles(1),
+            )
+        )
+        ProductSnapshot._remember(ProductSnapshot.model_construct(**dict(snapshot)))
+        lines[_uid()] = BasketLineSchema(
+            uid=snapshot.product_uid,
+            snapshot_id=snapshot.uid,
+            unit_price=snapshot.unit_price,
+            quantity=Decimal128("2"),
+            currency=snapshot.currency,
+        )
+    data = BasketDataSchema.model_validate(
+        _entity(
+            status="active",
+            callback_url="https://client.example/done",
+            discount={
+                "code": "BENCH10",
+                "user_id": "user",
+                "discount": Decimal128("10"),
+            },
+        )
+    )
+    return Basket.model_construct(**dict(data), items=lines)
+
+
+def basket_detail(size: int) -> Callable[[], object]:
+    """Build the detail of a basket with ``size`` lines, as its routes do."""
+    basket = _basket(size)
+    return lambda: _run(basket.get_detail())
+
+
+def basket_detail_json(size: int) -> Callable[[], object]:
+    """Serialize a basket detail with ``size`` lines to a JSON response body."""
+    return _run(_basket(size).get_detail()).model_dump_json
+
+
+def decimal_amounts(size: int) -> Callable[[], object]:
+    """Run ``decimal_amount`` over ``size`` of each input type it converts."""
+    values = [Decimal128("12.5"), "12.5", 12, 12.5] * size
+    return lambda: [decimal_amount(value) for value in values]
+
+
+def product_list(size: int) -> Callable[[], object]:
+    """Validate a page of ``size`` stored products."""
+    adapter = TypeAdapter(list[ProductSchema])
+    docs = [
+        _entity(
+            name=f"Product {index}",
+            unit_price=Decimal128(f"{10_000 + index}.25"),
+            stock_quantity=Decimal128("100"),
+            plan_duration=30,
+            bundles=_bundles(2),
+        )
+        for index in range(size)
+    ]
+    return lambda: adapter.validate_python(docs)
+
+
+def voucher_list(size: int) -> Callable[[], object]:
+    """Validate a page of ``size`` stored vouchers."""
+    adapter = TypeAdapter(list[VoucherSchema])
+    docs = [
+        _entity(code=f"CODE{index}", rate=Decimal128("10"), cap=Decimal128("50000"))
+        for index in range(size)
+    ]
+    return lambda: adapter.validate_python(docs)
+
+
+def purchase_tries(size: int) -> Callable[[], object]:
+    """Validate a stored purchase holding ``size`` payment tries."""
+    tries = {
+        (uid := _uid()): {
+            "uid": uid,
+            "created_at": NOW,
+            "updated_at": NOW,
+            "ipg": "zarinpal",
+            "user_id": "user",
+            "status": "FAILED",
+        }
+        for _ in range(size)
+    }
+    doc = _entity(
+        wallet_id=_uid(),
+        basket_id=_uid(),
+        amount=Decimal128("900000.45"),
+        original_amount=Decimal128("1000000.5"),
+        description="basket",
+        callback_url="https://shop.example/api/shop/v1/baskets/b/validate",
+        available_ipgs=["zarinpal"],
+        status="PENDING",
+        tries=tries,
+    )
+    return lambda: PurchaseSchema.model_validate(doc)
+
+
+def enrollment_create(size: int) -> Callable[[], object]:
+    """Validate an enrollment request with ``size`` bundles."""
+    payload = {
+        "user_id": "user",
+        "bundles": [
+            {"asset": f"asset-{index}", "quota": f"{100 + index}.5"}
+            for index in range(size)
+        ],
+        "price": "10000.25",
+        "duration": 30,
+        "idempotency_key": f"{_uid()}:{_uid()}",
+    }
+    return lambda: EnrollmentCreateSchema.model_validate(payload)
+
+
+CASES: dict[str, Case] = {
+    "basket_detail": basket_detail,
+    "basket_detail_json": basket_detail_json,
+    "decimal_amount": decimal_amounts,
+    "product_list": product_list,
+    "voucher_list": voucher_list,
+    "purchase_tries": purchase_tries,
+    "enrollment_create": enrollment_create,
+}
+
+
+def measure(
+    name: str, func: Callable[[], object], repeat: int, min_time: float
+) -> StepResult:
+    """
+    Time ``func`` per call.
+
+    Calls are batched so each of the ``repeat`` samples lasts at least
+    ``min_time`` seconds; the result's throughput is calls per second.
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        if time.perf_counter() - start >= min_time:
+            break
+        loops *= 2
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - start) / loops)
+    return StepResult.from_samples(name, samples, 0, sum(samples))
+
+
+def run_schema_benchmarks(
+    *,
+    cases: list[str] | None = None,
+    sizes: tuple[int, ...] = SIZES,
+    repeat: int = 20,
+    min_time: float = 0.01,
+) -> list[StepResult]:
+    """Measure every case at every size, e.g. ``basket_detail[10]``."""
+    return [
+        measure(f"{case}[{size}]", CASES[case](size), repeat, min_time)
+        for case in cases or CASES
+        for size in sizes
+    ]
@@ -0,0 +1,104 @@
+"""Latency summaries, reports and baseline comparison."""
+
+import json
+import statistics
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+BASELINES_DIR = Path(__file__).resolve().parent / "baselines"
+
+
+@dataclass(frozen=True)
+class StepResult:
+    """Latency percentiles (in milliseconds) and throughput of one step."""
+
+    name: str
+    count: int
+    errors: int
+    p50: float
+    p95: float
+    p99: float
+    rps: float
+
+    @classmethod
+    def from_samples(
+        cls, name: str, samples: list[float], errors: int, elapsed: float
+    ) -> "StepResult":
+        """Summarize latencies in seconds of a step over ``elapsed`` seconds."""
+        if len(samples) > 1:
+            cuts = statistics.quantiles(samples, n=100, method="inclusive")
+            p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+        else:
+            p50 = p95 = p99 = samples[0] if samples else 0.0
+        return cls(
+            name=name,
+            count=len(samples),
+            errors=errors,
+            p50=round(p50 * 1000, 4),
+            p95=round(p95 * 1000, 4),
+            p99=round(p99 * 1000, 4),
+            rps=round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        )
+
+
+def error_rate(result: StepResult) -> float:
+    """Share of a step's requests that failed."""
+    return result.errors / max(result.count + result.errors, 1)
+
+
+def format_table(results: list[StepResult]) -> str:
+    """Render results as an aligned text table."""
+    header = f"{'step':<24}{'count':>8}{'errors':>8}"
+    header += f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>10}"
+    lines = [header]
+    lines.extend(
+        f"{r.name:<24}{r.count:>8}{r.errors:>8}"
+        f"{r.p50:>10.3f}{r.p95:>10.3f}{r.p99:>10.3f}{r.rps:>10.1f}"
+        for r in results
+    )
+    return "\n".join(lines)
+
+
+def load_baseline(path: Path) -> dict[str, StepResult]:
+    """Read stored results keyed by step name; empty when there are none."""
+    if not path.exists():
+        return {}
+    return {
+        item["name"]: StepResult(**item)
+        for item in json.loads(path.read_text(encoding="utf-8"))
+    }
+
+
+def save_baseline(path: Path, results: list[StepResult]) -> None:
+    """Store results as the new baseline."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        json.dumps([asdict(result) for result in results], indent=2) + "\n",
+        encoding="utf-8",
+    )
+
+
+def regressions(
+    results: list[StepResult],
+    baseline: dict[str, StepResult],
+    tolerance: float,
+) -> list[str]:
+    """
+    Describe every step that got worse than its baseline by more than ``tolerance``.
+
+    A step regresses when its p95 latency grows past ``baseline * (1 + tolerance)``,
+    when its throughput drops below ``baseline / (1 + tolerance)``, or when it
+    errors more often. Steps missing from the baseline are not compared.
+    """
+    found = []
+    for result in results:
+        before = baseline.get(result.name)
+        if before is None:
+            continue
+        if result.p95 > before.p95 * (1 + tolerance):
+            found.append(f"{result.name}: p95 {before.p95:.3f} -> {result.p95:.3f} ms")
+        if result.rps < before.rps / (1 + tolerance):
+            found.append(f"{result.name}: rps {before.rps:.1f} -> {result.rps:.1f}")
+        if error_rate(result) > error_rate(before):
+            found.append(f"{result.name}: errors {before.errors} -> {result.errors}")
+    return found
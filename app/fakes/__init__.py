@@ -0,0 +1,5 @@
+"""In-process stand-ins for the IPG, accounting, USSO and SaaS services."""
+
+from .server import create_fake_app, fake_env
+
+__all__ = ["create_fake_app", "fake_env"]
@@ -0,0 +1,31 @@
+"""Run the fake services: ``python -m fakes [--port 8900] [--print-env]``."""
+
+import argparse
+
+import uvicorn
+
+from .server import create_fake_app, fake_env
+
+
+def print_env(base_url: str) -> None:
+    """Print the variables that point the shop at the fakes."""
+    for name, value in fake_env(base_url).items():
+        print(f"{name}='{value}'" if "\n" in value else f"{name}={value}")  # ruff:ignore[print]
+
+
+def main() -> None:
+    """Parse arguments and serve."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--print-env", action="store_true")
+    args = parser.parse_args()
+
+    if args.print_env:
+        print_env(f"http://{args.host}:{args.port}")
+        return
+    uvicorn.run(create_fake_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
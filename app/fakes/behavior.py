@@ -0,0 +1,82 @@
+"""Latency and fault models for the fake services."""
+
+import asyncio
+import os
+import random
+from dataclasses import dataclass
+from enum import StrEnum
+
+from fastapi import HTTPException
+
+
+class Distribution(StrEnum):
+    """Supported latency distributions."""
+
+    fixed = "fixed"
+    uniform = "uniform"
+    lognormal = "lognormal"
+    exponential = "exponential"
+
+
+@dataclass(frozen=True)
+class LatencyModel:
+    """
+    Latency distribution in seconds, parsed from ``kind:a[,b]``.
+
+    ``fixed:x``, ``uniform:low,high``, ``lognormal:median,sigma`` and
+    ``exponential:mean`` are supported.
+    """
+
+    kind: Distribution = Distribution.fixed
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """Parse a ``kind:a[,b]`` spec."""
+        kind, _, params = spec.partition(":")
+        values = [float(value) for value in params.split(",") if value]
+        return cls(Distribution(kind), *values)
+
+    def sample(self) -> float:
+        """Draw one latency."""
+        match self.kind:
+            case Distribution.uniform:
+                delay = random.uniform(self.a, self.b)  # ruff:ignore[suspicious-non-cryptographic-random-usage]
+            case Distribution.lognormal:
+                delay = self.a * random.lognormvariate(0, self.b)
+            case Distribution.exponential:
+                delay = random.expovariate(1 / self.a) if self.a else 0.0
+            case _:
+                delay = self.a
+        return max(delay, 0.0)
+
+
+@dataclass(eq=False)
+class ServiceBehavior:
+    """Latency and injected error rate of one fake service."""
+
+    latency: LatencyModel
+    error_rate: float = 0.0
+    error_status: int = 503
+
+    @classmethod
+    def from_env(cls, service: str) -> "ServiceBehavior":
+        """Read ``FAKE_<SERVICE>_LATENCY`` and ``FAKE_<SERVICE>_ERROR_RATE``."""
+        prefix = f"FAKE_{service.upper()}_"
+        latency = os.getenv(f"{prefix}LATENCY") or os.getenv(
+            "FAKE_LATENCY", "lognormal:0.05,0.5"
+        )
+        return cls(
+            latency=LatencyModel.parse(latency),
+            error_rate=float(
+                os.getenv(f"{prefix}ERROR_RATE") or os.getenv("FAKE_ERROR_RATE", "0")
+            ),
+            error_status=int(os.getenv("FAKE_ERROR_STATUS", "503")),
+        )
+
+    async def __call__(self) -> None:
+        """Delay the request and maybe fail it; used as a route dependency."""
+        await asyncio.sleep(self.latency.sample())
+        if random.random() < self.error_rate:  # ruff:ignore[suspicious-non-cryptographic-random-usage]
+            raise HTTPException(self.error_status, "Injected fault")
@@ -0,0 +1,53 @@
+"""In-memory Mongo for tests and benchmarks, via mongomock."""
+
+from beanie import init_beanie
+from fastapi_mongo_base import models
+from fastapi_mongo_base.utils import basic
+
+
+def patch_mongomock() -> None:
+    """Close the gaps between mongomock and the PyMongo calls the app makes."""
+    from mongomock.collection import BulkOperationBuilder, Collection
+
+    add_update = BulkOperationBuilder.add_update
+
+    def add_update_without_sort(
+        self: BulkOperationBuilder, *args: object, sort: object = None, **kwargs: object
+    ) -> object:
+        # PyMongo 4.11+ passes ``sort`` to bulk updates.
+        return add_update(self, *args, **kwargs)
+
+    def create_indexes(
+        self: Collection, indexes: list, session: object = None
+    ) -> list[str]:
+        # mongomock drops every option but unique, sparse, TTL and name,
+        # losing partial filter expressions.
+        return [
+            self.create_index(
+                list(index.document["key"].items()),
+                session=session,
+                **{k: v for k, v in index.document.items() if k != "key"},
+            )
+            for index in indexes
+        ]
+
+    BulkOperationBuilder.add_update = add_update_without_sort
+    Collection.create_indexes = create_indexes
+
+
+async def init_mock_db(database: object) -> None:
+    """Initialize Beanie with every entity model on a mongomock database."""
+    patch_mongomock()
+    original_list_collection_names = database.list_collection_names
+
+    async def list_collection_names(*args: object, **kwargs: object) -> list[str]:
+        # Beanie 2 / PyMongo pass kwargs mongomock_motor does not accept.
+        kwargs.pop("authorizedCollections", None)
+        kwargs.pop("nameOnly", None)
+        return await original_list_collection_names(*args, **kwargs)
+
+    database.list_collection_names = list_collection_names
+    await init_beanie(
+        database=database,
+        document_models=basic.get_all_subclasses(models.BaseEntity),
+    )
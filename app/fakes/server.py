@@ -0,0 +1,280 @@
+"""Fake IPG, accounting, USSO and SaaS APIs sharing one ASGI app."""
+
+import os
+import random
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from fastapi import APIRouter, Depends, FastAPI, Header, HTTPException, Request
+from fastapi.responses import RedirectResponse
+from fastapi_mongo_base.utils import timezone
+from ufaas.enums import Currency as AccountingCurrency
+from ufaas.proposal import ProposalCreateSchema, ProposalSchema
+from ufaas.wallet import WalletDetailSchema
+
+from utils.ipg import IPGPaymentSchema, PaymentSchema, PaymentStatus
+from utils.saas import (
+    EnrollmentBatchCreateSchema,
+    EnrollmentBatchResultSchema,
+    EnrollmentCreateSchema,
+    EnrollmentResultSchema,
+    EnrollmentSchema,
+)
+from utils.texttools import add_query_params
+
+from .behavior import ServiceBehavior
+
+FAKE_TENANT = "fake"
+
+# Allowed payment state transitions, mirroring the real gateways.
+PAYMENT_TRANSITIONS: dict[PaymentStatus, set[PaymentStatus]] = {
+    PaymentStatus.INIT: {PaymentStatus.PENDING, PaymentStatus.FAILED},
+    PaymentStatus.PENDING: {PaymentStatus.SUCCESS, PaymentStatus.FAILED},
+    PaymentStatus.SUCCESS: {PaymentStatus.REFUNDED},
+    PaymentStatus.FAILED: set(),
+    PaymentStatus.REFUNDED: set(),
+}
+
+
+class FakeState:
+    """In-memory records of the fake services."""
+
+    def __init__(self, *, payment_success_rate: float, balance: Decimal) -> None:
+        """Start empty with the given outcome odds and wallet balance."""
+        self.payment_success_rate = payment_success_rate
+        self.balance = balance
+        self.payments: dict[str, PaymentSchema] = {}
+        self.callbacks: dict[str, str] = {}
+        self.wallets: dict[str, WalletDetailSchema] = {}
+        self.proposals: dict[str, ProposalSchema] = {}
+        self.proposal_keys: dict[str, str] = {}
+        self.enrollments: dict[str, EnrollmentSchema] = {}
+
+    def enroll(self, data: EnrollmentCreateSchema) -> EnrollmentSchema:
+        """Create an enrollment, or return the one made with the same key."""
+        for enrollment in self.enrollments.values():
+            if (
+                data.idempotency_key
+                and enrollment.idempotency_key == data.idempotency_key
+            ):
+                return enrollment
+        enrollment = EnrollmentSchema(tenant_id=FAKE_TENANT, **data.model_dump())
+        self.enrollments[enrollment.uid] = enrollment
+        return enrollment
+
+    def transition(self, uid: str, status: PaymentStatus) -> PaymentSchema:
+        """Move a payment along its state machine."""
+        payment = self.payments.get(uid)
+        if payment is None:
+            raise HTTPException(404, "Payment not found")
+        if status not in PAYMENT_TRANSITIONS[payment.status]:
+            raise HTTPException(409, f"Cannot go from {payment.status} to {status}")
+        payment.status = status
+        payment.updated_at = datetime.now(timezone.tz)
+        if status == PaymentStatus.SUCCESS:
+            payment.verified_at = payment.updated_at
+        return payment
+
+    def new_wallet(self, owner_id: str) -> WalletDetailSchema:
+        """Create a funded default wallet for an owner."""
+        wallet = WalletDetailSchema(
+            tenant_id=FAKE_TENANT,
+            workspace_id=owner_id,
+            balance={
+                currency: {
+                    "currency": currency,
+                    "total": self.balance,
+                    "held": 0,
+                    "available": self.balance,
+                }
+                for currency in AccountingCurrency
+            },
+        )
+        self.wallets[wallet.uid] = wallet
+        return wallet
+
+
+def ipg_router(state: FakeState, behavior: ServiceBehavior) -> APIRouter:
+    """Gateway API: create, start (pay) and read payments."""
+    router = APIRouter(
+        prefix="/api/{ipg}/v1/payments", dependencies=[Depends(behavior)]
+    )
+
+    @router.post("")
+    async def create_payment(ipg: str, data: IPGPaymentSchema) -> PaymentSchema:
+        payment = PaymentSchema(
+            ipg=ipg, user_id=data.user_id, phone=data.phone, status=PaymentStatus.INIT
+        )
+        state.payments[payment.uid] = payment
+        state.callbacks[payment.uid] = data.callback_url
+        return payment
+
+    @router.get("/{uid}/start")
+    async def start_payment(ipg: str, uid: str) -> RedirectResponse:
+        state.transition(uid, PaymentStatus.PENDING)
+        paid = random.random() < state.payment_success_rate  # ruff:ignore[suspicious-non-cryptographic-random-usage]
+        state.transition(uid, PaymentStatus.SUCCESS if paid else PaymentStatus.FAILED)
+        return RedirectResponse(
+            add_query_params(state.callbacks[uid], {"payment_id": uid}),
+            status_code=303,
+        )
+
+    @router.post("/{uid}/status")
+    async def set_payment_status(
+        ipg: str, uid: str, status: PaymentStatus
+    ) -> PaymentSchema:
+        return state.transition(uid, status)
+
+    @router.get("/{uid}")
+    async def get_payment(ipg: str, uid: str) -> PaymentSchema:
+        if uid not in state.payments:
+            raise HTTPException(404, "Payment not found")
+        return state.payments[uid]
+
+    return router
+
+
+def accounting_router(state: FakeState, behavior: ServiceBehavior) -> APIRouter:
+    """Accounting API: wallets and proposals."""
+    router = APIRouter(prefix="/api/accounting/v1", dependencies=[Depends(behavior)])
+
+    @router.get("/wallets")
+    async def list_wallets(request: Request) -> dict:
+        owner_id = request.query_params.get("workspace_id") or request.query_params.get(
+            "owner_id"
+        )
+        items = [
+            wallet
+            for wallet in state.wallets.values()
+            if owner_id is None or wallet.workspace_id == owner_id
+        ]
+        return {"items": [item.model_dump(mode="json") for item in items]}
+
+    @router.post("/wallets")
+    async def create_wallet(data: dict) -> WalletDetailSchema:
+        return state.new_wallet(str(data.get("owner_id") or uuid.uuid4()))
+
+    @router.get("/wallets/{uid}")
+    async def get_wallet(uid: str) -> WalletDetailSchema:
+        if uid not in state.wallets:
+            state.wallets[uid] = state.new_wallet(uid).model_copy(update={"uid": uid})
+        return state.wallets[uid]
+
+    @router.post("/proposals")
+    async def create_proposal(
+        data: ProposalCreateSchema,
+        idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+    ) -> ProposalSchema:
+        if idempotency_key in state.proposal_keys:
+            return state.proposals[state.proposal_keys[idempotency_key]]
+        proposal = ProposalSchema(
+            tenant_id=FAKE_TENANT,
+            user_id=FAKE_TENANT,
+            issuer_id=FAKE_TENANT,
+            **data.model_dump(),
+        )
+        state.proposals[proposal.uid] = proposal
+        if idempotency_key:
+            state.proposal_keys[idempotency_key] = proposal.uid
+        return proposal
+
+    return router
+
+
+def saas_router(state: FakeState, behavior: ServiceBehavior) -> APIRouter:
+    """SaaS API: enrollments."""
+    router = APIRouter(prefix="/api/saas/v1", dependencies=[Depends(behavior)])
+
+    @router.post("/enrollments")
+    async def create_enrollment(
+        data: EnrollmentCreateSchema,
+        idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+    ) -> EnrollmentSchema:
+        if idempotency_key:
+            data.idempotency_key = idempotency_key
+        return state.enroll(data)
+
+    @router.post("/enrollments/batch")
+    async def create_enrollments(
+        data: EnrollmentBatchCreateSchema,
+    ) -> EnrollmentBatchResultSchema:
+        return EnrollmentBatchResultSchema(
+            results=[
+                EnrollmentResultSchema(
+                    idempotency_key=item.idempotency_key or "",
+                    enrollment=state.enroll(item),
+                )
+                for item in data.items
+            ]
+        )
+
+    return router
+
+
+def usso_router(behavior: ServiceBehavior) -> APIRouter:
+    """USSO API: agent token exchange and API key verification."""
+    router = APIRouter(prefix="/api/sso/v1", dependencies=[Depends(behavior)])
+
+    @router.post("/agents/auth")
+    async def agent_auth() -> dict:
+        return {"tokens": {"access": f"fake-{uuid.uuid4().hex}"}}
+
+    @router.post("/apikeys/verify")
+    async def verify_api_key(data: dict) -> dict:
+        # Keys read "{tenant_id}:{user_id}", so load tests can act as many users.
+        tenant_id, _, user_id = str(data.get("api_key", "")).partition(":")
+        if not tenant_id or not user_id:
+            raise HTTPException(401, "Invalid API key")
+        return {"sub": user_id, "tenant_id": tenant_id, "workspace_id": user_id}
+
+    return router
+
+
+def fake_env(base_url: str) -> dict[str, str]:
+    """Variables pointing the shop at fakes served on ``base_url``."""
+    key = ed25519.Ed25519PrivateKey.generate().private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    return dict.fromkeys(
+        ("IPG_BASE_URL", "SAAS_BASE_URL", "ACCOUNTING_SERVICE_URL", "USSO_BASE_URL"),
+        base_url,
+    ) | {"AGENT_ID": "fake-agent", "AGENT_PRIVATE_KEY": key.decode()}
+
+
+def create_fake_app(
+    *,
+    payment_success_rate: float | None = None,
+    behaviors: dict[str, ServiceBehavior] | None = None,
+) -> FastAPI:
+    """
+    Build the fake services app.
+
+    Point ``IPG_BASE_URL``, ``SAAS_BASE_URL``, ``ACCOUNTING_SERVICE_URL``
+    and ``USSO_BASE_URL`` at it to run checkout without the network.
+    Latency and faults come from ``FAKE_*`` variables unless given.
+    """
+    behaviors = behaviors or {}
+
+    def behavior(service: str) -> ServiceBehavior:
+        return behaviors.get(service) or ServiceBehavior.from_env(service)
+
+    state = FakeState(
+        payment_success_rate=(
+            payment_success_rate
+            if payment_success_rate is not None
+            else float(os.getenv("FAKE_PAYMENT_SUCCESS_RATE", "0.95"))
+        ),
+        balance=Decimal(os.getenv("FAKE_WALLET_BALANCE", "1000000000000")),
+    )
+    app = FastAPI(title="Fake shop dependencies")
+    app.state.fake = state
+    app.include_router(usso_router(behavior("usso")))
+    app.include_router(accounting_router(state, behavior("accounting")))
+    app.include_router(saas_router(state, behavior("saas")))
+    app.include_router(ipg_router(state, behavior("ipg")))
+    return app
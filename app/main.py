@@ -1,58 +1,67 @@
 """Application entry point."""
 
-import asyncio
-import logging
-import signal
-import sys
+import socket
 from pathlib import Path
 
 import uvicorn
+from uvicorn.supervisors import Multiprocess
 
+from server.config import Settings
 from server.server import app
 
 __all__ = ["app"]
 
 
-async def main() -> None:
-    module = Path(__file__).stem
-    config = uvicorn.Config(
-        f"{module}:app",
-        host="0.0.0.0",  # ruff:ignore[hardcoded-bind-all-interfaces]
-        port=8000,
+def get_config() -> uvicorn.Config:
+    """Build the server config from the web settings."""
+    return uvicorn.Config(
+        f"{Path(__file__).stem}:app",
+        host=Settings.web_host,
+        port=Settings.web_port,
         access_log=True,
-        workers=1,
+        log_config=None,
+        workers=Settings.web_workers,
+        loop=Settings.web_loop,
+        backlog=Settings.web_backlog,
+        limit_concurrency=Settings.web_limit_concurrency,
+        timeout_keep_alive=Settings.web_keep_alive,
+        timeout_graceful_shutdown=Settings.web_graceful_timeout,
     )
-    server = uvicorn.Server(config)
 
-    # Setup graceful shutdown
-    loop = asyncio.get_running_loop()
 
-    stop_event = asyncio.Event()
-
-    def shutdown(sig: int) -> None:
-        logging.info("Received stop signal %d. Initiating graceful shutdown...", sig)
-        stop_event.set()
-        server.handle_exit(sig=sig, frame=None)
-
-    for sig in (signal.SIGINT, signal.SIGTERM):
-        loop.add_signal_handler(sig, shutdown, sig)
-
-    # Start server in background
-    server_task = asyncio.create_task(server.serve())
-
-    # Wait for signal
-    await stop_event.wait()
-
-    # Now gracefully shutdown server
-    logging.info("Shutdown complete.")
-
-    # Optional: wait for server task to finish if needed
-    server_task.cancel()
+def bind_socket(config: uvicorn.Config) -> socket.socket:
+    """
+    Bind the listening socket shared by all workers.
+
+    With ``WEB_REUSE_PORT`` the socket also sets SO_REUSEPORT, so a new
+    launcher can bind the port while the old one drains.
+    """
+    if not Settings.web_reuse_port or not hasattr(socket, "SO_REUSEPORT"):
+        return config.bind_socket()
+    family = socket.AF_INET6 if ":" in config.host else socket.AF_INET
+    sock = socket.socket(family=family)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((config.host, config.port))
+    sock.set_inheritable(True)
+    return sock
+
+
+def main() -> None:
+    """
+    Serve the app, pre-forking workers when more than one is configured.
+
+    Workers accept from one socket bound before the fork. On SIGTERM each
+    worker stops accepting and finishes in-flight requests for up to
+    ``WEB_GRACEFUL_TIMEOUT`` seconds before shutting down.
+    """
+    config = get_config()
+    sockets = [bind_socket(config)]
+    if config.workers > 1:
+        Multiprocess(config, sockets=sockets).run()
+    else:
+        uvicorn.Server(config).run(sockets=sockets)
 
 
 if __name__ == "__main__":
-    try:
-        asyncio.run(main())
-    except Exception:
-        logging.exception("Unexpected exception occurred")
-        sys.exit(1)
+    main()
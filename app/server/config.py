@@ -1,8 +1,12 @@
 """FastAPI server configuration."""
 
+import atexit
 import dataclasses
+import logging
+import logging.config
 import os
 from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit
 
 import dotenv
 from fastapi_mongo_base.core import config
@@ -10,51 +14,217 @@ from fastapi_mongo_base.core import config
 dotenv.load_dotenv()
 
 
+def pooled_mongo_uri(uri: str | None, pool_size: str | None) -> str | None:
+    """
+    Set the per-process connection pool size on a Mongo URI.
+
+    Other options are kept verbatim and in order, including repeated ones
+    such as ``readPreferenceTags``.
+    """
+    if not uri or not pool_size:
+        return uri
+    parts = urlsplit(uri)
+    option = f"maxPoolSize={int(pool_size)}"
+    options = []
+    for pair in filter(None, parts.query.split("&")):
+        if pair.partition("=")[0].lower() != "maxpoolsize":
+            options.append(pair)
+        elif option not in options:
+            options.append(option)
+    if option not in options:
+        options.append(option)
+    return urlunsplit(parts._replace(query="&".join(options)))
+
+
 @dataclasses.dataclass
 class Settings(config.Settings):
     """Server config settings."""
 
     base_dir: Path = Path(__file__).resolve().parent.parent
     base_path: str = "/api/shop/v1"
-    saas_base_url: str = os.getenv("SAAS_BASE_URL", "https://saas.uln.me")
+    # Enrollments go to root_url unless SAAS_BASE_URL points elsewhere.
+    saas_base_url: str = os.getenv("SAAS_BASE_URL", "")
     ipg_base_url: str = os.getenv("IPG_BASE_URL", "https://zarinpal.ulni.ir")
 
     coverage_dir: Path = base_dir / "htmlcov"
+    mongo_uri: str | None = pooled_mongo_uri(
+        config.project_settings.mongo_uri, os.getenv("MONGO_MAX_POOL_SIZE")
+    )
+
+    # Human-readable unless LOG_FORMAT=json; the framework defaults to JSON.
+    log_format: str = os.getenv("LOG_FORMAT", "text")
+    log_access_sample_rate: float = float(os.getenv("LOG_ACCESS_SAMPLE_RATE", "1"))
+    log_route_levels: str = os.getenv("LOG_ROUTE_LEVELS", "")
+
+    web_host: str = os.getenv("WEB_HOST", "0.0.0.0")  # ruff:ignore[hardcoded-bind-all-interfaces]
+    web_port: int = int(os.getenv("WEB_PORT", "8000"))
+    web_workers: int = int(os.getenv("WEB_WORKERS", "1"))
+    web_loop: str = os.getenv("WEB_LOOP", "auto")
+    web_reuse_port: bool = os.getenv("WEB_REUSE_PORT", "false").lower() in (
+        "true",
+        "1",
+        "yes",
+    )
+    web_backlog: int = int(os.getenv("WEB_BACKLOG", "2048"))
+    web_limit_concurrency: int | None = (
+        int(os.environ["WEB_LIMIT_CONCURRENCY"])
+        if os.getenv("WEB_LIMIT_CONCURRENCY")
+        else None
+    )
+    web_keep_alive: int = int(os.getenv("WEB_KEEP_ALIVE", "5"))
+    web_graceful_timeout: int = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+    compression_minimum_size: int = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+    compression_gzip_level: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    compression_brotli_quality: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
     currency: str = "IRR"
 
+    product_cache_max_age: int = int(os.getenv("PRODUCT_CACHE_MAX_AGE", "60"))
+    product_cache_stale_while_revalidate: int = int(
+        os.getenv("PRODUCT_CACHE_STALE_WHILE_REVALIDATE", "300")
+    )
+    product_import_batch_size: int = int(os.getenv("PRODUCT_IMPORT_BATCH_SIZE", "500"))
+    product_import_workers: int = int(os.getenv("PRODUCT_IMPORT_WORKERS", "0"))
+    product_import_max_line_bytes: int = int(
+        os.getenv("PRODUCT_IMPORT_MAX_LINE_BYTES", str(1024 * 1024))
+    )
+    product_import_max_errors: int = int(os.getenv("PRODUCT_IMPORT_MAX_ERRORS", "1000"))
+    product_snapshot_cache_size: int = int(
+        os.getenv("PRODUCT_SNAPSHOT_CACHE_SIZE", "10000")
+    )
+    basket_reprice_batch_size: int = int(os.getenv("BASKET_REPRICE_BATCH_SIZE", "200"))
+    basket_reprice_batch_interval: float = float(
+        os.getenv("BASKET_REPRICE_BATCH_INTERVAL", "0.1")
+    )
+    basket_reprice_concurrency: int = int(os.getenv("BASKET_REPRICE_CONCURRENCY", "1"))
+    exchange_rates: str = os.getenv("EXCHANGE_RATES", "")
+    exchange_rates_url: str = os.getenv("EXCHANGE_RATES_URL", "")
+    exchange_rates_refresh_interval: int = int(
+        os.getenv("EXCHANGE_RATES_REFRESH_INTERVAL", "300")
+    )
+    ipg_routing_strategy: str = os.getenv("IPG_ROUTING_STRATEGY", "least_latency")
+    ipg_stats_alpha: float = float(os.getenv("IPG_STATS_ALPHA", "0.2"))
+    ipg_min_samples: int = int(os.getenv("IPG_MIN_SAMPLES", "5"))
+    ipg_max_error_rate: float = float(os.getenv("IPG_MAX_ERROR_RATE", "0.5"))
+    ipg_error_half_life: float = float(os.getenv("IPG_ERROR_HALF_LIFE", "60"))
+    ipg_connect_timeout: float = float(os.getenv("IPG_CONNECT_TIMEOUT", "2"))
+    ipg_read_timeout: float = float(os.getenv("IPG_READ_TIMEOUT", "5"))
+    ipg_max_retries: int = int(os.getenv("IPG_MAX_RETRIES", "2"))
+    ipg_retry_backoff: float = float(os.getenv("IPG_RETRY_BACKOFF", "0.2"))
+    ipg_retry_budget_ratio: float = float(os.getenv("IPG_RETRY_BUDGET_RATIO", "0.2"))
+    ipg_breaker_failure_threshold: int = int(
+        os.getenv("IPG_BREAKER_FAILURE_THRESHOLD", "5")
+    )
+    ipg_breaker_reset_timeout: float = float(
+        os.getenv("IPG_BREAKER_RESET_TIMEOUT", "30")
+    )
+    usso_claims_cache_size: int = int(os.getenv("USSO_CLAIMS_CACHE_SIZE", "10000"))
+    usso_api_key_cache_ttl: float = float(os.getenv("USSO_API_KEY_CACHE_TTL", "30"))
+    wallet_cache_size: int = int(os.getenv("WALLET_CACHE_SIZE", "10000"))
+    outbox_batch_size: int = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+    outbox_poll_interval: float = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))
+    outbox_lease_timeout: float = float(os.getenv("OUTBOX_LEASE_TIMEOUT", "60"))
+    outbox_max_attempts: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+    outbox_retry_backoff: float = float(os.getenv("OUTBOX_RETRY_BACKOFF", "2"))
+    outbox_retry_backoff_cap: float = float(
+        os.getenv("OUTBOX_RETRY_BACKOFF_CAP", "300")
+    )
+    export_batch_size: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+    rate_limit_backend: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    rate_limit_rate: float = float(os.getenv("RATE_LIMIT_RATE", "50"))
+    rate_limit_burst: float = float(os.getenv("RATE_LIMIT_BURST", "200"))
+    rate_limit_routes: str = os.getenv("RATE_LIMIT_ROUTES", "")
+    rate_limit_concurrency: str = os.getenv(
+        "RATE_LIMIT_CONCURRENCY",
+        '{"/baskets/{uid}/checkout": 4, "/baskets/items/purchase": 4, '
+        '"/purchases/{uid}/start": 4, "/purchases/{uid}/verify": 4}',
+    )
+    rate_limit_callback_routes: str = os.getenv(
+        "RATE_LIMIT_CALLBACK_ROUTES", '["/purchases/{uid}/verify"]'
+    )
+    rate_limit_busy_retry_after: float = float(
+        os.getenv("RATE_LIMIT_BUSY_RETRY_AFTER", "1")
+    )
+    rate_limit_slot_ttl: int = int(os.getenv("RATE_LIMIT_SLOT_TTL", "120"))
+    rate_limit_max_keys: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+    # Bearer token for /metrics; unset, only private addresses may scrape it.
+    metrics_token: str = os.getenv("METRICS_TOKEN", "")
+    tracing_exporter: str = os.getenv("TRACING_EXPORTER", "")
+    tracing_file: str = os.getenv("TRACING_FILE", "logs/traces.jsonl")
+    tracing_sample_rate: float = float(os.getenv("TRACING_SAMPLE_RATE", "1"))
+
     @classmethod
-    def get_log_config(cls, console_level: str = "INFO", **kwargs: object) -> dict:
-        """Get the log configuration dict."""
+    def get_log_config(
+        cls,
+        console_level: str = "INFO",
+        log_format: str | None = None,
+        **kwargs: object,
+    ) -> dict:
+        """
+        Get the log configuration dict.
+
+        Records are handed to a queue and written by a listener thread, so
+        request handlers never block on console or file I/O.
+        """
+        formatter = "json" if (log_format or cls.log_format) == "json" else "standard"
         log_config = {
             "formatters": {
                 "standard": {
                     "format": "[{levelname} {name} : {filename}:{lineno} : {asctime} -> {funcName:10}] {message}",  # ruff:ignore[line-too-long]
                     "style": "{",
-                }
+                },
+                "json": {"()": "utils.logs.JSONFormatter"},
+            },
+            "filters": {
+                "access": {
+                    "()": "utils.logs.AccessLogFilter",
+                    "sample_rate": cls.log_access_sample_rate,
+                    "route_levels": cls.log_route_levels,
+                },
             },
             "handlers": {
                 "console": {
                     "class": "logging.StreamHandler",
                     "level": console_level,
-                    "formatter": "standard",
+                    "formatter": formatter,
                 },
                 "file": {
                     "class": "logging.FileHandler",
                     "level": "INFO",
-                    "formatter": "standard",
+                    "formatter": formatter,
                     "filename": "logs/app.log",
                 },
+                "queue": {
+                    "class": "logging.handlers.QueueHandler",
+                    "handlers": ["console", "file"],
+                    "respect_handler_level": True,
+                },
             },
             "loggers": {
                 "": {
-                    "handlers": [
-                        "console",
-                        "file",
-                    ],
+                    "handlers": ["queue"],
                     "level": console_level,
                     "propagate": True,
                 },
+                "uvicorn.access": {
+                    "filters": ["access"],
+                    "level": "INFO",
+                    "propagate": True,
+                },
             },
+            "disable_existing_loggers": False,
             "version": 1,
         }
         return log_config
+
+    @classmethod
+    def config_logger(cls) -> None:
+        """Configure logging and start the queue listener thread."""
+        if (previous := logging.getHandlerByName("queue")) and previous.listener:
+            previous.listener.stop()
+        # Not super(): it would pass the framework's JSON default along.
+        log_config = cls.get_log_config()
+        (cls.get_coverage_dir() / "logs").mkdir(parents=True, exist_ok=True)
+        logging.config.dictConfig(log_config)
+        listener = logging.getHandlerByName("queue").listener
+        listener.start()
+        atexit.register(listener.stop)
@@ -1,17 +1,30 @@
 """FastAPI application factory."""
 
+import asyncio
 import tomllib
 from pathlib import Path
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import PlainTextResponse
 from fastapi_mongo_base.core import app_factory
 from ufaas.fastapi import EXCEPTION_HANDLERS
 
 from apps.basket.routes import router as basket_router
+from apps.outbox.services import drain_outbox_forever
 from apps.product.routes import router as product_router
 from apps.purchase.routes import router as purchase_router
 from apps.tenant.routes import router as tenant_router
 from apps.voucher.routes import router as voucher_router
+from utils.compression import CompressionMiddleware
+from utils.exchange import exchange_rates
+from utils.ipg_routing import ipg_router
+from utils.metrics import MetricsMiddleware, metrics_allowed, render_metrics
+from utils.ratelimit import (
+    RateLimitedError,
+    admission,
+    rate_limited_exception_handler,
+)
+from utils.tracing import TracingMiddleware, setup_tracing
 
 from . import config
 
@@ -19,13 +32,38 @@ _PYPROJECT = Path(__file__).resolve().parent.parent / "pyproject.toml"
 with _PYPROJECT.open("rb") as _pyproject:
     _APP_VERSION = tomllib.load(_pyproject)["project"]["version"]
 
+
+async def run_workers() -> None:
+    """Run the background workers side by side."""
+    await asyncio.gather(exchange_rates.refresh_forever(), drain_outbox_forever())
+
+
+async def metrics(request: Request) -> PlainTextResponse:  # ruff:ignore[unused-async]
+    """
+    Prometheus metrics of this worker process.
+
+    Internal only: set ``METRICS_TOKEN`` whenever the app is reachable from
+    outside, otherwise only private addresses may scrape it.
+    """
+    if not metrics_allowed(request, config.Settings.metrics_token):
+        return PlainTextResponse("Forbidden", status_code=403)
+    return PlainTextResponse(
+        render_metrics(ipg_router.render_metrics()),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+setup_tracing()
+
 exception_handlers = {}
 exception_handlers.update(EXCEPTION_HANDLERS)
+exception_handlers[RateLimitedError] = rate_limited_exception_handler
 
 app = app_factory.create_app(
     settings=config.Settings(),
     version=_APP_VERSION,
     exception_handlers=exception_handlers,
+    worker=run_workers,
 )
 server_router = APIRouter()
 
@@ -38,4 +76,17 @@ for router in [
 ]:
     server_router.include_router(router)
 
-app.include_router(server_router, prefix=config.Settings.base_path)
+app.include_router(
+    server_router,
+    prefix=config.Settings.base_path,
+    dependencies=[Depends(admission)],
+)
+app.add_api_route("/metrics", metrics, include_in_schema=False)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=config.Settings.compression_minimum_size,
+    compresslevel=config.Settings.compression_gzip_level,
+    brotli_quality=config.Settings.compression_brotli_quality,
+)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
@@ -7,10 +7,8 @@ from collections.abc import AsyncGenerator, Generator
 import httpx
 import pytest
 import pytest_asyncio
-from beanie import init_beanie
-from fastapi_mongo_base import models
-from fastapi_mongo_base.utils import basic
 
+from fakes.mongo import init_mock_db
 from server.config import Settings
 from server.server import app as fastapi_app
 
@@ -37,20 +35,7 @@ def mongo_client() -> Generator[object]:
 # Async setup function to initialize the database with Beanie
 async def init_db(mongo_client: object) -> None:
     """Initialize the test database with Beanie."""
-    database = mongo_client.get_database("test_db")
-    original_list_collection_names = database.list_collection_names
-
-    async def list_collection_names(*args: object, **kwargs: object) -> list[str]:
-        # Beanie 2 / PyMongo pass kwargs mongomock_motor does not accept.
-        kwargs.pop("authorizedCollections", None)
-        kwargs.pop("nameOnly", None)
-        return await original_list_collection_names(*args, **kwargs)
-
-    database.list_collection_names = list_collection_names
-    await init_beanie(
-        database=database,
-        document_models=basic.get_all_subclasses(models.BaseEntity),
-    )
+    await init_mock_db(mongo_client.get_database("test_db"))
 
 
 @pytest_asyncio.fixture(scope="session", autouse=True)
@@ -0,0 +1,150 @@
+"""Tests for building a basket's SaaS enrollments."""
+
+import uuid
+from decimal import Decimal
+
+import httpx
+import pytest
+
+from apps.basket.models import Basket
+from apps.basket.schemas import BasketItemCreateSchema
+from apps.basket.services import (
+    create_saas_enrollments,
+    enroll_basket,
+    enrollment_requests,
+)
+from apps.product.models import Product
+from utils.saas import Bundle, EnrollmentCreateSchema, EnrollmentFailedError
+
+
+class _SaaS:
+    """SaaS client double; a batch status other than 200 hides that endpoint."""
+
+    tenant_id = "t-enroll"
+
+    def __init__(self, *, batch_status: int = 200, failing: set[str] = ()) -> None:
+        self.batch_status = batch_status
+        self.failing = set(failing)
+        self.keys: list[str] = []
+        self.urls: list[str] = []
+
+    def enroll(self, data: dict) -> dict:
+        self.keys.append(data["idempotency_key"])
+        return data | {"uid": uuid.uuid4().hex, "tenant_id": self.tenant_id}
+
+    async def post(
+        self, url: str, json: dict, headers: dict | None = None
+    ) -> httpx.Response:
+        self.urls.append(url)
+        request = httpx.Request("POST", url)
+        if url.endswith("/batch"):
+            if self.batch_status != 200:
+                return httpx.Response(self.batch_status, request=request)
+            results = [
+                {"idempotency_key": item["idempotency_key"], "error": "rejected"}
+                if item["idempotency_key"] in self.failing
+                else {
+                    "idempotency_key": item["idempotency_key"],
+                    "enrollment": self.enroll(item),
+                }
+                for item in json["items"]
+            ]
+            return httpx.Response(200, json={"results": results}, request=request)
+        if headers["Idempotency-Key"] in self.failing:
+            return httpx.Response(503, request=request)
+        return httpx.Response(201, json=self.enroll(json), request=request)
+
+
+def _enrollment(key: str) -> EnrollmentCreateSchema:
+    return EnrollmentCreateSchema(
+        user_id="u1",
+        bundles=[Bundle(asset="coin", quota=Decimal(1))],
+        duration=30,
+        idempotency_key=key,
+    )
+
+
+async def _package(name: str) -> Product:
+    return await Product(
+        tenant_id="t-enroll",
+        user_id="u1",
+        name=name,
+        unit_price=Decimal(10),
+        plan_duration=30,
+        bundles=[{"asset": "coin", "quota": 100}],
+    ).save()
+
+
+@pytest.mark.asyncio
+async def test_enrollment_requests_are_keyed_per_line() -> None:
+    """Only packages with bundles enroll, each under a basket/line key."""
+    package = await Product(
+        tenant_id="t-enroll",
+        user_id="u1",
+        name="Plan",
+        unit_price=Decimal(10),
+        plan_duration=30,
+        bundles=[{"asset": "coin", "quota": 100}],
+    ).save()
+    bare = await Product(
+        tenant_id="t-enroll", user_id="u1", name="Empty", unit_price=Decimal(1)
+    ).save()
+    basket = await Basket(tenant_id="t-enroll", user_id="u1").save()
+    for product in (package, bare):
+        await basket.add_basket_item(
+            await BasketItemCreateSchema(uid=product.uid).get_basket_item()
+        )
+
+    (enrollment,) = enrollment_requests(basket, await basket.get_items())
+    assert enrollment.idempotency_key == f"{basket.uid}:{package.uid}"
+    assert enrollment.price == Decimal(10)
+    assert enrollment.duration == 30
+    assert enrollment.bundles[0].quota == Decimal(100)
+
+
+@pytest.mark.asyncio
+async def test_enrollments_use_the_batch_endpoint() -> None:
+    """One batch request creates every enrollment."""
+    client = _SaaS()
+    batch = await create_saas_enrollments(client, [_enrollment("a"), _enrollment("b")])
+    assert [url.rsplit("/", 1)[-1] for url in client.urls] == ["batch"]
+    assert [e.idempotency_key for e in batch.enrollments] == ["a", "b"]
+    assert not batch.failed
+
+
+@pytest.mark.parametrize("status", [404, 405])
+@pytest.mark.asyncio
+async def test_enrollments_fall_back_to_one_request_per_item(status: int) -> None:
+    """Without the batch endpoint, each item is posted and fails on its own."""
+    client = _SaaS(batch_status=status, failing={"b"})
+    batch = await create_saas_enrollments(client, [_enrollment("a"), _enrollment("b")])
+    assert len(client.urls) == 3
+    assert [e.idempotency_key for e in batch.enrollments] == ["a"]
+    assert [result.idempotency_key for result in batch.failed] == ["b"]
+
+
+@pytest.mark.asyncio
+async def test_partial_failure_retries_only_failed_lines() -> None:
+    """Created enrollments are recorded, so a retry resends only the failures."""
+    first, second = await _package("First"), await _package("Second")
+    basket = await Basket(tenant_id="t-enroll", user_id="u1").save()
+    for product in (first, second):
+        await basket.add_basket_item(
+            await BasketItemCreateSchema(uid=product.uid).get_basket_item()
+        )
+
+    client = _SaaS(failing={f"{basket.uid}:{second.uid}"})
+    with pytest.raises(EnrollmentFailedError):
+        await enroll_basket(client, basket)
+    assert client.keys == [f"{basket.uid}:{first.uid}"]
+
+    basket = await Basket.get_by_uid(basket.uid)
+    assert list(basket.enrollment_ids) == [first.uid]
+    client.failing.clear()
+    (enrollment,) = await enroll_basket(client, basket)
+    assert enrollment.idempotency_key == f"{basket.uid}:{second.uid}"
+    assert client.keys == [f"{basket.uid}:{first.uid}", f"{basket.uid}:{second.uid}"]
+    assert set((await Basket.get_by_uid(basket.uid)).enrollment_ids) == {
+        first.uid,
+        second.uid,
+    }
@@ -0,0 +1,106 @@
+"""Tests for repricing active baskets after product changes."""
+
+from decimal import Decimal
+
+import pytest
+
+from apps.basket.models import Basket
+from apps.basket.schemas import (
+    BasketItemCreateSchema,
+    BasketStatusEnum,
+    VoucherSchema,
+)
+from apps.basket.services import apply_discount, reprice_active_baskets
+from apps.product.models import Product
+from apps.voucher.models import Voucher
+from server.config import Settings
+
+
+@pytest.mark.asyncio
+async def test_reprice_active_baskets(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Only active baskets holding the product pick up the new snapshot."""
+    monkeypatch.setattr(Settings, "basket_reprice_batch_size", 1)
+    monkeypatch.setattr(Settings, "basket_reprice_batch_interval", 0)
+    product = await Product(
+        tenant_id="t-reprice", user_id="u1", name="Plan", unit_price=Decimal(10)
+    ).save()
+
+    baskets = []
+    for status in [
+        BasketStatusEnum.active,
+        BasketStatusEnum.active,
+        BasketStatusEnum.paid,
+    ]:
+        basket = await Basket(tenant_id="t-reprice", user_id="u1").save()
+        await basket.add_basket_item(
+            await BasketItemCreateSchema(uid=product.uid).get_basket_item()
+        )
+        basket.status = status
+        baskets.append(await basket.save())
+    assert baskets[0].product_uids == [product.uid]
+
+    product.unit_price = Decimal(12)
+    await product.save()
+    assert await reprice_active_baskets(product) == 2
+    assert await reprice_active_baskets(product) == 0
+
+    first, second, paid = [await Basket.get_by_uid(b.uid) for b in baskets]
+    assert first.subtotal == second.subtotal == Decimal(12)
+    assert paid.subtotal == Decimal(10)
+    (item,) = (await first.get_items()).values()
+    assert item.unit_price == Decimal(12)
+
+
+@pytest.mark.asyncio
+async def test_reprice_finds_baskets_without_product_uids(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Baskets stored before ``product_uids`` existed are still repriced."""
+    monkeypatch.setattr(Settings, "basket_reprice_batch_interval", 0)
+    product = await Product(
+        tenant_id="t-reprice-legacy", user_id="u1", name="Plan", unit_price=10
+    ).save()
+    basket = await Basket(tenant_id="t-reprice-legacy", user_id="u1").save()
+    await basket.add_basket_item(
+        await BasketItemCreateSchema(uid=product.uid).get_basket_item()
+    )
+    await Basket.get_pymongo_collection().update_one(
+        {"uid": basket.uid}, {"$unset": {"product_uids": ""}}
+    )
+
+    product.unit_price = Decimal(15)
+    await product.save()
+    assert await reprice_active_baskets(product) == 1
+    assert (await Basket.get_by_uid(basket.uid)).subtotal == Decimal(15)
+
+
+@pytest.mark.asyncio
+async def test_reprice_recomputes_voucher_discount(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """A repriced basket's discount follows its new subtotal."""
+    monkeypatch.setattr(Settings, "basket_reprice_batch_interval", 0)
+    product = await Product(
+        tenant_id="t-reprice-voucher", user_id="u1", name="Plan", unit_price=100
+    ).save()
+    await Voucher(
+        tenant_id="t-reprice-voucher",
+        user_id=None,
+        code="HALF",
+        rate=Decimal(50),
+        cap=Decimal(40),
+    ).save()
+    basket = await Basket(tenant_id="t-reprice-voucher", user_id="u1").save()
+    await basket.add_basket_item(
+        await BasketItemCreateSchema(uid=product.uid).get_basket_item()
+    )
+    await apply_discount(basket, VoucherSchema(code="HALF"))
+    assert basket.discount.discount == Decimal(40)
+
+    product.unit_price = Decimal(20)
+    await product.save()
+    assert await reprice_active_baskets(product) == 1
+
+    repriced = await Basket.get_by_uid(basket.uid)
+    assert repriced.discount.discount == Decimal(10)
+    assert repriced.amount == Decimal(10)
@@ -13,6 +13,7 @@ from apps.basket.schemas import (
     BasketStatusEnum,
     DiscountSchema,
 )
+from utils.exchange import ExchangeRateUnavailableError
 
 
 def _now() -> datetime:
@@ -32,17 +33,18 @@ def test_discount_and_item_price_with_discount() -> None:
     assert item.exchange_fee("IRR") == 1
 
 
-def test_exchange_fee_rejects_other_currency() -> None:
-    """Cross-currency exchange is not implemented."""
+def test_exchange_fee_uses_cached_rates() -> None:
+    """Cross-currency fees come from the rate table; unknown pairs fail."""
     item = BasketItemSchema(
         uid="p1",
         name="Plan",
         unit_price=Decimal(1),
         quantity=Decimal(1),
-        currency="USD",
+        currency="IRT",
     )
-    with pytest.raises(NotImplementedError):
-        item.exchange_fee("IRR")
+    assert item.exchange_fee("IRR") == Decimal(10)
+    with pytest.raises(ExchangeRateUnavailableError):
+        item.model_copy(update={"currency": "GBP"}).exchange_fee("IRR")
 
 
 def test_basket_item_change_quantity_rules() -> None:
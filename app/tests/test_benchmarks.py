@@ -0,0 +1,54 @@
+"""Tests for benchmark summaries and baseline comparison."""
+
+from pathlib import Path
+
+import pytest
+
+from benchmarks.schemas import run_schema_benchmarks
+from benchmarks.stats import StepResult, load_baseline, regressions, save_baseline
+
+
+def test_percentiles_in_milliseconds() -> None:
+    """Samples in seconds summarize to millisecond percentiles and rps."""
+    result = StepResult.from_samples(
+        "checkout", [i / 1000 for i in range(1, 101)], errors=1, elapsed=2
+    )
+    assert (result.count, result.errors, result.rps) == (100, 1, 50)
+    assert result.p50 == pytest.approx(50.5)
+    assert 95 < result.p95 < result.p99 <= 100
+
+
+def test_regressions_past_tolerance(tmp_path: Path) -> None:
+    """Only slowdowns, throughput drops and new errors beyond tolerance count."""
+    baseline_path = tmp_path / "checkout.json"
+    save_baseline(
+        baseline_path,
+        [StepResult("checkout", 100, 0, 10, 20, 30, 50)],
+    )
+    baseline = load_baseline(baseline_path)
+
+    within = StepResult("checkout", 100, 0, 12, 29, 60, 40)
+    slower = StepResult("checkout", 100, 2, 12, 31, 60, 30)
+    assert regressions([within], baseline, tolerance=0.5) == []
+    assert [
+        line.split(":")[1].split()[0]
+        for line in regressions([slower], baseline, tolerance=0.5)
+    ] == ["p95", "rps", "errors"]
+    assert load_baseline(tmp_path / "missing.json") == {}
+
+
+def test_schema_benchmark_names_each_size() -> None:
+    """Every case runs once per size and reports ``repeat`` samples."""
+    results = run_schema_benchmarks(
+        cases=["basket_detail_json", "enrollment_create"],
+        sizes=(1, 10),
+        repeat=2,
+        min_time=0.001,
+    )
+    assert [result.name for result in results] == [
+        "basket_detail_json[1]",
+        "basket_detail_json[10]",
+        "enrollment_create[1]",
+        "enrollment_create[10]",
+    ]
+    assert all(result.count == 2 and result.p50 > 0 for result in results)
@@ -0,0 +1,26 @@
+"""Tests for server settings helpers."""
+
+from server.config import pooled_mongo_uri
+
+
+def test_pooled_mongo_uri() -> None:
+    """The pool size is merged into the URI query, replacing any old one."""
+    assert pooled_mongo_uri("mongodb://db:27017", None) == "mongodb://db:27017"
+    assert pooled_mongo_uri(None, "10") is None
+    assert (
+        pooled_mongo_uri("mongodb://db:27017/?maxPoolSize=100&w=majority", "10")
+        == "mongodb://db:27017/?maxPoolSize=10&w=majority"
+    )
+    assert (
+        pooled_mongo_uri(
+            "mongodb://a,b/?readPreferenceTags=dc:ny,rack:1&readPreferenceTags=&"
+            "maxpoolsize=5",
+            "10",
+        )
+        == "mongodb://a,b/?readPreferenceTags=dc:ny,rack:1&readPreferenceTags=&"
+        "maxPoolSize=10"
+    )
+    assert (
+        pooled_mongo_uri("mongodb://db/shop", "10")
+        == "mongodb://db/shop?maxPoolSize=10"
+    )
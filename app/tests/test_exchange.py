@@ -0,0 +1,65 @@
+"""Tests for cached exchange rates."""
+
+from decimal import Decimal
+
+import pytest
+
+from server.config import Settings
+from utils.exchange import (
+    FIXED_RATES,
+    ExchangeRates,
+    ExchangeRateUnavailableError,
+    RateTable,
+    parse_rates,
+)
+
+
+def test_convert_total_rounds_converted_part_once() -> None:
+    """Mixed-currency totals convert each currency once and round half-up."""
+    table = RateTable(
+        rates={"IRR": Decimal(1), "IRT": Decimal(10), "USD": Decimal("600000.5")}
+    )
+    total = table.convert_total(
+        [
+            (Decimal("1.5"), "IRR"),
+            (Decimal("0.005"), "USD"),
+            (Decimal("0.005"), "USD"),
+            (Decimal(3), "IRT"),
+        ],
+        "IRR",
+    )
+    # 0.01 USD = 6000.005 IRR -> 6000, 3 IRT = 30 IRR, IRR kept exact.
+    assert total == Decimal("6031.5")
+    assert table.convert_total([(Decimal(1), "IRR")], "USD") == Decimal("0.00")
+    with pytest.raises(ExchangeRateUnavailableError):
+        table.convert_total([(Decimal(1), "EUR")], "IRR")
+
+
+@pytest.mark.asyncio
+async def test_refresh_without_feed_keeps_table() -> None:
+    """Without a configured feed the static table is served as is."""
+    rates = ExchangeRates()
+    table = rates.table
+    assert await rates.refresh() is table
+    assert table.rate("IRT", "IRR") == Decimal(10)
+
+
+def test_parse_rates_skips_unknown_and_unusable_entries() -> None:
+    """One unknown code or bad rate does not discard the rest of the feed."""
+    rates = parse_rates({
+        "USD": "600000.5",
+        "XAU": 1,
+        "EUR": 0,
+        "GBP": -1,
+        "USDT": "NaN",
+        "BTC": "n/a",
+    })
+    assert rates == {"USD": Decimal("600000.5")}
+    with pytest.raises(TypeError):
+        parse_rates(["USD", 1])
+
+
+def test_malformed_static_rates_are_ignored(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A broken EXCHANGE_RATES leaves only the fixed parities."""
+    monkeypatch.setattr(Settings, "exchange_rates", "{not json")
+    assert ExchangeRates().table.rates == FIXED_RATES
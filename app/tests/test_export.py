@@ -0,0 +1,49 @@
+"""Tests for streaming NDJSON export."""
+
+import json
+from datetime import UTC, datetime
+from decimal import Decimal
+
+import pytest
+
+from apps.product.models import Product
+from utils.export import InvalidExportFieldsError, export_documents, export_projection
+
+
+@pytest.mark.asyncio
+async def test_export_documents_streams_projected_ndjson() -> None:
+    """Exports apply date filters and projection, oldest first."""
+    for day, price in [(1, 10), (2, 20), (3, 30)]:
+        await Product(
+            tenant_id="t-export",
+            user_id="u1",
+            name=f"Day {day}",
+            unit_price=Decimal(price),
+            created_at=datetime(2026, 1, day, tzinfo=UTC),
+        ).save()
+
+    query = Product.get_queryset(
+        tenant_id="t-export",
+        created_at_from=datetime(2026, 1, 2, tzinfo=UTC),
+    )
+    projection = export_projection(Product, "name, unit_price")
+    chunks = [
+        chunk
+        async for chunk in export_documents(
+            Product, query, projection=projection, batch_size=1
+        )
+    ]
+
+    assert len(chunks) == 2
+    rows = [json.loads(line) for line in b"".join(chunks).splitlines()]
+    assert rows == [
+        {"name": "Day 2", "unit_price": "20"},
+        {"name": "Day 3", "unit_price": "30"},
+    ]
+
+
+def test_export_projection_rejects_unknown_fields() -> None:
+    """Only model fields can be projected."""
+    assert export_projection(Product, None) == {"_id": 0}
+    with pytest.raises(InvalidExportFieldsError):
+        export_projection(Product, "name,password")
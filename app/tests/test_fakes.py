@@ -0,0 +1,94 @@
+"""Tests for the fake external services."""
+
+import httpx
+import pytest
+
+from fakes import create_fake_app
+from fakes.behavior import LatencyModel, ServiceBehavior
+
+
+def _client(**kwargs: object) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=create_fake_app(**kwargs)),
+        base_url="http://fakes",
+    )
+
+
+@pytest.mark.asyncio
+async def test_fake_payment_flow() -> None:
+    """Payments follow the gateway state machine and redirect back."""
+    instant = ServiceBehavior(LatencyModel())
+    behaviors = dict.fromkeys(["ipg", "accounting", "saas", "usso"], instant)
+    async with _client(payment_success_rate=1, behaviors=behaviors) as client:
+        token = await client.post("/api/sso/v1/agents/auth")
+        assert token.json()["tokens"]["access"]
+
+        wallet = (
+            await client.post("/api/accounting/v1/wallets", json={"owner_id": "o1"})
+        ).json()
+        wallets = await client.get("/api/accounting/v1/wallets?workspace_id=o1")
+        assert [w["uid"] for w in wallets.json()["items"]] == [wallet["uid"]]
+
+        payment = (
+            await client.post(
+                "/api/zarinpal/v1/payments",
+                json={
+                    "tenant_id": "t1",
+                    "wallet_id": wallet["uid"],
+                    "amount": "1000",
+                    "description": "basket",
+                    "callback_url": "https://shop/verify",
+                },
+            )
+        ).json()
+        assert payment["status"] == "INIT"
+
+        url = f"/api/zarinpal/v1/payments/{payment['uid']}"
+        start = await client.get(f"{url}/start")
+        assert start.status_code == 303
+        assert start.headers["location"].startswith("https://shop/verify")
+        assert (await client.get(url)).json()["status"] == "SUCCESS"
+        assert (await client.get(f"{url}/start")).status_code == 409
+
+        enrollment = await client.post(
+            "/api/saas/v1/enrollments",
+            json={"user_id": "u1", "bundles": [{"asset": "coin", "quota": 10}]},
+        )
+        assert enrollment.status_code == 200
+
+        items = [
+            {
+                "user_id": "u1",
+                "bundles": [{"asset": "coin", "quota": 5}],
+                "idempotency_key": f"b1:{line}",
+            }
+            for line in ("p1", "p2")
+        ]
+        first = await client.post(
+            "/api/saas/v1/enrollments/batch", json={"items": items}
+        )
+        retry = await client.post(
+            "/api/saas/v1/enrollments/batch", json={"items": items}
+        )
+        assert [r["idempotency_key"] for r in first.json()["results"]] == [
+            "b1:p1",
+            "b1:p2",
+        ]
+        assert retry.json() == first.json()
+
+
+@pytest.mark.asyncio
+async def test_fake_fault_injection() -> None:
+    """Configured error rates fail requests with the configured status."""
+    broken = ServiceBehavior(LatencyModel(), error_rate=1, error_status=502)
+    async with _client(behaviors={"usso": broken}) as client:
+        response = await client.post("/api/sso/v1/agents/auth")
+    assert response.status_code == 502
+
+
+def test_latency_model_parse() -> None:
+    """Latency specs parse into distributions that never go negative."""
+    model = LatencyModel.parse("uniform:0.01,0.02")
+    assert 0.01 <= model.sample() <= 0.02
+    assert LatencyModel.parse("lognormal:0.05,0.5").sample() >= 0
+    assert LatencyModel.parse("fixed:0").sample() == 0
@@ -0,0 +1,72 @@
+"""Tests for sparse fieldsets and response compression."""
+
+import json
+from decimal import Decimal
+
+import httpx
+import pytest
+
+from apps.purchase.models import Purchase
+from apps.purchase.schemas import PurchaseSchema
+from utils.compression import negotiate_encoding
+from utils.fields import InvalidFieldsError, parse_fields
+from utils.ipg import PaymentSchema
+from utils.pagination import PaginationMode, sparse_page
+
+
+@pytest.mark.asyncio
+async def test_sparse_page_matches_full_items() -> None:
+    """Projected items serialize like the full schema, minus other fields."""
+    for amount in ("10.50", "20"):
+        await Purchase(
+            tenant_id="t-sparse",
+            user_id="u1",
+            wallet_id="w1",
+            amount=Decimal(amount),
+            description="basket",
+            callback_url="https://shop.example/done",
+            tries={"p1": PaymentSchema(uid="p1", ipg="zarinpal")},
+        ).save()
+    query = Purchase.get_queryset(tenant_id="t-sparse")
+    names = parse_fields("amount, tries, created_at", PurchaseSchema)
+
+    response = await sparse_page(
+        Purchase,
+        query,
+        PurchaseSchema,
+        names,
+        limit=1,
+        pagination=PaginationMode.cursor,
+    )
+    page = json.loads(response.body)
+
+    (item,) = page["items"]
+    assert set(item) == set(page["heads"]) == {"uid", "amount", "tries", "created_at"}
+    full = await Purchase.get_by_uid(item["uid"])
+    expected = json.loads(PurchaseSchema.model_validate(full).model_dump_json())
+    assert item == {name: expected[name] for name in item}
+    assert page["next_cursor"]
+
+    with pytest.raises(InvalidFieldsError):
+        parse_fields("amount,secret", PurchaseSchema)
+
+
+def test_negotiate_encoding() -> None:
+    """Q-values pick the coding and q=0 refuses one."""
+    assert negotiate_encoding("gzip, br", ["br", "gzip"]) == "br"
+    assert negotiate_encoding("br;q=0.5, gzip", ["br", "gzip"]) == "gzip"
+    assert negotiate_encoding("gzip;q=0", ["gzip"]) is None
+    assert negotiate_encoding("*", ["gzip"]) == "gzip"
+    assert negotiate_encoding("", ["gzip"]) is None
+
+
+@pytest.mark.asyncio
+async def test_large_responses_are_compressed(client: httpx.AsyncClient) -> None:
+    """Large bodies are gzipped for clients that accept it."""
+    plain = await client.get("/openapi.json", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+    response = await client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.num_bytes_downloaded < len(plain.content)
+    assert response.json() == plain.json()
@@ -0,0 +1,59 @@
+"""Tests for health-aware IPG selection."""
+
+import httpx
+import pytest
+
+from server.config import Settings
+from utils.ipg_routing import IPGRouter, RoutingStrategy
+
+
+def test_choose_prefers_fast_healthy_gateways() -> None:
+    """Least-latency routing skips gateways that keep failing."""
+    router = IPGRouter()
+    assert router.choose([]) is None
+
+    for _ in range(5):
+        router.get_stats("slow").record_call(0.8, ok=True)
+        router.get_stats("fast").record_call(0.1, ok=False)
+    router.get_stats("steady").record_call(0.3, ok=True)
+
+    assert not router.get_stats("fast").is_healthy
+    ipgs = ["slow", "fast", "steady"]
+    assert router.choose(ipgs, RoutingStrategy.least_latency) == "steady"
+    assert router.choose(ipgs, RoutingStrategy.weighted) in {"slow", "steady"}
+    assert router.choose(["fast"]) == "fast"
+
+
+def test_track_records_failures() -> None:
+    """Only transport errors and 5xx answers count as gateway errors."""
+    router = IPGRouter()
+    request = httpx.Request("POST", "https://ipg.example/payments")
+    with router.track("zarinpal"):
+        pass
+    with pytest.raises(httpx.ConnectError), router.track("zarinpal"):
+        raise httpx.ConnectError("refused", request=request)
+    with pytest.raises(httpx.HTTPStatusError), router.track("zarinpal"):
+        httpx.Response(400, request=request).raise_for_status()
+    with pytest.raises(RuntimeError), router.track("zarinpal"):
+        raise RuntimeError
+
+    stats = router.get_stats("zarinpal")
+    assert stats.calls == 3
+    assert 0 < stats.error_rate < 1
+    stats.record_payment(success=True)
+    assert stats.success_ratio == 1
+
+
+def test_excluded_gateway_recovers_as_errors_fade() -> None:
+    """A failing gateway becomes eligible again once its errors decay."""
+    router = IPGRouter()
+    for _ in range(5):
+        router.get_stats("flaky").record_call(0.1, ok=False)
+        router.get_stats("steady").record_call(0.5, ok=True)
+    flaky = router.get_stats("flaky")
+    assert router.choose(["flaky", "steady"]) == "steady"
+
+    flaky.updated_at -= 10 * Settings.ipg_error_half_life
+    assert flaky.current_error_rate() < 0.01
+    assert flaky.is_healthy
+    assert router.choose(["flaky", "steady"]) == "flaky"
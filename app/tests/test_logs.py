@@ -0,0 +1,57 @@
+"""Tests for log formatting and access-log filtering."""
+
+import json
+import logging
+
+import pytest
+
+from server.config import Settings
+from utils.logs import AccessLogFilter, JSONFormatter
+
+
+def _access(path: str, status_code: int) -> logging.LogRecord:
+    return logging.LogRecord(
+        "uvicorn.access",
+        logging.INFO,
+        __file__,
+        1,
+        '%s - "%s %s HTTP/%s" %d',
+        ("1.2.3.4", "GET", path, "1.1", status_code),
+        None,
+    )
+
+
+def test_access_filter_levels_and_sampling() -> None:
+    """Routes filter by level; successes are sampled, failures are kept."""
+    quiet = AccessLogFilter(route_levels='{"/health": "warning"}')
+    assert not quiet.filter(_access("/health?probe=1", 200))
+    assert quiet.filter(_access("/health", 503))
+    assert quiet.filter(_access("/products", 200))
+
+    muted = AccessLogFilter(sample_rate=0)
+    assert not muted.filter(_access("/products", 200))
+    record = _access("/products", 404)
+    assert muted.filter(record)
+    assert (record.levelname, record.path) == ("WARNING", "/products")
+
+
+def test_json_formatter_includes_extra() -> None:
+    """Records become one JSON object carrying their extra fields."""
+    record = _access("/products", 200)
+    record.basket_uid = "b1"
+    entry = json.loads(JSONFormatter().format(record))
+    assert entry["message"] == '1.2.3.4 - "GET /products HTTP/1.1" 200'
+    assert entry["basket_uid"] == "b1"
+    assert entry["level"] == "INFO"
+
+
+def test_log_format_defaults_to_text(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Console and file stay human-readable unless LOG_FORMAT opts into JSON."""
+    handlers = Settings.get_log_config()["handlers"]
+    assert handlers["console"]["formatter"] == "standard"
+    assert handlers["file"]["formatter"] == "standard"
+
+    monkeypatch.setattr(Settings, "log_format", "json")
+    handlers = Settings.get_log_config()["handlers"]
+    assert handlers["console"]["formatter"] == "json"
+    assert handlers["file"]["formatter"] == "json"
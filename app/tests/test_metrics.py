@@ -0,0 +1,94 @@
+"""Tests for the Prometheus metrics endpoint."""
+
+import httpx
+import pytest
+
+from server.config import Settings
+from utils.accounting import outbound_target
+from utils.ipg import get_payment_ipg_url
+from utils.metrics import Histogram, instrument_client
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    """Buckets are cumulative and labels are escaped."""
+    histogram = Histogram("test_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    Histogram.registry.remove(histogram)
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value, 'a"b')
+    assert histogram.render()[2:] == [
+        'test_seconds_bucket{route="a\\"b",le="0.1"} 2',
+        'test_seconds_bucket{route="a\\"b",le="1.0"} 3',
+        'test_seconds_bucket{route="a\\"b",le="+Inf"} 4',
+        'test_seconds_sum{route="a\\"b"} 3.65',
+        'test_seconds_count{route="a\\"b"} 4',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(client: httpx.AsyncClient) -> None:
+    """Requests and outbound calls show up under their templates/targets."""
+    await client.get("/health")
+
+    outbound = instrument_client(
+        httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(204))
+        ),
+        outbound_target,
+    )
+    async with outbound:
+        await outbound.get(f"{get_payment_ipg_url('zarinpal')}/p1")
+
+    response = await client.get(
+        f"{client.base_url.scheme}://{client.base_url.host}/metrics"
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert (
+        'http_request_duration_seconds_count{method="GET",'
+        f'endpoint="{client.base_url.path}health",status_code="200"}}'
+    ) in body
+    assert (
+        'http_client_request_duration_seconds_count{target="ipg:zarinpal",'
+        'method="GET",status_code="204",outcome="response"} 1'
+    ) in body
+
+
+@pytest.mark.asyncio
+async def test_outbound_errors_are_recorded(client: httpx.AsyncClient) -> None:
+    """Requests that never get a response are timed under their error type."""
+
+    def fail(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectTimeout("timed out", request=request)
+
+    outbound = instrument_client(
+        httpx.AsyncClient(transport=httpx.MockTransport(fail)), "timeouts"
+    )
+    async with outbound:
+        with pytest.raises(httpx.ConnectTimeout):
+            await outbound.get("https://down.example/")
+
+    response = await client.get(
+        f"{client.base_url.scheme}://{client.base_url.host}/metrics"
+    )
+    assert (
+        'http_client_request_duration_seconds_count{target="timeouts",'
+        'method="GET",status_code="none",outcome="ConnectTimeout"} 1'
+    ) in response.text
+
+
+@pytest.mark.asyncio
+async def test_metrics_token_is_required_when_set(
+    client: httpx.AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """With METRICS_TOKEN set, scrapers must present it as a bearer token."""
+    monkeypatch.setattr(Settings, "metrics_token", "scrape")
+    url = f"{client.base_url.scheme}://{client.base_url.host}/metrics"
+
+    assert (await client.get(url)).status_code == 403
+    assert (
+        await client.get(url, headers={"Authorization": "Bearer wrong"})
+    ).status_code == 403
+    assert (
+        await client.get(url, headers={"Authorization": "Bearer scrape"})
+    ).status_code == 200
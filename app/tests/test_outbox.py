@@ -0,0 +1,251 @@
+"""Tests for the transactional outbox."""
+
+import asyncio
+from decimal import Decimal
+
+import httpx
+import pytest
+from fastapi_mongo_base.errors import BadRequestError
+from ufaas.proposal import ProposalSchema
+
+from apps.basket.models import Basket
+from apps.basket.schemas import BasketItemCreateSchema, BasketStatusEnum
+from apps.basket.services import buy_basket, enroll_paid_basket
+from apps.outbox import services
+from apps.outbox.models import OutboxMessage
+from apps.outbox.schemas import OutboxKind, OutboxStatus
+from apps.product.models import Product
+from apps.purchase import services as purchase_services
+from apps.purchase.models import Purchase, PurchaseStatus
+from apps.purchase.services import propose_purchase
+from apps.tenant.models import Tenant
+from fakes.server import FakeState
+from server.config import Settings
+
+
+class _Accounting:
+    """Accounting client double recording proposal idempotency keys."""
+
+    def __init__(self) -> None:
+        self.state = FakeState(payment_success_rate=1, balance=Decimal(100))
+        self.keys: list[str] = []
+
+    async def __aenter__(self) -> "_Accounting":
+        await asyncio.sleep(0)
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await asyncio.sleep(0)
+
+    async def get_token(self, scopes: str | list[str]) -> str:
+        await asyncio.sleep(0)
+        return "token"
+
+    async def get_wallet(self, wallet_id: str) -> object:
+        await asyncio.sleep(0)
+        return self.state.new_wallet("o1")
+
+    async def post(self, url: str, json: dict, headers: dict) -> httpx.Response:
+        await asyncio.sleep(0)
+        self.keys.append(headers["Idempotency-Key"])
+        proposal = ProposalSchema(
+            tenant_id="t-outbox", user_id="u1", issuer_id="u1", **json
+        )
+        return httpx.Response(
+            201,
+            json=proposal.model_dump(mode="json"),
+            request=httpx.Request("POST", url),
+        )
+
+
+@pytest.mark.asyncio
+async def test_buy_basket_records_enrollments_once() -> None:
+    """Paying a basket twice records a single enrollment message."""
+    basket = await Basket(tenant_id="t-outbox", user_id="u1").save()
+    await buy_basket(basket)
+    await buy_basket(basket)
+
+    assert (await Basket.get_by_uid(basket.uid)).status == BasketStatusEnum.paid
+    messages = await OutboxMessage.find({
+        "dedup_key": f"saas_enrollments:{basket.uid}"
+    }).to_list()
+    assert len(messages) == 1
+    assert messages[0].kind == OutboxKind.saas_enrollments
+    assert messages[0].payload == {"basket_uid": basket.uid}
+    assert messages[0].status == OutboxStatus.pending
+
+
+@pytest.mark.asyncio
+async def test_drain_retries_until_delivered(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Failed deliveries are retried, then marked done or failed."""
+    monkeypatch.setattr(Settings, "outbox_retry_backoff", 0)
+    monkeypatch.setattr(Settings, "outbox_max_attempts", 2)
+    outcomes = {"flaky": [RuntimeError("down"), None], "broken": [RuntimeError()] * 2}
+
+    async def deliver(message: OutboxMessage) -> None:
+        await asyncio.sleep(0)
+        if error := outcomes[message.payload["key"]].pop(0):
+            raise error
+
+    monkeypatch.setitem(services._handlers, OutboxKind.proposal, deliver)
+    await OutboxMessage.get_pymongo_collection().delete_many({})
+    for key in outcomes:
+        await services.enqueue(
+            tenant_id="t-outbox",
+            kind=OutboxKind.proposal,
+            dedup_key=f"test:{key}",
+            payload={"key": key},
+        )
+
+    assert await services.drain_outbox() == 2
+    assert await services.drain_outbox() == 2
+    assert await services.drain_outbox() == 0
+
+    flaky = await OutboxMessage.find_one({"dedup_key": "test:flaky"})
+    broken = await OutboxMessage.find_one({"dedup_key": "test:broken"})
+    assert (flaky.status, flaky.attempts, flaky.last_error) == (
+        OutboxStatus.done,
+        2,
+        None,
+    )
+    assert broken.status == OutboxStatus.failed
+    assert broken.attempts == 2
+    assert broken.last_error == "RuntimeError()"
+
+
+@pytest.mark.asyncio
+async def test_handlers_skip_effects_that_no_longer_apply() -> None:
+    """Redelivered or stale messages do not repeat their side effect."""
+    product = await Product(
+        tenant_id="t-outbox",
+        user_id="u1",
+        name="Plan",
+        unit_price=Decimal(10),
+        bundles=[{"asset": "coin", "quota": 10}],
+    ).save()
+    active = await Basket(tenant_id="t-outbox", user_id="u1").save()
+    await active.add_basket_item(
+        await BasketItemCreateSchema(uid=product.uid).get_basket_item()
+    )
+    cancelled = await Basket(
+        tenant_id="t-outbox", user_id="u1", status=BasketStatusEnum.cancelled
+    ).save()
+
+    def enrollments(uid: str) -> OutboxMessage:
+        return OutboxMessage(
+            tenant_id="t-outbox",
+            kind=OutboxKind.saas_enrollments,
+            dedup_key=f"saas_enrollments:{uid}",
+            payload={"basket_uid": uid},
+        )
+
+    # Enrolling would call the SaaS service and fail.
+    for uid in [cancelled.uid, "missing"]:
+        await enroll_paid_basket(enrollments(uid))
+    # A basket not saved as paid yet is retried rather than skipped.
+    with pytest.raises(BadRequestError):
+        await enroll_paid_basket(enrollments(active.uid))
+
+    # A proposal already recorded is not created again (no accounting call).
+    purchase = await Purchase(
+        tenant_id="t-outbox",
+        user_id="u1",
+        wallet_id="w1",
+        basket_id=active.uid,
+        amount=Decimal(10),
+        description="basket",
+        callback_url="https://shop.example/callback",
+        status=PurchaseStatus.SUCCESS,
+        proposal_id="proposal-1",
+    ).save()
+    await propose_purchase(
+        OutboxMessage(
+            tenant_id="t-outbox",
+            kind=OutboxKind.proposal,
+            dedup_key=f"proposal:{purchase.uid}",
+            payload={"purchase_uid": purchase.uid},
+        )
+    )
+
+
+@pytest.mark.asyncio
+async def test_enrollments_survive_a_failed_paid_save(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """The message is recorded before the paid state, so a retry completes both."""
+    basket = await Basket(tenant_id="t-outbox", user_id="u1").save()
+    save = Basket.save
+
+    async def fail(self: Basket, *args: object, **kwargs: object) -> Basket:
+        await asyncio.sleep(0)
+        raise RuntimeError("mongo down")
+
+    monkeypatch.setattr(Basket, "save", fail)
+    with pytest.raises(RuntimeError):
+        await buy_basket(basket)
+    monkeypatch.setattr(Basket, "save", save)
+
+    basket = await Basket.get_by_uid(basket.uid)
+    assert basket.status == BasketStatusEnum.active
+    dedup_key = f"saas_enrollments:{basket.uid}"
+    assert await OutboxMessage.find_one({"dedup_key": dedup_key})
+
+    await buy_basket(basket)
+    assert (await Basket.get_by_uid(basket.uid)).status == BasketStatusEnum.paid
+    assert len(await OutboxMessage.find({"dedup_key": dedup_key}).to_list()) == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_worker_cannot_overwrite_a_released_lease(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Once a lease is claimed again, the old holder's result is ignored."""
+    monkeypatch.setattr(Settings, "outbox_lease_timeout", 0)
+    await OutboxMessage.get_pymongo_collection().delete_many({})
+    await services.enqueue(
+        tenant_id="t-outbox",
+        kind=OutboxKind.proposal,
+        dedup_key="test:lease",
+        payload={"key": "lease"},
+    )
+    (stale,) = await OutboxMessage.claim(1)
+    (current,) = await OutboxMessage.claim(1)
+
+    assert not await stale.complete()
+    assert await current.retry_later("down")
+    message = await OutboxMessage.find_one({"dedup_key": "test:lease"})
+    assert (message.status, message.attempts) == (OutboxStatus.pending, 2)
+
+
+@pytest.mark.asyncio
+async def test_proposals_carry_the_purchase_idempotency_key(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Accounting can drop a proposal repeated after a crash before it was recorded."""
+    client = _Accounting()
+    monkeypatch.setattr(
+        purchase_services, "accounting_client", lambda tenant_id: client
+    )
+    await Tenant(tenant_id="t-outbox", name="Shop", wallet_id="w-shop").save()
+    purchase = await Purchase(
+        tenant_id="t-outbox",
+        user_id="u1",
+        wallet_id="w1",
+        basket_id="b1",
+        amount=Decimal(10),
+        description="basket",
+        callback_url="https://shop.example/callback",
+        status=PurchaseStatus.SUCCESS,
+    ).save()
+
+    await propose_purchase(
+        OutboxMessage(
+            tenant_id="t-outbox",
+            kind=OutboxKind.proposal,
+            dedup_key=f"proposal:{purchase.uid}",
+            payload={"purchase_uid": purchase.uid},
+        )
+    )
+
+    assert client.keys == [f"proposal:{purchase.uid}"]
+    assert (await Purchase.get_by_uid(purchase.uid)).proposal_id
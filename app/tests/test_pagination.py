@@ -0,0 +1,89 @@
+"""Tests for keyset pagination."""
+
+import base64
+
+import pytest
+from fastapi_mongo_base.errors import BadRequestError
+
+from apps.basket.models import Basket
+from utils.pagination import (
+    InvalidCursorError,
+    InvalidSortFieldError,
+    decode_cursor,
+    list_cursor,
+)
+
+
+@pytest.mark.asyncio
+async def test_list_cursor_walks_all_pages_in_order() -> None:
+    """Cursor pages cover every item once, in (created_at, uid) order."""
+    for _ in range(5):
+        await Basket(tenant_id="t-cursor", user_id="u1").save()
+    query = Basket.get_queryset(tenant_id="t-cursor", user_id="u1")
+
+    seen: list[str] = []
+    cursor = None
+    while True:
+        items, cursor, total = await list_cursor(
+            Basket, query, cursor=cursor, limit=2, with_total=True
+        )
+        assert total == 5
+        seen.extend(item.uid for item in items)
+        if cursor is None:
+            break
+
+    expected = (
+        await Basket.find(query).sort([("created_at", -1), ("uid", -1)]).to_list()
+    )
+    assert seen == [item.uid for item in expected]
+
+
+@pytest.mark.asyncio
+async def test_list_cursor_rejects_foreign_cursor() -> None:
+    """A cursor issued for another ordering is rejected."""
+    await Basket(tenant_id="t-cursor-2", user_id="u1").save()
+    await Basket(tenant_id="t-cursor-2", user_id="u1").save()
+    query = Basket.get_queryset(tenant_id="t-cursor-2")
+    _, cursor, total = await list_cursor(Basket, query, limit=1)
+    assert cursor is not None
+    assert total is None
+
+    with pytest.raises(BadRequestError):
+        await list_cursor(Basket, query, cursor=cursor, sort_direction=1)
+    with pytest.raises(BadRequestError):
+        await list_cursor(Basket, query, cursor="not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_list_cursor_rejects_unknown_sort_field() -> None:
+    """Sorting by a field the model lacks is a 400, not a server error."""
+    await Basket(tenant_id="t-cursor-3", user_id="u1").save()
+    await Basket(tenant_id="t-cursor-3", user_id="u1").save()
+    query = Basket.get_queryset(tenant_id="t-cursor-3")
+
+    with pytest.raises(InvalidSortFieldError):
+        await list_cursor(Basket, query, limit=1, sort_field="__class__")
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        '{"f": "created_at", "d": -1, "v": {"$oid": "zz"}, "u": "x"}',
+        '{"f": "created_at", "d": -1, "v": {"$numberDecimal": "abc"}, "u": "x"}',
+        '{"f": "created_at", "d": -1, "v": {"$ne": null}, "u": "x"}',
+        '{"f": "created_at", "d": -1, "v": 1, "u": {"$gt": ""}}',
+    ],
+)
+def test_forged_cursors_are_rejected(payload: str) -> None:
+    """Undecodable or non-scalar cursor values are a 400, never a filter."""
+    cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, "created_at", -1)
+
+
+@pytest.mark.asyncio
+async def test_cursor_pages_only_sort_by_indexed_fields() -> None:
+    """Cursor pages in an unindexed order are refused rather than scanned."""
+    query = Basket.get_queryset(tenant_id="t-cursor-4")
+    with pytest.raises(InvalidSortFieldError):
+        await list_cursor(Basket, query, sort_field="status")
@@ -0,0 +1,127 @@
+"""Tests for streaming product import."""
+
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from decimal import Decimal
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from apps.product.models import Product
+from apps.product.services import import_products, validate_product_rows
+from server.config import Settings
+from utils.ndjson import batched, iter_lines
+
+
+async def _chunks(body: bytes, size: int = 7) -> AsyncIterator[bytes]:
+    for start in range(0, len(body), size):
+        await asyncio.sleep(0)
+        yield body[start : start + size]
+
+
+@pytest.mark.asyncio
+async def test_iter_lines_reassembles_chunks() -> None:
+    """Lines split across chunks are rejoined and blank lines skipped."""
+    body = b'{"a": 1}\n\n{"b": 2}\n{"c": 3}'
+    lines = [item async for item in iter_lines(_chunks(body, size=3), 64)]
+    assert lines == [(1, b'{"a": 1}'), (3, b'{"b": 2}'), (4, b'{"c": 3}')]
+
+    batches = [
+        [line for line, _ in batch]
+        async for batch in batched(iter_lines(_chunks(body), 64), 2)
+    ]
+    assert batches == [[1, 3], [4]]
+
+
+def test_validate_product_rows() -> None:
+    """Rows are validated independently with per-row errors."""
+    rows = [
+        (1, json.dumps({"external_id": "sku-1", "name": "One", "unit_price": "10"})),
+        (2, "{not json"),
+        (3, json.dumps({"name": "No key", "unit_price": "5"})),
+    ]
+    (line, data, error), *failed = validate_product_rows([
+        (line, raw.encode()) for line, raw in rows
+    ])
+    assert (line, error) == (1, None)
+    assert data["external_id"] == "sku-1"
+    assert data["unit_price"] == Decimal(10)
+    assert [(line, data) for line, data, _ in failed] == [(2, None), (3, None)]
+    assert failed[1][2] == "external_id: Field required"
+
+
+@pytest.mark.asyncio
+async def test_import_products_reports_invalid_rows() -> None:
+    """Invalid rows are reported without writing anything."""
+    body = b'{"name": "No key", "unit_price": "5"}\n[]\n'
+    report = await import_products(
+        _chunks(body), tenant_id="t-import", user_id="u1", batch_size=1
+    )
+    assert (report.total, report.created, report.updated) == (2, 0, 0)
+    assert [error.line for error in report.errors] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_iter_lines_drops_over_long_lines() -> None:
+    """Lines past the cap are reported as ``None`` without being buffered."""
+    body = b'{"a": 1}\n' + b"x" * 40 + b'\n{"b": 2}\n' + b"y" * 40
+    lines = [item async for item in iter_lines(_chunks(body, size=5), 16)]
+    assert lines == [(1, b'{"a": 1}'), (2, None), (3, b'{"b": 2}'), (4, None)]
+
+
+@pytest.mark.asyncio
+async def test_import_products_upserts_by_external_id() -> None:
+    """Rows create products once, then update them by external id."""
+    body = b"".join(
+        json.dumps({
+            "external_id": f"sku-{index}",
+            "name": f"Product {index}",
+            "unit_price": "10",
+        }).encode()
+        + b"\n"
+        for index in range(3)
+    )
+    first = await import_products(_chunks(body), tenant_id="t-upsert", user_id="u1")
+    second = await import_products(_chunks(body), tenant_id="t-upsert", user_id="u1")
+
+    assert (first.total, first.created, first.updated) == (3, 3, 0)
+    assert (second.total, second.created, second.updated) == (3, 0, 3)
+    assert await Product.find({"tenant_id": "t-upsert"}).count() == 3
+
+
+@pytest.mark.asyncio
+async def test_import_products_caps_reported_errors(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Every failed row is counted, but only the first ones are listed."""
+    monkeypatch.setattr(Settings, "product_import_max_errors", 2)
+    report = await import_products(
+        _chunks(b"[]\n" * 5), tenant_id="t-import", user_id="u1"
+    )
+    assert (report.total, report.failed) == (5, 5)
+    assert [error.line for error in report.errors] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_external_id_is_unique_per_tenant() -> None:
+    """Only products carrying an external id are held to one per tenant."""
+    for _ in range(2):
+        await Product(
+            tenant_id="t-unique", user_id="u1", name="Manual", unit_price=1
+        ).save()
+    await Product(
+        tenant_id="t-unique",
+        user_id="u1",
+        name="Imported",
+        unit_price=1,
+        external_id="sku-1",
+    ).save()
+    with pytest.raises(DuplicateKeyError):
+        await Product(
+            tenant_id="t-unique",
+            user_id="u1",
+            name="Twin",
+            unit_price=1,
+            external_id="sku-1",
+        ).save()
@@ -1,6 +1,6 @@
 """Unit tests for product schemas."""
 
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 from decimal import Decimal
 
 from apps.product.schemas import (
@@ -10,6 +10,7 @@ from apps.product.schemas import (
     ProductStatus,
     ProductUpdateSchema,
 )
+from utils.http_cache import version_of
 
 
 def test_product_create_coerces_decimals() -> None:
@@ -40,3 +41,22 @@ def test_product_schema_defaults_and_update() -> None:
     update = ProductUpdateSchema(name="Pro+", unit_price=Decimal(12))
     assert update.name == "Pro+"
     assert update.unit_price == Decimal(12)
+
+
+def test_product_etag_follows_updated_at() -> None:
+    """Product ETag changes whenever updated_at changes."""
+    now = datetime.now(UTC)
+    product = ProductSchema(
+        uid="p1",
+        created_at=now,
+        updated_at=now,
+        user_id="u1",
+        tenant_id="t1",
+        name="Pro",
+        unit_price=Decimal(10),
+    )
+    etag = product.etag
+    assert etag.startswith('W/"p1-')
+    product.updated_at = now + timedelta(seconds=1)
+    assert product.etag != etag
+    assert product.version > version_of(now)
@@ -0,0 +1,140 @@
+"""Tests for product snapshots referenced by basket lines."""
+
+from decimal import Decimal
+
+import pytest
+
+from apps.basket.models import Basket, MissingSnapshotError
+from apps.basket.schemas import (
+    BasketDetailSchema,
+    BasketItemCreateSchema,
+    BasketLineSchema,
+    BasketStatusEnum,
+)
+from apps.basket.services import create_checkout_basket_url
+from apps.product.models import Product, ProductSnapshot
+
+
+@pytest.mark.asyncio
+async def test_basket_lines_reference_product_snapshots() -> None:
+    """Lines store only snapshot id, quantity and price, and hydrate on read."""
+    product = await Product(
+        tenant_id="t-snap",
+        user_id="u1",
+        name="Plan",
+        unit_price=Decimal(10),
+        meta_data={"color": "blue"},
+    ).save()
+    basket = await Basket(tenant_id="t-snap", user_id="u1").save()
+
+    line = await BasketItemCreateSchema(uid=product.uid, quantity=2).get_basket_item()
+    await basket.add_basket_item(line)
+    await basket.add_basket_item(
+        await BasketItemCreateSchema(uid=product.uid).get_basket_item()
+    )
+
+    stored = await Basket.get_pymongo_collection().find_one({"uid": basket.uid})
+    assert set(stored["items"][product.uid]) == {
+        "uid",
+        "snapshot_id",
+        "currency",
+        "quantity",
+        "unit_price",
+    }
+
+    detail = await (await Basket.get_by_uid(basket.uid)).get_detail()
+    (item,) = detail.items
+    assert (item.name, item.meta_data) == ("Plan", {"color": "blue"})
+    assert item.quantity == Decimal(3)
+    assert detail.subtotal == Decimal(30)
+
+    same = await ProductSnapshot.from_product(product)
+    assert same.uid == line.snapshot_id
+    assert await ProductSnapshot.find({"product_uid": product.uid}).count() == 1
+
+    product.unit_price = Decimal(12)
+    changed = await ProductSnapshot.from_product(product)
+    assert changed.uid != same.uid
+    assert changed.unit_price == Decimal(12)
+
+
+@pytest.mark.asyncio
+async def test_basket_detail_matches_validated_detail() -> None:
+    """The constructed detail serializes exactly like a validated one."""
+    product = await Product(
+        tenant_id="t-snap",
+        user_id="u1",
+        name="Bundle plan",
+        unit_price=Decimal("9.90"),
+        bundles=[{"asset": "coin", "quota": 10}],
+    ).save()
+    basket = await Basket(tenant_id="t-snap", user_id="u1").save()
+    await basket.add_basket_item(
+        await BasketItemCreateSchema(uid=product.uid, quantity=2).get_basket_item()
+    )
+
+    detail = await basket.get_detail()
+    validated = BasketDetailSchema.model_validate(detail.model_dump())
+    assert detail.model_dump_json(warnings="error") == validated.model_dump_json()
+
+
+@pytest.mark.asyncio
+async def test_basket_items_load_snapshots_on_a_cold_cache() -> None:
+    """Snapshots evicted from the cache are read back from Mongo."""
+    product = await Product(
+        tenant_id="t-snap", user_id="u1", name="Cold", unit_price=Decimal(10)
+    ).save()
+    basket = await Basket(tenant_id="t-snap", user_id="u1").save()
+    await basket.add_basket_item(
+        await BasketItemCreateSchema(uid=product.uid, quantity=2).get_basket_item()
+    )
+    ProductSnapshot._cache.clear()
+
+    detail = await (await Basket.get_by_uid(basket.uid)).get_detail()
+    assert [item.name for item in detail.items] == ["Cold"]
+    assert detail.subtotal == Decimal(20)
+
+
+@pytest.mark.asyncio
+async def test_legacy_lines_are_snapshotted_once() -> None:
+    """Lines without a snapshot get one persisted on first read."""
+    product = await Product(
+        tenant_id="t-snap", user_id="u1", name="Legacy", unit_price=Decimal(5)
+    ).save()
+    line = BasketLineSchema(uid=product.uid, unit_price=Decimal(5))
+    basket = await Basket(
+        tenant_id="t-snap", user_id="u1", items={product.uid: line}
+    ).save()
+
+    (first,) = (await basket.get_items()).values()
+    stored = await Basket.get_by_uid(basket.uid)
+    assert stored.items[product.uid].snapshot_id == first.snapshot_id
+
+    product.unit_price = Decimal(7)
+    await product.save()
+    (again,) = (await stored.get_items()).values()
+    assert (again.snapshot_id, again.unit_price) == (first.snapshot_id, Decimal(5))
+
+
+@pytest.mark.asyncio
+async def test_deleted_product_degrades_until_checkout() -> None:
+    """A legacy line of a deleted product is flagged, and checkout refuses it."""
+    product = await Product(
+        tenant_id="t-snap", user_id="u1", name="Gone", unit_price=Decimal(5)
+    ).save()
+    line = BasketLineSchema(uid=product.uid, unit_price=Decimal(5))
+    basket = await Basket(
+        tenant_id="t-snap", user_id="u1", items={product.uid: line}
+    ).save()
+    await product.delete()
+
+    detail = await basket.get_detail()
+    (item,) = detail.items
+    assert not item.available
+    assert (item.unit_price, item.currency) == (Decimal(5), line.currency)
+    assert detail.subtotal == Decimal(5)
+
+    with pytest.raises(MissingSnapshotError) as error:
+        await create_checkout_basket_url(basket)
+    assert error.value.status_code == 400
+    assert (await Basket.get_by_uid(basket.uid)).status == BasketStatusEnum.active
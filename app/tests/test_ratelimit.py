@@ -0,0 +1,108 @@
+"""Tests for per-tenant admission control."""
+
+from collections.abc import Generator
+
+import httpx
+import pytest
+from fastapi import APIRouter, Depends, FastAPI
+from starlette.requests import Request
+
+from server.config import Settings
+from utils.ratelimit import (
+    MemoryBackend,
+    RateLimitedError,
+    admission,
+    client_key,
+    get_backend,
+    parse_rate,
+    rate_limited_exception_handler,
+)
+
+
+@pytest.fixture
+def fresh_backend() -> Generator[None]:
+    """Start and finish with empty limiter state."""
+    get_backend.cache_clear()
+    yield
+    get_backend.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_allows_burst_then_asks_to_wait() -> None:
+    """A bucket admits ``burst`` requests at once, then reports the wait."""
+    backend = MemoryBackend()
+
+    assert [await backend.take("t1", 2, 3) for _ in range(3)] == [0, 0, 0]
+    wait = await backend.take("t1", 2, 3)
+    assert 0 < wait <= 0.5
+    assert await backend.take("t2", 2, 3) == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrency_slots_are_released() -> None:
+    """Only ``limit`` slots are handed out until one is given back."""
+    backend = MemoryBackend()
+
+    first = await backend.acquire("t1:/checkout", 2)
+    second = await backend.acquire("t1:/checkout", 2)
+    assert first and second and first != second
+    assert await backend.acquire("t1:/checkout", 2) is None
+    await backend.release("t1:/checkout", first)
+    await backend.release("t1:/checkout", first)
+    assert await backend.acquire("t1:/checkout", 2)
+    assert await backend.acquire("t1:/checkout", 2) is None
+
+
+@pytest.mark.asyncio
+async def test_anonymous_callbacks_are_keyed_on_uid() -> None:
+    """Gateway redirects from one address do not share limits across purchases."""
+    request = Request({
+        "type": "http",
+        "headers": [],
+        "client": ("10.0.0.1", 443),
+        "path_params": {"uid": "p1"},
+    })
+
+    assert await client_key(request, "/purchases/{uid}/verify") == "uid:p1"
+    assert await client_key(request, "/purchases/{uid}/start") == "ip:10.0.0.1"
+
+
+def test_parse_rate() -> None:
+    """Rates read as ``rate/burst`` with the burst defaulting to the rate."""
+    assert parse_rate("0.5/10") == (0.5, 10.0)
+    assert parse_rate("5") == (5.0, 5.0)
+
+
+@pytest.fixture
+def limited_app() -> FastAPI:
+    """Build a small app admitting requests the way the shop routers do."""
+    app = FastAPI(exception_handlers={RateLimitedError: rate_limited_exception_handler})
+    router = APIRouter()
+
+    @router.get("/items/{uid}")
+    async def read(uid: str) -> dict:
+        return {"uid": uid}
+
+    app.include_router(router, dependencies=[Depends(admission)])
+    return app
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("fresh_backend")
+async def test_over_limit_requests_get_retry_after(
+    limited_app: FastAPI, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Requests past the burst are rejected before the endpoint runs."""
+    monkeypatch.setattr(Settings, "rate_limit_rate", 0.5)
+    monkeypatch.setattr(Settings, "rate_limit_burst", 2)
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=limited_app), base_url="https://test"
+    ) as client:
+        statuses = [(await client.get(f"/items/{i}")).status_code for i in range(2)]
+        response = await client.get("/items/3")
+
+    assert statuses == [200, 200]
+    assert response.status_code == 429
+    assert response.json()["error_code"] == "rate_limited"
+    assert response.headers["Retry-After"] == "2"
@@ -0,0 +1,101 @@
+"""Tests for IPG circuit breaking and retries."""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+
+import httpx
+import pytest
+
+from server.config import Settings
+from utils.ipg import IPGCircuitOpenError, call_ipg
+from utils.ipg_routing import ipg_router
+from utils.resilience import CircuitBreaker, CircuitState, RetryBudget
+
+
+def _responder(
+    *statuses: int,
+) -> tuple[list[int], Callable[[], Awaitable[httpx.Response]]]:
+    calls: list[int] = []
+
+    async def send() -> httpx.Response:
+        await asyncio.sleep(0)
+        status = statuses[min(len(calls), len(statuses) - 1)]
+        calls.append(status)
+        return httpx.Response(status, request=httpx.Request("GET", "https://ipg"))
+
+    return calls, send
+
+
+def test_breaker_opens_and_probes() -> None:
+    """The circuit opens at the threshold and lets one probe through later."""
+    breaker = CircuitBreaker(name="test", failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitState.closed
+    breaker.record_failure()
+    assert breaker.state == CircuitState.open
+
+    assert breaker.allow()
+    assert breaker.state == CircuitState.half_open
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitState.closed
+
+
+def test_retry_budget_caps_retries() -> None:
+    """Retries stop once the budget is spent."""
+    budget = RetryBudget(ratio=0.5, capacity=1, tokens=1)
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    budget.deposit()
+    budget.deposit()
+    assert budget.try_spend()
+
+
+@pytest.mark.asyncio
+async def test_call_ipg_retries_and_fails_fast(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Idempotent calls retry 5xx; an open circuit rejects without calling."""
+    monkeypatch.setattr(Settings, "ipg_retry_backoff", 0)
+    monkeypatch.setattr(Settings, "ipg_breaker_failure_threshold", 1)
+
+    calls, send = _responder(502, 200)
+    response = await call_ipg("flaky", send, idempotent=True)
+    assert (response.status_code, calls) == (200, [502, 200])
+
+    calls, send = _responder(502)
+    with pytest.raises(httpx.HTTPStatusError):
+        await call_ipg("down", send, idempotent=False)
+    assert calls == [502]
+    assert ipg_router.get_breaker("down").state == CircuitState.open
+
+    with pytest.raises(IPGCircuitOpenError):
+        await call_ipg("down", send, idempotent=False)
+    assert calls == [502]
+    assert ipg_router.choose(["down", "flaky"]) == "flaky"
+    assert ipg_router.metrics()["down"]["circuit_state"] == CircuitState.open
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_frees_the_half_open_circuit(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """A probe that ends without an outcome lets the next call probe."""
+    monkeypatch.setattr(Settings, "ipg_breaker_reset_timeout", 0)
+    breaker = ipg_router.get_breaker("cancelled")
+    breaker.record_failure()
+    breaker.state, breaker.opened_at = CircuitState.open, 0
+
+    async def hang() -> httpx.Response:
+        await asyncio.sleep(60)
+
+    probe = asyncio.create_task(call_ipg("cancelled", hang, idempotent=True))
+    await asyncio.sleep(0)
+    assert breaker.state == CircuitState.half_open
+    assert breaker.is_open
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+
+    assert not breaker.is_open
+    assert breaker.allow()
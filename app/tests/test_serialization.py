@@ -0,0 +1,35 @@
+"""Tests for JSON encoding."""
+
+import json
+from datetime import UTC, datetime
+from decimal import Decimal
+
+from bson import Decimal128, ObjectId
+
+from utils.serialization import dumps
+
+
+def test_dumps_encodes_mongo_types_compactly() -> None:
+    """BSON and stdlib values encode as strings and text stays readable."""
+    oid = ObjectId()
+    encoded = dumps({
+        "amount": Decimal("1.50"),
+        "stored": Decimal128("2.5"),
+        "id": oid,
+        "at": datetime(2026, 1, 2, tzinfo=UTC),
+        "name": "سبد",
+    })
+    assert b", " not in encoded
+    assert "سبد".encode() in encoded
+    assert json.loads(encoded) == {
+        "amount": "1.50",
+        "stored": "2.5",
+        "id": str(oid),
+        "at": "2026-01-02T00:00:00+00:00",
+        "name": "سبد",
+    }
+
+
+def test_dumps_coerces_keys_and_big_integers() -> None:
+    """Non-string keys become strings and integers keep full precision."""
+    assert dumps({1: 2**70, None: True}) == b'{"1":1180591620717411303424,"null":true}'
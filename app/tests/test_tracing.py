@@ -0,0 +1,121 @@
+"""Tests for trace context propagation."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from apps.outbox import services
+from apps.outbox.models import OutboxMessage
+from apps.outbox.schemas import OutboxKind
+from utils import tracing
+from utils.tracing import trace_client
+
+trace = pytest.importorskip("opentelemetry.trace")
+
+TRACE_ID = 0x0AF7651916CD43DD8448EB211C80319C
+PARENT = trace.NonRecordingSpan(
+    trace.SpanContext(
+        trace_id=TRACE_ID,
+        span_id=0xB7AD6B7169203331,
+        is_remote=True,
+        trace_flags=trace.TraceFlags(trace.TraceFlags.SAMPLED),
+    )
+)
+
+
+def _trace_id() -> int:
+    return trace.get_current_span().get_span_context().trace_id
+
+
+@pytest.mark.asyncio
+async def test_outbound_requests_carry_traceparent() -> None:
+    """Client requests forward the active trace to the service they call."""
+    headers: list[httpx.Headers] = []
+    client = trace_client(
+        httpx.AsyncClient(
+            transport=httpx.MockTransport(
+                lambda request: headers.append(request.headers) or httpx.Response(204)
+            )
+        ),
+        "saas",
+    )
+    async with client:
+        with trace.use_span(PARENT):
+            await client.get("https://saas.example/api/saas/v1/enrollments")
+        await client.get("https://saas.example/api/saas/v1/enrollments")
+
+    assert f"{TRACE_ID:032x}" in headers[0]["traceparent"]
+    assert "traceparent" not in headers[1]
+
+
+class _Span(trace.NonRecordingSpan):
+    """Span double remembering its status and whether it ended."""
+
+    def __init__(self) -> None:
+        super().__init__(PARENT.get_span_context())
+        self.status: trace.Status | None = None
+        self.ended = False
+
+    def set_status(self, status: trace.Status, description: str | None = None) -> None:
+        self.status = status
+
+    def end(self, end_time: int | None = None) -> None:
+        self.ended = True
+
+
+@pytest.mark.asyncio
+async def test_client_spans_end_when_requests_fail(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """A request that times out still ends its span, with an error status."""
+    spans: list[_Span] = []
+
+    class _Tracer:
+        def start_span(self, name: str, **kwargs: object) -> _Span:
+            spans.append(_Span())
+            return spans[-1]
+
+    def respond(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/slow":
+            raise httpx.ReadTimeout("timed out", request=request)
+        return httpx.Response(204)
+
+    monkeypatch.setattr(tracing, "tracer", _Tracer())
+    client = trace_client(
+        httpx.AsyncClient(transport=httpx.MockTransport(respond)), "saas"
+    )
+    async with client:
+        await client.get("https://saas.example/fast")
+        with pytest.raises(httpx.ReadTimeout):
+            await client.get("https://saas.example/slow")
+
+    assert [span.ended for span in spans] == [True, True]
+    assert spans[0].status is None
+    assert spans[1].status.status_code == trace.StatusCode.ERROR
+
+
+@pytest.mark.asyncio
+async def test_outbox_handlers_continue_the_enqueuing_trace(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """A message is delivered in the trace of the request that recorded it."""
+    seen: list[int] = []
+
+    async def deliver(message: OutboxMessage) -> None:
+        await asyncio.sleep(0)
+        seen.append(_trace_id())
+
+    monkeypatch.setitem(services._handlers, OutboxKind.proposal, deliver)
+    await OutboxMessage.get_pymongo_collection().delete_many({})
+    with trace.use_span(PARENT):
+        await services.enqueue(
+            tenant_id="t-tracing",
+            kind=OutboxKind.proposal,
+            dedup_key="test:traced",
+            payload={"purchase_uid": "p1"},
+        )
+
+    assert _trace_id() != TRACE_ID
+    assert await services.drain_outbox() == 1
+    assert seen == [TRACE_ID]
@@ -0,0 +1,107 @@
+"""Tests for the shared USSO authenticator."""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from starlette.requests import Request
+from usso import UserData
+from usso.auth import UssoAuth
+
+from apps.purchase.models import Purchase
+from server.config import Settings
+from utils.usso import USSOUserMixin, get_usso
+
+
+def test_get_usso_is_shared() -> None:
+    """One authenticator per process and exception mode."""
+    assert get_usso() is get_usso()
+    assert get_usso(raise_exception=True) is not get_usso()
+
+
+def test_verified_credentials_are_cached(monkeypatch: pytest.MonkeyPatch) -> None:
+    """JWTs are verified once until exp; API keys for the configured TTL."""
+    verified: list[str] = []
+    lifetimes = {"fresh": 60, "expired": -1}
+
+    def verify_token(self: UssoAuth, token: str, **kwargs: object) -> UserData:
+        verified.append(token)
+        exp = int(time.time()) + lifetimes[token]
+        return UserData(sub="u1", tenant_id="t1", exp=exp)
+
+    def verify_api_key(self: UssoAuth, api_key: str) -> UserData:
+        verified.append(api_key)
+        return UserData(sub="u2", tenant_id="t1")
+
+    monkeypatch.setattr(UssoAuth, "user_data_from_token", verify_token)
+    monkeypatch.setattr(UssoAuth, "user_data_from_api_key", verify_api_key)
+    usso = get_usso()
+
+    for token in ["fresh", "fresh", "expired", "expired"]:
+        assert usso.user_data_from_token(token).sub == "u1"
+    for _ in range(2):
+        assert usso.user_data_from_api_key("key").sub == "u2"
+    assert verified == ["fresh", "expired", "expired", "key"]
+
+
+@pytest.mark.asyncio
+async def test_route_user_uses_async_api_key_lookup(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Routes verify API keys through the async lookup, off the event loop."""
+
+    def blocking(self: UssoAuth, api_key: str) -> UserData:
+        raise AssertionError
+
+    async def verify_api_key(self: UssoAuth, api_key: str) -> UserData:
+        await asyncio.sleep(0)
+        return UserData(sub="u3", tenant_id="t1")
+
+    monkeypatch.setattr(UssoAuth, "user_data_from_api_key", blocking)
+    monkeypatch.setattr(UssoAuth, "user_data_from_api_key_async", verify_api_key)
+    request = Request({
+        "type": "http",
+        "headers": [(b"x-api-key", b"async-key")],
+        "state": {},
+    })
+
+    assert (await USSOUserMixin().get_user(request)).sub == "u3"
+
+
+@pytest.mark.asyncio
+async def test_product_and_purchase_routes_verify_api_keys_async(
+    client: httpx.AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """API keys sent to the product and purchase routes never block the loop."""
+    verified: list[str] = []
+
+    def blocking(self: UssoAuth, api_key: str) -> UserData:
+        raise AssertionError
+
+    async def verify_api_key(self: UssoAuth, api_key: str) -> UserData:
+        await asyncio.sleep(0)
+        verified.append(api_key)
+        return UserData(sub="u-routes", tenant_id="t-routes")
+
+    monkeypatch.setattr(UssoAuth, "user_data_from_api_key", blocking)
+    monkeypatch.setattr(UssoAuth, "user_data_from_api_key_async", verify_api_key)
+    # Verify on every call instead of answering from the credential cache.
+    monkeypatch.setattr(Settings, "usso_api_key_cache_ttl", 0)
+    purchase = await Purchase(
+        tenant_id="t-routes",
+        user_id="u-routes",
+        wallet_id="w1",
+        basket_id="b1",
+        amount=10,
+        description="basket",
+        callback_url="https://shop.example/callback",
+    ).save()
+    headers = {"x-api-key": "route-key"}
+
+    products = await client.get("/products", headers=headers)
+    start = await client.post(f"/purchases/{purchase.uid}/start", headers=headers)
+
+    assert products.status_code == 200
+    assert start.json()["error_code"] == "no_ipg_available"
+    assert len(verified) >= 2
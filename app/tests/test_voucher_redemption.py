@@ -0,0 +1,70 @@
+"""Tests for the voucher redemption ledger."""
+
+import asyncio
+from decimal import Decimal
+
+import pytest
+from fastapi_mongo_base.errors import BadRequestError
+
+from apps.basket.models import Basket
+from apps.basket.schemas import VoucherSchema
+from apps.basket.services import apply_discount
+from apps.voucher.models import Voucher, VoucherRedemption
+
+
+@pytest.mark.asyncio
+async def test_redeem_is_idempotent_and_derives_counter() -> None:
+    """Replayed redemptions count once; release is reflected in the counter."""
+    voucher = await Voucher(
+        tenant_id="t1", user_id="owner", rate=Decimal(10), max_uses_per_user=1
+    ).save()
+
+    await voucher.redeem("u1", "b1")
+    await voucher.redeem("u1", "b1")
+    assert voucher.redeemed == 1
+    assert await VoucherRedemption.count_redeemed(voucher.uid, "u1") == 1
+    assert await VoucherRedemption.count_redeemed(voucher.uid, "u2") == 0
+
+    await voucher.release("u1", "b1")
+    await voucher.release("u1", "b1")
+    assert voucher.redeemed == 0
+    assert await VoucherRedemption.count_redeemed(voucher.uid, "u1") == 0
+
+    await voucher.redeem("u1", "b1")
+    stored = await Voucher.get_by_uid(voucher.uid)
+    assert stored.redeemed == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_redemptions_respect_max_uses() -> None:
+    """Only ``max_uses`` of many concurrent redemptions succeed."""
+    voucher = await Voucher(
+        tenant_id="t1", user_id="owner", rate=Decimal(10), max_uses=2
+    ).save()
+
+    redeemed = await asyncio.gather(*[
+        voucher.redeem(f"u{index}", f"b{index}") for index in range(6)
+    ])
+    assert sum(redeemed) == 2
+    assert await VoucherRedemption.count_redeemed(voucher.uid) == 2
+    assert (await Voucher.get_by_uid(voucher.uid)).redeemed == 2
+
+
+@pytest.mark.asyncio
+async def test_replacing_voucher_keeps_previous_when_new_is_exhausted() -> None:
+    """A rejected voucher leaves the basket's current redemption in place."""
+    kept = await Voucher(
+        tenant_id="t2", user_id=None, code="KEEP", rate=Decimal(10)
+    ).save()
+    full = await Voucher(
+        tenant_id="t2", user_id=None, code="FULL", rate=Decimal(10), max_uses=1
+    ).save()
+    assert await full.redeem("other", "b0")
+    basket = await Basket(tenant_id="t2", user_id="u1").save()
+
+    await apply_discount(basket, VoucherSchema(code="KEEP"))
+    with pytest.raises(BadRequestError):
+        await apply_discount(basket, VoucherSchema(code="FULL"))
+
+    assert basket.discount.code == "KEEP"
+    assert await VoucherRedemption.count_redeemed(kept.uid, "u1") == 1
@@ -0,0 +1,69 @@
+"""Tests for default-wallet resolution."""
+
+import asyncio
+
+import httpx
+import pytest
+from ufaas.wallet import WalletDetailSchema
+
+from utils.wallets import _wallet_locks, get_default_wallet_id
+
+
+class _Accounting:
+    """Accounting client double that counts wallet calls."""
+
+    tenant_id = "t-wallets"
+
+    def __init__(self) -> None:
+        self.wallets: list[dict] = []
+        self.calls = 0
+
+    async def get_token(self, scopes: str | list[str]) -> str:
+        await asyncio.sleep(0)
+        return "token"
+
+    async def get_wallets(self, **kwargs: object) -> list[WalletDetailSchema]:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return [WalletDetailSchema.model_validate(w) for w in self.wallets]
+
+    async def post(self, url: str, json: dict) -> httpx.Response:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        wallet = {
+            "uid": f"w{len(self.wallets)}",
+            "tenant_id": self.tenant_id,
+            "workspace_id": json["owner_id"],
+            "is_default": True,
+            "balance": {},
+        }
+        self.wallets.append(wallet)
+        return httpx.Response(201, json=wallet, request=httpx.Request("POST", url))
+
+
+@pytest.mark.asyncio
+async def test_default_wallet_single_flight_and_cache() -> None:
+    """Concurrent checkouts create one wallet; later lookups make no calls."""
+    client = _Accounting()
+    ids = await asyncio.gather(*[get_default_wallet_id(client, "o1") for _ in range(5)])
+    assert set(ids) == {"w0"}
+    assert len(client.wallets) == 1
+    calls = client.calls
+
+    assert await get_default_wallet_id(client, "o1") == "w0"
+    assert client.calls == calls
+
+
+@pytest.mark.asyncio
+async def test_failed_wallet_lookup_releases_its_lock() -> None:
+    """A lookup that raises leaves no per-owner lock behind."""
+    client = _Accounting()
+
+    async def failing(**kwargs: object) -> list[WalletDetailSchema]:
+        await asyncio.sleep(0)
+        raise httpx.ConnectError("down")
+
+    client.get_wallets = failing
+    with pytest.raises(httpx.ConnectError):
+        await get_default_wallet_id(client, "o-down")
+    assert (client.tenant_id, "o-down") not in _wallet_locks
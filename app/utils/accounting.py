@@ -0,0 +1,31 @@
+"""Accounting service client factory."""
+
+import os
+
+import httpx
+from ufaas.services import AccountingClient
+
+from server.config import Settings
+from utils.metrics import instrument_client
+from utils.tracing import trace_client
+
+
+def outbound_target(url: httpx.URL) -> str:
+    """Name the downstream service a request URL belongs to."""
+    text = str(url)
+    if text.startswith(Settings.ipg_base_url):
+        # Payment URLs look like {ipg_base_url}/api/{ipg}/v1/payments
+        segments = url.path.split("/")
+        return f"ipg:{segments[2]}" if len(segments) > 2 else "ipg"
+    if Settings.saas_base_url and text.startswith(Settings.saas_base_url):
+        return "saas"
+    accounting_url = os.getenv("ACCOUNTING_SERVICE_URL", "https://wallets.uln.me")
+    if text.startswith(accounting_url):
+        return "accounting"
+    return url.host
+
+
+def accounting_client(tenant_id: str) -> AccountingClient:
+    """Create an accounting client whose requests are timed and traced."""
+    client = instrument_client(AccountingClient(tenant_id), outbound_target)
+    return trace_client(client, outbound_target)
@@ -0,0 +1,127 @@
+"""Negotiated gzip/brotli response compression."""
+
+import anyio.to_thread
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+
+def negotiate_encoding(accept_encoding: str, available: list[str]) -> str | None:
+    """
+    Pick the content coding a client prefers among ``available``.
+
+    Honors q-values (``q=0`` refuses a coding) and ``*``; ties go to the
+    earlier entry of ``available``.
+    """
+    weights: dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        weight = 1.0
+        name, _, value = params.strip().partition("=")
+        if name == "q":
+            try:
+                weight = float(value)
+            except ValueError:
+                weight = 0.0
+        if coding := coding.strip():
+            weights[coding] = weight
+    wildcard = weights.get("*", 0.0)
+    best, best_weight = None, 0.0
+    for coding in available:
+        weight = weights.get(coding, wildcard)
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+class BrotliResponder(IdentityResponder):
+    """Brotli counterpart of Starlette's gzip responder."""
+
+    content_encoding = "br"
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int,
+        quality: int = 4,
+        *,
+        thread_minimum_size: int = 128 * 1024,
+        exclude_content_types: tuple[str, ...] = (),
+    ) -> None:
+        """Compress bodies of at least ``minimum_size`` bytes."""
+        super().__init__(app, minimum_size, exclude_content_types=exclude_content_types)
+        self.thread_minimum_size = thread_minimum_size
+        self.compressor = brotli.Compressor(quality=quality)
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        """Compress a chunk, off the event loop when it is large."""
+        if len(body) >= self.thread_minimum_size:
+            return await anyio.to_thread.run_sync(self._compress_body, body, more_body)
+        return self._compress_body(body, more_body)
+
+    def _compress_body(self, body: bytes, more_body: bool) -> bytes:
+        data = self.compressor.process(body)
+        return data + (
+            self.compressor.flush() if more_body else self.compressor.finish()
+        )
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress responses above a size threshold with the client's preferred coding.
+
+    Brotli is offered when the ``brotli`` package is installed; otherwise
+    this behaves like ``GZipMiddleware`` with proper q-value handling.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        compresslevel: int = 9,
+        brotli_quality: int = 4,
+        **kwargs: object,
+    ) -> None:
+        """Configure the threshold and per-coding levels."""
+        super().__init__(app, minimum_size, compresslevel, **kwargs)
+        self.brotli_quality = brotli_quality
+        self.encodings = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Wrap the response in the negotiated responder."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(
+            Headers(scope=scope).get("Accept-Encoding", ""), self.encodings
+        )
+        responder: IdentityResponder
+        if encoding == "br":
+            responder = BrotliResponder(
+                self.app,
+                self.minimum_size,
+                self.brotli_quality,
+                thread_minimum_size=self.thread_minimum_size,
+                exclude_content_types=self.exclude_content_types,
+            )
+        elif encoding == "gzip":
+            responder = GZipResponder(
+                self.app,
+                self.minimum_size,
+                compresslevel=self.compresslevel,
+                thread_minimum_size=self.thread_minimum_size,
+                exclude_content_types=self.exclude_content_types,
+            )
+        else:
+            responder = IdentityResponder(
+                self.app,
+                self.minimum_size,
+                exclude_content_types=self.exclude_content_types,
+            )
+        await responder(scope, receive, send)
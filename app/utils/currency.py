@@ -18,3 +18,12 @@ class Currency(StrEnum):
     USDT = "USDT"
     BTC = "BTC"
     ETH = "ETH"
+
+    @property
+    def decimals(self) -> int:
+        """Minor-unit precision used when rounding converted amounts."""
+        if self in {Currency.IRR, Currency.IRT}:
+            return 0
+        if self in {Currency.BTC, Currency.ETH}:
+            return 8
+        return 2
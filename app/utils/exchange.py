@@ -0,0 +1,152 @@
+"""Cached exchange rates for multi-currency baskets."""
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation, localcontext
+
+import httpx
+from fastapi_mongo_base.errors import BadRequestError
+from fastapi_mongo_base.utils import timezone
+from pydantic import BaseModel, ConfigDict, Field
+
+from server.config import Settings
+from utils.currency import Currency
+
+# Fixed parities that hold regardless of the market feed.
+FIXED_RATES = {Currency.IRR: Decimal(1), Currency.IRT: Decimal(10)}
+
+
+class ExchangeRateUnavailableError(BadRequestError):
+    """Raised when no rate is known for a currency pair."""
+
+    error_code = "exchange_rate_unavailable"
+    message_en = "Exchange rate is not available"
+    message_fa = "نرخ تبدیل ارز در دسترس نیست"
+
+
+def parse_rates(raw: object) -> dict[Currency, Decimal]:
+    """
+    Read ``{code: rate}`` into positive rates of known currencies.
+
+    Unknown codes (feeds list far more currencies than the shop sells) and
+    unusable rates are skipped, so one bad entry cannot block the others.
+    """
+    if not isinstance(raw, dict):
+        raise TypeError(f"Exchange rates must be an object, got {type(raw)}")
+    rates = {}
+    for code, value in raw.items():
+        if code not in Currency:
+            continue
+        try:
+            rate = Decimal(str(value))
+        except InvalidOperation:
+            rate = None
+        if rate is None or not rate.is_finite() or rate <= 0:
+            logging.warning("Ignoring exchange rate %s=%r", code, value)
+            continue
+        rates[Currency(code)] = rate
+    return rates
+
+
+class RateTable(BaseModel):
+    """Immutable snapshot of rates, as base-currency units per unit."""
+
+    model_config = ConfigDict(frozen=True)
+
+    base: Currency = Currency.IRR
+    rates: dict[Currency, Decimal] = Field(default_factory=lambda: dict(FIXED_RATES))
+    fetched_at: datetime | None = None
+
+    def rate(self, source: str, target: str) -> Decimal:
+        """Units of ``target`` per unit of ``source``."""
+        if source == target:
+            return Decimal(1)
+        try:
+            return self.rates[Currency(source)] / self.rates[Currency(target)]
+        except (KeyError, ValueError) as e:
+            raise ExchangeRateUnavailableError(detail=f"{source}->{target}") from e
+
+    def convert_total(
+        self, amounts: Iterable[tuple[Decimal, str]], target: str
+    ) -> Decimal:
+        """
+        Sum amounts in mixed currencies into ``target`` in one pass.
+
+        Amounts are summed exactly per currency and converted once per
+        currency; only the converted part is rounded, half-up, to the
+        target currency's precision.
+        """
+        totals: defaultdict[str, Decimal] = defaultdict(Decimal)
+        for amount, currency in amounts:
+            totals[currency] += amount
+
+        same = totals.pop(target, Decimal(0))
+        if not totals:
+            return same
+        with localcontext(prec=50):
+            converted = sum(
+                (
+                    amount * self.rate(currency, target)
+                    for currency, amount in totals.items()
+                ),
+                Decimal(0),
+            )
+        exponent = Decimal(1).scaleb(-Currency(target).decimals)
+        return same + converted.quantize(exponent, rounding=ROUND_HALF_UP)
+
+
+class ExchangeRates:
+    """
+    Process-wide rate cache refreshed in the background.
+
+    Request handlers only read ``table``; a worker task swaps in a new
+    snapshot every ``exchange_rates_refresh_interval`` seconds, and a
+    failed refresh keeps serving the last good table.
+    """
+
+    def __init__(self) -> None:
+        """Start from the fixed parities and any configured static rates."""
+        self.table = RateTable(rates=FIXED_RATES | self._static_rates())
+
+    @staticmethod
+    def _static_rates() -> dict[Currency, Decimal]:
+        try:
+            return parse_rates(json.loads(Settings.exchange_rates or "{}"))
+        except (ValueError, TypeError):
+            logging.exception("Invalid EXCHANGE_RATES; ignoring static rates")
+            return {}
+
+    async def refresh(self) -> RateTable:
+        """Fetch the rate feed and publish a new table."""
+        if not Settings.exchange_rates_url:
+            return self.table
+        try:
+            async with httpx.AsyncClient(timeout=10) as client:
+                response = await client.get(Settings.exchange_rates_url)
+                response.raise_for_status()
+            fetched = parse_rates(response.json()["rates"])
+        except (httpx.HTTPError, KeyError, ValueError, TypeError):
+            logging.exception("Exchange rate refresh failed; keeping last table")
+            return self.table
+
+        self.table = RateTable(
+            rates=self._static_rates() | fetched | FIXED_RATES,
+            fetched_at=datetime.now(timezone.tz),
+        )
+        return self.table
+
+    async def refresh_forever(self) -> None:
+        """Refresh the table until cancelled."""
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logging.exception("Exchange rate refresh crashed; retrying later")
+            await asyncio.sleep(Settings.exchange_rates_refresh_interval)
+
+
+exchange_rates = ExchangeRates()
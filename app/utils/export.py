@@ -0,0 +1,93 @@
+"""Streaming NDJSON export utilities."""
+
+from collections.abc import AsyncIterator
+from datetime import datetime
+
+from fastapi import Query, Request
+from fastapi.responses import StreamingResponse
+from fastapi_mongo_base.errors import BadRequestError, ForbiddenError
+from fastapi_mongo_base.models import BaseEntity
+
+from server.config import Settings
+from utils.ndjson import dump_lines
+
+
+class InvalidExportFieldsError(BadRequestError):
+    """Raised when an export asks for fields the model does not have."""
+
+    error_code = "invalid_export_fields"
+    message_en = "Invalid export fields"
+    message_fa = "فیلدهای خروجی نامعتبر است"
+
+
+def export_projection(model: type[BaseEntity], fields: str | None) -> dict:
+    """Build a Mongo projection from a comma separated field list."""
+    projection: dict = {"_id": 0}
+    if not fields:
+        return projection
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    if unknown := names - model.model_fields.keys():
+        raise InvalidExportFieldsError(detail=", ".join(sorted(unknown)))
+    return projection | dict.fromkeys(names, 1)
+
+
+async def export_documents(
+    model: type[BaseEntity],
+    query: dict,
+    *,
+    projection: dict | None = None,
+    batch_size: int | None = None,
+) -> AsyncIterator[bytes]:
+    """Stream matching documents oldest first as NDJSON chunks."""
+    batch_size = batch_size or Settings.export_batch_size
+    cursor = (
+        model
+        .get_pymongo_collection()
+        .find(query, projection or {"_id": 0}, batch_size=batch_size)
+        .sort([("created_at", 1), ("uid", 1)])
+    )
+    async for chunk in dump_lines(cursor, batch_size):
+        yield chunk
+
+
+class ExportMixin:
+    """Router mixin adding a streaming ``GET /export`` endpoint."""
+
+    def config_routes(self, **kwargs: object) -> None:
+        """Register the export route ahead of ``/{uid}``."""
+        self.router.add_api_route(
+            "/export",
+            self.export_items,
+            methods=["GET"],
+            response_class=StreamingResponse,
+            responses={200: {"content": {"application/x-ndjson": {}}}},
+        )
+        super().config_routes(**kwargs)
+
+    async def export_items(
+        self,
+        request: Request,
+        created_at_from: datetime | None = None,
+        created_at_to: datetime | None = None,
+        fields: str | None = Query(None, description="Comma separated fields"),
+    ) -> StreamingResponse:
+        """Export the caller's visible items as NDJSON."""
+        user = await self.get_user(request)
+        filters = self.get_list_filter_queries(user=user)
+        if filters.get("__deny__"):
+            raise ForbiddenError()
+
+        query = self.model.get_queryset(
+            tenant_id=user.tenant_id,
+            created_at_from=created_at_from,
+            created_at_to=created_at_to,
+            **filters,
+        )
+        filename = f"{self.model.get_collection_name()}.ndjson"
+        return StreamingResponse(
+            export_documents(
+                self.model, query, projection=export_projection(self.model, fields)
+            ),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
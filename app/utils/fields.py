@@ -0,0 +1,83 @@
+"""Sparse fieldsets: list responses carrying only the fields asked for."""
+
+from datetime import UTC, datetime
+from decimal import Decimal
+from functools import cache
+
+from bson import Decimal128
+from fastapi import Response
+from fastapi_mongo_base.errors import BadRequestError
+from fastapi_mongo_base.schemas import PaginatedResponse
+from pydantic import BaseModel, TypeAdapter
+
+
+class InvalidFieldsError(BadRequestError):
+    """Raised when ``fields`` names fields the schema does not have."""
+
+    error_code = "invalid_fields"
+    message_en = "Invalid fields"
+    message_fa = "فیلدهای نامعتبر است"
+
+
+def parse_fields(fields: str | None, schema: type[BaseModel]) -> set[str] | None:
+    """Parse a comma separated field list; ``uid`` is always included."""
+    if not fields:
+        return None
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    if unknown := names - schema.model_fields.keys():
+        raise InvalidFieldsError(detail=", ".join(sorted(unknown)))
+    return names | {"uid"}
+
+
+def field_projection(names: set[str]) -> dict:
+    """Mongo projection returning only ``names``."""
+    return {"_id": 0} | dict.fromkeys(names, 1)
+
+
+def from_bson(value: object) -> object:
+    """Turn stored BSON values into what the schemas hold after validation."""
+    if isinstance(value, dict):
+        return {key: from_bson(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [from_bson(item) for item in value]
+    if isinstance(value, Decimal128):
+        return Decimal(value.to_decimal())
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value
+
+
+@cache
+def field_adapter(schema: type[BaseModel], name: str) -> TypeAdapter:
+    """Build the validator of one schema field, once per field."""
+    return TypeAdapter(schema.model_fields[name].annotation)
+
+
+def sparse_items[T: BaseModel](schema: type[T], documents: list[dict]) -> list[T]:
+    """
+    Build partial ``schema`` instances from projected documents.
+
+    Projected documents miss required fields, so each present field is
+    validated on its own and the instance is constructed around them;
+    model validators are skipped while the schema's serializers apply.
+    """
+    return [
+        schema.model_construct(**{
+            name: field_adapter(schema, name).validate_python(value)
+            for name, value in from_bson(doc).items()
+            if name in schema.model_fields
+        })
+        for doc in documents
+    ]
+
+
+def sparse_response(page: PaginatedResponse, names: set[str]) -> Response:
+    """Serialize a page keeping only ``names`` of each item and its heads."""
+    include = dict.fromkeys(type(page).model_fields, True) | {
+        "items": {"__all__": names},
+        "heads": names,
+    }
+    return Response(
+        page.model_dump_json(include=include),
+        media_type="application/json",
+    )
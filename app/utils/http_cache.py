@@ -0,0 +1,63 @@
+"""HTTP caching and conditional request utilities."""
+
+import hashlib
+from collections.abc import Iterable
+from datetime import datetime
+
+from fastapi import Request, Response
+from fastapi_mongo_base.utils import timezone
+
+
+def version_of(updated_at: datetime) -> int:
+    """Return a version number (epoch milliseconds) for an update time."""
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.tz)
+    return int(updated_at.timestamp() * 1000)
+
+
+def version_etag(uid: str, updated_at: datetime) -> str:
+    """Build a weak ETag for one entity version."""
+    return f'W/"{uid}-{version_of(updated_at)}"'
+
+
+def collection_etag(etags: Iterable[str], *parts: object) -> str:
+    """Build a weak ETag for a page of entities and its paging state."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (*etags, *parts):
+        digest.update(str(part).encode())
+        digest.update(b"\0")
+    return f'W/"{digest.hexdigest()}"'
+
+
+def cache_control(
+    max_age: int, stale_while_revalidate: int = 0, *, public: bool = True
+) -> str:
+    """Build a Cache-Control header value."""
+    directives = ["public" if public else "private", f"max-age={max_age}"]
+    if stale_while_revalidate:
+        directives.append(f"stale-while-revalidate={stale_while_revalidate}")
+    return ", ".join(directives)
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Check If-None-Match against an ETag using weak comparison."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def set_cache_headers(response: Response, etag: str, control: str) -> None:
+    """Attach validator and freshness headers to a response."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = control
+
+
+def not_modified(etag: str, control: str) -> Response:
+    """Build an empty 304 response carrying the cache headers."""
+    response = Response(status_code=304)
+    set_cache_headers(response, etag, control)
+    return response
@@ -1,18 +1,33 @@
 """IPG payment utilities."""
 
+import asyncio
+from collections.abc import Awaitable, Callable
 from datetime import datetime
 from decimal import Decimal
 from enum import StrEnum
 
+import httpx
+from fastapi_mongo_base.errors import ServiceUnavailableError
 from fastapi_mongo_base.schemas import (
     BaseEntitySchema,
 )
 from pydantic import (
     BaseModel,
 )
-from ufaas.services import AccountingClient
 
 from server.config import Settings
+from utils.accounting import accounting_client
+from utils.ipg_routing import ipg_router, is_gateway_failure
+from utils.resilience import CircuitState, backoff_delay
+from utils.tracing import annotate, traced
+
+
+class IPGCircuitOpenError(ServiceUnavailableError):
+    """Raised without calling a gateway whose circuit is open."""
+
+    error_code = "ipg_unavailable"
+    message_en = "Payment gateway is temporarily unavailable"
+    message_fa = "درگاه پرداخت موقتا در دسترس نیست"
 
 
 class PaymentStatus(StrEnum):
@@ -59,21 +74,102 @@ class IPGPaymentSchema(BaseModel):
     status: PaymentStatus = PaymentStatus.INIT
 
 
+def ipg_timeout() -> httpx.Timeout:
+    """Per-request deadlines for gateway calls."""
+    return httpx.Timeout(
+        Settings.ipg_read_timeout, connect=Settings.ipg_connect_timeout
+    )
+
+
+def _is_retryable(error: httpx.HTTPError, *, idempotent: bool) -> bool:
+    """Whether a failed gateway call may be sent again."""
+    if isinstance(error, httpx.ConnectError | httpx.ConnectTimeout):
+        return True  # the request never reached the gateway
+    if not idempotent:
+        return False
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+async def call_ipg(
+    ipg: str,
+    send: Callable[[], Awaitable[httpx.Response]],
+    *,
+    idempotent: bool,
+) -> httpx.Response:
+    """
+    Call a gateway through its circuit breaker and retry budget.
+
+    Non-idempotent calls are only retried when the connection failed
+    before the request was sent.
+    """
+    breaker = ipg_router.get_breaker(ipg)
+    if not breaker.allow():
+        raise IPGCircuitOpenError(detail=f"Circuit open for {ipg}")
+    probe = breaker.state == CircuitState.half_open
+    budget = ipg_router.get_retry_budget(ipg)
+    budget.deposit()
+
+    attempt = 0
+    try:
+        while True:
+            try:
+                with ipg_router.track(ipg):
+                    response = await send()
+                    response.raise_for_status()
+            except httpx.HTTPError as e:
+                if (
+                    attempt < Settings.ipg_max_retries
+                    and _is_retryable(e, idempotent=idempotent)
+                    and budget.try_spend()
+                ):
+                    await asyncio.sleep(
+                        backoff_delay(
+                            attempt,
+                            Settings.ipg_retry_backoff,
+                            Settings.ipg_read_timeout,
+                        )
+                    )
+                    attempt += 1
+                    continue
+                if is_gateway_failure(e):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                raise
+            breaker.record_success()
+            return response
+    finally:
+        # A cancelled or crashed probe must not lock the gateway out.
+        if probe:
+            breaker.end_probe()
+
+
 def get_payment_ipg_url(ipg: str) -> str:
     """Get the payment URL for a given IPG provider."""
     return f"{Settings.ipg_base_url}/api/{ipg}/v1/payments"
 
 
+@traced("ipg.create_payment")
 async def create_payment(
     tenant_id: str, ipg: str, ipg_schema: IPGPaymentSchema
 ) -> PaymentSchema:
     """Create a payment via the specified IPG provider."""
+    annotate(ipg=ipg)
     payment_ipg_url = get_payment_ipg_url(ipg)
-    async with AccountingClient(tenant_id) as client:
+    async with accounting_client(tenant_id) as client:
         await client.get_token("create:finance/ipg/payment")
-        response = await client.post(
-            url=payment_ipg_url, json=ipg_schema.model_dump(mode="json")
+        response = await call_ipg(
+            ipg,
+            lambda: client.post(
+                url=payment_ipg_url,
+                json=ipg_schema.model_dump(mode="json"),
+                timeout=ipg_timeout(),
+            ),
+            idempotent=False,
         )
-        response.raise_for_status()
 
-    return PaymentSchema.model_validate(response.json() | {"ipg": ipg})
+    payment = PaymentSchema.model_validate(response.json() | {"ipg": ipg})
+    annotate(payment_uid=payment.uid)
+    return payment
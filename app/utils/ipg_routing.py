@@ -0,0 +1,194 @@
+"""Health-aware selection between a tenant's payment gateways."""
+
+import random
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import StrEnum
+
+import httpx
+
+from server.config import Settings
+from utils.metrics import render_gauge
+from utils.resilience import CircuitBreaker, RetryBudget
+
+
+def is_gateway_failure(error: Exception) -> bool:
+    """Whether an error says the gateway itself is unhealthy, not the request."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+class RoutingStrategy(StrEnum):
+    """IPG selection strategies."""
+
+    least_latency = "least_latency"
+    weighted = "weighted"
+
+
+@dataclass
+class IPGStats:
+    """
+    Exponentially weighted health figures for one gateway.
+
+    The error rate also halves every ``ipg_error_half_life`` seconds
+    without calls, so a gateway excluded for failing gets traffic again
+    and can prove it recovered.
+    """
+
+    calls: int = 0
+    latency: float = 0.0
+    error_rate: float = 0.0
+    payments: int = 0
+    successes: int = 0
+    updated_at: float = field(default_factory=time.monotonic)
+
+    def current_error_rate(self, now: float | None = None) -> float:
+        """Error rate faded by the time since the last call."""
+        if Settings.ipg_error_half_life <= 0:
+            return self.error_rate
+        elapsed = (time.monotonic() if now is None else now) - self.updated_at
+        return self.error_rate * 0.5 ** (elapsed / Settings.ipg_error_half_life)
+
+    def record_call(self, latency: float, *, ok: bool) -> None:
+        """Fold one gateway call into the moving averages."""
+        now = time.monotonic()
+        alpha = Settings.ipg_stats_alpha if self.calls else 1.0
+        error_rate = self.current_error_rate(now)
+        self.calls += 1
+        self.latency += alpha * (latency - self.latency)
+        self.error_rate = error_rate + alpha * ((0.0 if ok else 1.0) - error_rate)
+        self.updated_at = now
+
+    def record_payment(self, *, success: bool) -> None:
+        """Count a settled payment outcome."""
+        self.payments += 1
+        self.successes += success
+
+    @property
+    def success_ratio(self) -> float:
+        """Share of settled payments that succeeded, optimistic when unknown."""
+        return (self.successes + 1) / (self.payments + 1)
+
+    @property
+    def is_healthy(self) -> bool:
+        """Whether the gateway should receive new payments."""
+        return (
+            self.calls < Settings.ipg_min_samples
+            or self.current_error_rate() < Settings.ipg_max_error_rate
+        )
+
+    @property
+    def score(self) -> float:
+        """Weight for the weighted strategy; higher is better."""
+        error_rate = self.current_error_rate()
+        return self.success_ratio * (1.0 - error_rate) / (self.latency + 0.05)
+
+
+class IPGRouter:
+    """In-process gateway health tracker and selector."""
+
+    def __init__(self) -> None:
+        """Start with no observations."""
+        self.stats: dict[str, IPGStats] = {}
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.retry_budgets: dict[str, RetryBudget] = {}
+
+    def get_stats(self, ipg: str) -> IPGStats:
+        """Get the stats of a gateway, creating them on first use."""
+        return self.stats.setdefault(ipg, IPGStats())
+
+    def get_breaker(self, ipg: str) -> CircuitBreaker:
+        """Get the circuit breaker of a gateway."""
+        if ipg not in self.breakers:
+            self.breakers[ipg] = CircuitBreaker(
+                name=f"ipg:{ipg}",
+                failure_threshold=Settings.ipg_breaker_failure_threshold,
+                reset_timeout=Settings.ipg_breaker_reset_timeout,
+            )
+        return self.breakers[ipg]
+
+    def get_retry_budget(self, ipg: str) -> RetryBudget:
+        """Get the retry budget of a gateway."""
+        return self.retry_budgets.setdefault(
+            ipg, RetryBudget(ratio=Settings.ipg_retry_budget_ratio)
+        )
+
+    def metrics(self) -> dict[str, dict[str, float | str]]:
+        """Per-gateway health and breaker figures."""
+        return {
+            ipg: {
+                "latency_seconds": stats.latency,
+                "error_rate": stats.current_error_rate(),
+                "success_ratio": stats.success_ratio,
+                "circuit_state": self.get_breaker(ipg).state,
+                "retry_tokens": self.get_retry_budget(ipg).tokens,
+            }
+            for ipg, stats in self.stats.items()
+        }
+
+    def render_metrics(self) -> list[str]:
+        """Per-gateway health figures as Prometheus gauges."""
+        figures = self.metrics()
+        lines = []
+        for figure, documentation in [
+            ("latency_seconds", "Smoothed gateway call latency in seconds."),
+            ("error_rate", "Smoothed gateway call error rate."),
+            ("success_ratio", "Share of settled payments that succeeded."),
+            ("circuit_state", "Circuit state (0 closed, 1 half-open, 2 open)."),
+            ("retry_tokens", "Retry budget tokens left."),
+        ]:
+            lines += render_gauge(
+                f"ipg_{figure}",
+                documentation,
+                ("ipg",),
+                (
+                    ((ipg,), getattr(values[figure], "level", values[figure]))
+                    for ipg, values in figures.items()
+                ),
+            )
+        return lines
+
+    @contextmanager
+    def track(self, ipg: str) -> Generator[None]:
+        """
+        Time a gateway call, recording it as failed if the gateway failed.
+
+        Rejected requests (4xx) still prove the gateway is up; errors that
+        are not the gateway's are not recorded at all.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            if isinstance(e, httpx.HTTPError):
+                self.get_stats(ipg).record_call(
+                    time.perf_counter() - start, ok=not is_gateway_failure(e)
+                )
+            raise
+        self.get_stats(ipg).record_call(time.perf_counter() - start, ok=True)
+
+    def choose(
+        self, ipgs: list[str], strategy: RoutingStrategy | None = None
+    ) -> str | None:
+        """Pick the best healthy gateway, or the least failing if none is."""
+        if not ipgs:
+            return None
+        strategy = RoutingStrategy(strategy or Settings.ipg_routing_strategy)
+        stats = {ipg: self.get_stats(ipg) for ipg in ipgs}
+        healthy = [
+            ipg
+            for ipg in ipgs
+            if stats[ipg].is_healthy and not self.get_breaker(ipg).is_open
+        ]
+        if not healthy:
+            return min(ipgs, key=lambda ipg: stats[ipg].current_error_rate())
+        if strategy == RoutingStrategy.weighted:
+            weights = [stats[ipg].score for ipg in healthy]
+            return random.choices(healthy, weights=weights)[0]  # ruff:ignore[suspicious-non-cryptographic-random-usage]
+        return min(healthy, key=lambda ipg: stats[ipg].latency)
+
+
+ipg_router = IPGRouter()
@@ -0,0 +1,95 @@
+"""Structured log formatting and access-log filtering."""
+
+import json
+import logging
+import random
+from datetime import UTC, datetime
+from urllib.parse import urlsplit
+
+from utils.serialization import dumps
+
+# Attributes every LogRecord has; anything else was passed as ``extra``.
+_RECORD_ATTRS = frozenset(logging.LogRecord("", 0, "", 0, "", None, None).__dict__) | {
+    "message",
+    "asctime",
+    "taskName",
+}
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Serialize the record with its ``extra`` fields."""
+        entry = {
+            "time": datetime.fromtimestamp(record.created, UTC).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "location": f"{record.filename}:{record.lineno}",
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        entry.update(
+            (key, value)
+            for key, value in record.__dict__.items()
+            if key not in _RECORD_ATTRS
+        )
+        return dumps(entry, default=str).decode()
+
+
+class AccessLogFilter(logging.Filter):
+    """
+    Sample and level-filter uvicorn access records.
+
+    A request is logged at ERROR for 5xx, WARNING for 4xx and INFO
+    otherwise, and kept when that level reaches the level configured for
+    the longest matching path prefix. Kept INFO records are then sampled
+    at ``sample_rate``; failures are never sampled out.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 1.0,
+        route_levels: str | dict[str, str] | None = None,
+    ) -> None:
+        """Parse the route levels, given as a dict or a JSON object."""
+        super().__init__()
+        self.sample_rate = sample_rate
+        if isinstance(route_levels, str):
+            route_levels = json.loads(route_levels or "{}")
+        self.route_levels = sorted(
+            (
+                (prefix, logging.getLevelNamesMapping()[level.upper()])
+                for prefix, level in (route_levels or {}).items()
+            ),
+            key=lambda item: len(item[0]),
+            reverse=True,
+        )
+
+    def route_level(self, path: str) -> int:
+        """Level configured for the longest prefix of ``path``."""
+        for prefix, level in self.route_levels:
+            if path.startswith(prefix):
+                return level
+        return logging.INFO
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Decide whether to emit an access record, adding request fields."""
+        try:
+            client, method, full_path, _, status_code = record.args
+        except (TypeError, ValueError):
+            return True
+        path = urlsplit(full_path).path
+        if status_code >= 500:
+            record.levelno, record.levelname = logging.ERROR, "ERROR"
+        elif status_code >= 400:
+            record.levelno, record.levelname = logging.WARNING, "WARNING"
+        if record.levelno < self.route_level(path):
+            return False
+        sampled_out = random.random() >= self.sample_rate  # ruff:ignore[suspicious-non-cryptographic-random-usage]
+        if record.levelno == logging.INFO and sampled_out:
+            return False
+        record.client, record.method = client, method
+        record.path, record.status_code = path, status_code
+        return True
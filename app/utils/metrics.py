@@ -0,0 +1,282 @@
+"""In-process Prometheus metrics without the prometheus_client dependency."""
+
+import hmac
+import ipaddress
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from typing import ClassVar
+
+import httpx
+from pymongo import monitoring
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.transports import WrappedTransport, wrap_transports
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.075,
+    0.1,
+    0.25,
+    0.5,
+    0.75,
+    1.0,
+    2.5,
+    5.0,
+    7.5,
+    10.0,
+)
+
+
+def _escape(value: object) -> str:
+    text = str(value)
+    return text.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _labels(names: Iterable[str], values: Iterable[object]) -> str:
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)
+    )
+    return f"{{{pairs}}}" if pairs else ""
+
+
+class Histogram:
+    """
+    Labelled latency histogram.
+
+    Observations only index into a per-series list owned by the event loop
+    thread, so recording takes no lock; buckets are made cumulative when
+    the histogram is rendered.
+    """
+
+    registry: ClassVar[list["Histogram"]] = []
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...],
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        """Create and register the histogram."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # Per series: one count per bucket, then +Inf, sum and count.
+        self.series: dict[tuple[str, ...], list[float]] = {}
+        Histogram.registry.append(self)
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Record one observation for the given label values."""
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series.setdefault(labels, [0] * (len(self.buckets) + 3))
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> list[str]:
+        """Prometheus text exposition lines."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        bounds = [*map(str, self.buckets), "+Inf"]
+        for labels, series in list(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, series[:-2], strict=True):
+                cumulative += count
+                label_str = _labels((*self.labelnames, "le"), (*labels, bound))
+                lines.append(f"{self.name}_bucket{label_str} {cumulative}")
+            label_str = _labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {series[-2]}")
+            lines.append(f"{self.name}_count{label_str} {series[-1]}")
+        return lines
+
+
+def render_gauge(
+    name: str,
+    documentation: str,
+    labelnames: tuple[str, ...],
+    samples: Iterable[tuple[tuple[str, ...], float]],
+) -> list[str]:
+    """Prometheus text exposition lines of a gauge read at scrape time."""
+    return [
+        f"# HELP {name} {documentation}",
+        f"# TYPE {name} gauge",
+        *(f"{name}{_labels(labelnames, labels)} {value}" for labels, value in samples),
+    ]
+
+
+request_latency = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency in seconds.",
+    ("method", "endpoint", "status_code"),
+)
+mongo_latency = Histogram(
+    "mongodb_command_duration_seconds",
+    "MongoDB command latency in seconds.",
+    ("collection", "command", "outcome"),
+)
+outbound_latency = Histogram(
+    "http_client_request_duration_seconds",
+    "Outbound HTTP request latency in seconds.",
+    ("target", "method", "status_code", "outcome"),
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing requests per route template."""
+
+    excluded_paths: ClassVar[set[str]] = {
+        "/metrics",
+        "/docs",
+        "/redoc",
+        "/openapi.json",
+        "/favicon.ico",
+    }
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Wrap the application."""
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Time the request and record it under its route template."""
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            endpoint = getattr(scope.get("route"), "path", "<unmatched>")
+            request_latency.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                endpoint,
+                str(status_code),
+            )
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Time MongoDB commands per collection, which is per Beanie model."""
+
+    def __init__(self) -> None:
+        """Start with no commands in flight."""
+        self.pending: dict[tuple[object, int], tuple[str, str]] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        """Remember which collection a command targets."""
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = "-"
+        key = (event.connection_id, event.request_id)
+        self.pending[key] = (collection, event.command_name)
+
+    def _finish(self, event: monitoring.CommandSucceededEvent, outcome: str) -> None:
+        target = self.pending.pop((event.connection_id, event.request_id), None)
+        if target is not None:
+            mongo_latency.observe(event.duration_micros / 1e6, *target, outcome)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        """Record a successful command."""
+        self._finish(event, "success")
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        """Record a failed command."""
+        self._finish(event, "failure")
+
+
+monitoring.register(MongoCommandListener())
+
+
+class _TimedTransport(WrappedTransport):
+    """Transport timing every request, including the ones that never answer."""
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        target: str | Callable[[httpx.URL], str],
+    ) -> None:
+        super().__init__(transport)
+        self.target = target
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Record the status code, or the error type as the outcome."""
+        name = self.target(request.url) if callable(self.target) else self.target
+        start = time.perf_counter()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException as e:
+            outbound_latency.observe(
+                time.perf_counter() - start,
+                name,
+                request.method,
+                "none",
+                type(e).__name__,
+            )
+            raise
+        outbound_latency.observe(
+            time.perf_counter() - start,
+            name,
+            request.method,
+            str(response.status_code),
+            "response",
+        )
+        return response
+
+
+def instrument_client[C: httpx.AsyncClient](
+    client: C, target: str | Callable[[httpx.URL], str]
+) -> C:
+    """
+    Time a client's requests under a fixed or URL-derived target name.
+
+    Timeouts and connection errors are recorded with ``status_code="none"``
+    and the exception name, e.g. ``ConnectTimeout``, as the outcome.
+    """
+    return wrap_transports(client, lambda transport: _TimedTransport(transport, target))
+
+
+def metrics_allowed(request: Request, token: str) -> bool:
+    """
+    Whether a caller may scrape ``/metrics``.
+
+    With a token, callers must send it as a bearer token; without one only
+    loopback and private addresses are served, so the endpoint must then
+    not be reachable through a public proxy that hides the caller.
+    """
+    if token:
+        scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+        return scheme.lower() == "bearer" and hmac.compare_digest(
+            credentials.encode(), token.encode()
+        )
+    if request.client is None:
+        return False
+    try:
+        address = ipaddress.ip_address(request.client.host)
+    except ValueError:
+        return False
+    return address.is_loopback or address.is_private
+
+
+def render_metrics(*extra: Iterable[str]) -> str:
+    """Render every registered metric in the Prometheus text format."""
+    lines = [line for histogram in Histogram.registry for line in histogram.render()]
+    for block in extra:
+        lines.extend(block)
+    return "\n".join(lines) + "\n"
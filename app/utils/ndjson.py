@@ -0,0 +1,69 @@
+"""Newline-delimited JSON streaming utilities."""
+
+from collections.abc import AsyncIterable, AsyncIterator
+
+from utils.serialization import dumps
+
+
+async def iter_lines(
+    chunks: AsyncIterable[bytes], max_length: int
+) -> AsyncIterator[tuple[int, bytes | None]]:
+    """
+    Yield ``(line_number, line)`` for non-empty lines of a byte stream.
+
+    Only the current partial line is held in memory, and at most
+    ``max_length`` bytes of it: longer lines are dropped and yielded as
+    ``None`` so the caller can report them.
+    """
+    parts: list[bytes] = []
+    size = 0
+    too_long = False
+    line_number = 0
+    async for chunk in chunks:
+        start = 0
+        while (end := chunk.find(b"\n", start)) >= 0:
+            line_number += 1
+            piece = chunk[start:end]
+            if too_long or size + len(piece) > max_length:
+                yield line_number, None
+            elif (line := b"".join([*parts, piece])).strip():
+                yield line_number, line
+            parts, size, too_long = [], 0, False
+            start = end + 1
+        rest = chunk[start:]
+        if too_long or not rest:
+            continue
+        if size + len(rest) > max_length:
+            parts, size, too_long = [], 0, True
+        else:
+            parts.append(rest)
+            size += len(rest)
+    if too_long:
+        yield line_number + 1, None
+    elif (line := b"".join(parts)).strip():
+        yield line_number + 1, line
+
+
+async def batched[T](items: AsyncIterable[T], size: int) -> AsyncIterator[list[T]]:
+    """Group an async iterable into lists of at most ``size`` items."""
+    batch: list[T] = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def dump_lines(
+    documents: AsyncIterable[dict], batch_size: int
+) -> AsyncIterator[bytes]:
+    """
+    Encode raw Mongo documents as NDJSON, one chunk per cursor batch.
+
+    Chunks are produced only as the consumer reads them, so a slow client
+    throttles the cursor instead of buffering the result set.
+    """
+    async for batch in batched(documents, batch_size):
+        yield b"".join(dumps(doc) + b"\n" for doc in batch)
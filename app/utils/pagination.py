@@ -0,0 +1,421 @@
+"""Keyset (cursor) pagination utilities."""
+
+import asyncio
+import base64
+import binascii
+from datetime import datetime
+from decimal import Decimal
+from enum import StrEnum
+from typing import Any
+
+from bson import Decimal128, ObjectId, json_util
+from bson.errors import BSONError
+from fastapi import Query, Request, Response
+from fastapi_mongo_base.errors import BadRequestError, ForbiddenError
+from fastapi_mongo_base.models import BaseEntity
+from fastapi_mongo_base.schemas import PaginatedResponse
+from pydantic import BaseModel, model_validator
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from usso import UserData
+
+from server.config import Settings
+from utils.fields import (
+    field_projection,
+    parse_fields,
+    sparse_items,
+    sparse_response,
+)
+
+# Sort fields that keyset pages are indexed for, see :func:`keyset_index`.
+KEYSET_SORT_FIELDS = frozenset({"created_at"})
+CURSOR_VALUE_TYPES = (
+    str,
+    int,
+    float,
+    Decimal,
+    Decimal128,
+    datetime,
+    ObjectId,
+    type(None),
+)
+
+
+def keyset_index() -> IndexModel:
+    """Index serving a user's keyset pages in ``KEYSET_SORT_FIELDS`` order."""
+    return IndexModel([
+        ("tenant_id", ASCENDING),
+        ("user_id", ASCENDING),
+        ("is_deleted", ASCENDING),
+        ("created_at", DESCENDING),
+        ("uid", DESCENDING),
+    ])
+
+
+class PaginationMode(StrEnum):
+    """List pagination modes."""
+
+    offset = "offset"
+    cursor = "cursor"
+
+
+class CursorPaginatedResponse[T: BaseModel](PaginatedResponse[T]):
+    """Paginated response that also carries a continuation token."""
+
+    total: int | None = None
+    next_cursor: str | None = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def validate_total(cls, values: dict[str, Any]) -> dict[str, Any]:
+        """Keep total unset when the count was not requested."""
+        return values
+
+
+class InvalidCursorError(BadRequestError):
+    """Raised when a continuation token cannot be used."""
+
+    error_code = "invalid_cursor"
+    message_en = "Invalid pagination cursor"
+    message_fa = "نشانگر صفحه‌بندی نامعتبر است"
+
+
+class InvalidSortFieldError(BadRequestError):
+    """Raised when a list is sorted by a field the model does not have."""
+
+    error_code = "invalid_sort_field"
+    message_en = "Invalid sort field"
+    message_fa = "فیلد مرتب‌سازی نامعتبر است"
+
+
+def check_sort_field(model: type[BaseModel], sort_field: str) -> None:
+    """Reject sorting by anything but one of the model's fields."""
+    if sort_field not in model.model_fields:
+        raise InvalidSortFieldError(detail=sort_field)
+
+
+def check_keyset_sort_field(sort_field: str) -> None:
+    """Reject cursor pages in an order no keyset index serves."""
+    if sort_field not in KEYSET_SORT_FIELDS:
+        raise InvalidSortFieldError(
+            detail=f"Cursor pagination sorts by {', '.join(KEYSET_SORT_FIELDS)} only"
+        )
+
+
+def encode_cursor(sort_field: str, sort_direction: int, value: object, uid: str) -> str:
+    """Encode the last (sort value, uid) of a page as an opaque token."""
+    payload = json_util.dumps({
+        "f": sort_field,
+        "d": sort_direction,
+        "v": value,
+        "u": uid,
+    })
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_field: str, sort_direction: int) -> dict:
+    """Decode a token and check it belongs to the requested ordering."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded))
+    except (
+        ValueError,
+        TypeError,
+        KeyError,
+        ArithmeticError,
+        binascii.Error,
+        BSONError,
+    ) as e:
+        # e.g. {"$oid": "zz"} or {"$numberDecimal": "abc"} in a forged cursor
+        raise InvalidCursorError() from e
+    if (
+        not isinstance(payload, dict)
+        or payload.get("f") != sort_field
+        or payload.get("d") != sort_direction
+        or not isinstance(payload.get("u"), str)
+        or not isinstance(payload.get("v"), CURSOR_VALUE_TYPES)
+    ):
+        # Only scalars go into the filter, never operators like {"$ne": ...}.
+        raise InvalidCursorError()
+    return payload
+
+
+def keyset_filter(sort_field: str, sort_direction: int, cursor: str) -> dict:
+    """Build the filter that resumes strictly after the cursor position."""
+    payload = decode_cursor(cursor, sort_field, sort_direction)
+    op = "$lt" if sort_direction < 0 else "$gt"
+    return {
+        "$or": [
+            {sort_field: {op: payload["v"]}},
+            {sort_field: payload["v"], "uid": {op: payload["u"]}},
+        ]
+    }
+
+
+async def list_cursor[T: BaseEntity](
+    model: type[T],
+    query: dict,
+    *,
+    cursor: str | None = None,
+    limit: int = 10,
+    sort_field: str = "created_at",
+    sort_direction: int = -1,
+    with_total: bool = False,
+) -> tuple[list[T], str | None, int | None]:
+    """
+    List one keyset page of ``model`` matching ``query``.
+
+    Pages are ordered by (sort_field, uid), so each page is a bounded index
+    range scan instead of a ``skip()`` over every preceding document.
+    """
+    check_sort_field(model, sort_field)
+    check_keyset_sort_field(sort_field)
+    _, limit = model.adjust_pagination(0, limit)
+    page_query = query
+    if cursor:
+        page_query = {
+            "$and": [query, keyset_filter(sort_field, sort_direction, cursor)]
+        }
+    items_query = (
+        model
+        .find(page_query)
+        .sort([(sort_field, sort_direction), ("uid", sort_direction)])
+        .limit(limit + 1)
+        .to_list()
+    )
+    if with_total:
+        items, total = await asyncio.gather(items_query, model.find(query).count())
+    else:
+        items, total = await items_query, None
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(
+            sort_field, sort_direction, getattr(last, sort_field), last.uid
+        )
+    return items, next_cursor, total
+
+
+async def list_documents(
+    model: type[BaseEntity],
+    query: dict,
+    names: set[str],
+    *,
+    offset: int = 0,
+    cursor: str | None = None,
+    limit: int = 10,
+    sort_field: str = "created_at",
+    sort_direction: int = -1,
+    with_total: bool = False,
+) -> tuple[list[dict], str | None, int | None]:
+    """
+    List one page of raw documents carrying only ``names``.
+
+    Pages like :func:`list_cursor` (or by offset without a cursor), but
+    the projection is applied by Mongo and no model is instantiated.
+    """
+    check_sort_field(model, sort_field)
+    _, limit = model.adjust_pagination(0, limit)
+    page_query = query
+    if cursor:
+        page_query = {
+            "$and": [query, keyset_filter(sort_field, sort_direction, cursor)]
+        }
+    collection = model.get_pymongo_collection()
+    documents_query = (
+        collection
+        .find(page_query, field_projection(names | {sort_field}))
+        .sort([(sort_field, sort_direction), ("uid", sort_direction)])
+        .skip(offset)
+        .limit(limit + 1)
+        .to_list(limit + 1)
+    )
+    if with_total:
+        documents, total = await asyncio.gather(
+            documents_query, collection.count_documents(query)
+        )
+    else:
+        documents, total = await documents_query, None
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        last = documents[-1]
+        next_cursor = encode_cursor(
+            sort_field, sort_direction, last.get(sort_field), last["uid"]
+        )
+    return documents, next_cursor, total
+
+
+async def sparse_page(
+    model: type[BaseEntity],
+    query: dict,
+    schema: type[BaseModel],
+    names: set[str],
+    *,
+    offset: int = 0,
+    limit: int = 10,
+    pagination: PaginationMode = PaginationMode.offset,
+    cursor: str | None = None,
+    sort_field: str = "created_at",
+    sort_direction: int = -1,
+    with_total: bool = False,
+) -> Response:
+    """Answer a list request with only ``names`` of each item."""
+    by_cursor = pagination == PaginationMode.cursor or bool(cursor)
+    if by_cursor:
+        check_keyset_sort_field(sort_field)
+    documents, next_cursor, total = await list_documents(
+        model,
+        query,
+        names,
+        offset=0 if by_cursor else offset,
+        cursor=cursor,
+        limit=limit,
+        sort_field=sort_field,
+        sort_direction=sort_direction,
+        with_total=with_total or not by_cursor,
+    )
+    items = sparse_items(schema, documents)
+    if by_cursor:
+        page = CursorPaginatedResponse[Any](
+            items=items, total=total, limit=limit, next_cursor=next_cursor
+        )
+    else:
+        page = PaginatedResponse[Any](
+            items=items, offset=offset, limit=limit, total=total
+        )
+    return sparse_response(page, names)
+
+
+class CursorPaginationMixin:
+    """Router mixin adding opt-in cursor pagination to USSO list routes."""
+
+    def config_schemas(self, schema: type, **kwargs: object) -> None:
+        """Use a list response schema that can carry a continuation token."""
+        kwargs.setdefault("list_response_schema", CursorPaginatedResponse[Any])
+        super().config_schemas(schema, **kwargs)
+
+    async def list_items(
+        self,
+        request: Request,
+        offset: int = Query(0, ge=0),
+        limit: int = Query(10, ge=1, le=Settings.page_max_limit),
+        created_at_from: datetime | None = None,
+        created_at_to: datetime | None = None,
+        pagination: PaginationMode = PaginationMode.offset,
+        cursor: str | None = None,
+        with_total: bool = False,
+        fields: str | None = Query(None, description="Comma separated fields"),
+    ) -> PaginatedResponse | Response:
+        """List items by offset, or by cursor when requested."""
+        return await self._paginated_list_items(
+            request,
+            offset=offset,
+            limit=limit,
+            pagination=pagination,
+            cursor=cursor,
+            with_total=with_total,
+            fields=fields,
+            created_at_from=created_at_from,
+            created_at_to=created_at_to,
+        )
+
+    async def _paginated_list_items(
+        self,
+        request: Request,
+        *,
+        offset: int = 0,
+        limit: int = 10,
+        pagination: PaginationMode = PaginationMode.offset,
+        cursor: str | None = None,
+        with_total: bool = False,
+        fields: str | None = None,
+        **filters: object,
+    ) -> PaginatedResponse | Response:
+        """Dispatch a filtered list to offset, cursor or sparse pagination."""
+        if names := parse_fields(fields, self.list_item_schema):
+            return await self._sparse_list_items(
+                request,
+                names,
+                offset=offset,
+                limit=limit,
+                pagination=pagination,
+                cursor=cursor,
+                with_total=with_total,
+                **filters,
+            )
+        if pagination == PaginationMode.cursor or cursor:
+            return await self._cursor_list_items(
+                request, cursor=cursor, limit=limit, with_total=with_total, **filters
+            )
+        return await self._list_items(
+            request=request, offset=offset, limit=limit, **filters
+        )
+
+    async def _cursor_list_items(
+        self,
+        request: Request,
+        *,
+        cursor: str | None = None,
+        limit: int = 10,
+        with_total: bool = False,
+        sort_field: str = "created_at",
+        sort_direction: int = -1,
+        user: UserData | None = None,
+        **kwargs: object,
+    ) -> CursorPaginatedResponse:
+        """List items with keyset pagination and the router's scope filters."""
+        user = user or await self.get_user(request)
+        filters = self.get_list_filter_queries(user=user)
+        if filters.get("__deny__"):
+            raise ForbiddenError()
+
+        query = self.model.get_queryset(tenant_id=user.tenant_id, **kwargs | filters)
+        items, next_cursor, total = await list_cursor(
+            self.model,
+            query,
+            cursor=cursor,
+            limit=limit,
+            sort_field=sort_field,
+            sort_direction=sort_direction,
+            with_total=with_total,
+        )
+        return CursorPaginatedResponse(
+            items=[self.list_item_schema.model_validate(item) for item in items],
+            total=total,
+            limit=limit,
+            next_cursor=next_cursor,
+        )
+
+    async def _sparse_list_items(
+        self,
+        request: Request,
+        names: set[str],
+        *,
+        offset: int = 0,
+        limit: int = 10,
+        pagination: PaginationMode = PaginationMode.offset,
+        cursor: str | None = None,
+        with_total: bool = False,
+        **kwargs: object,
+    ) -> Response:
+        """List only the requested fields, projected by Mongo."""
+        user = await self.get_user(request)
+        filters = self.get_list_filter_queries(user=user)
+        if filters.get("__deny__"):
+            raise ForbiddenError()
+
+        query = self.model.get_queryset(tenant_id=user.tenant_id, **kwargs | filters)
+        return await sparse_page(
+            self.model,
+            query,
+            self.list_item_schema,
+            names,
+            offset=offset,
+            limit=limit,
+            pagination=pagination,
+            cursor=cursor,
+            with_total=with_total,
+        )
@@ -0,0 +1,286 @@
+"""Per-tenant admission control: token-bucket rate limits and concurrency caps."""
+
+import json
+import math
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import AsyncGenerator
+from functools import cache
+from typing import Protocol
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from fastapi_mongo_base.errors.handlers import base_http_exception_handler
+from fastapi_mongo_base.errors.status import TooManyRequestsError
+
+from server.config import Settings
+from utils.usso import get_usso
+
+# Refills the bucket at ``rate`` tokens per second up to ``burst`` and
+# takes one token; returns 0 when admitted, else the seconds to wait.
+REFILL_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'stamp')
+local tokens = tonumber(state[1]) or burst
+local stamp = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - stamp) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'stamp', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+# Drops holders older than the TTL, then adds ARGV[2] to the slot set when
+# fewer than ARGV[1] holders remain; returns 1 when the slot was taken.
+ACQUIRE_SCRIPT = """
+local ttl = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - ttl)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now, ARGV[2])
+redis.call('EXPIRE', KEYS[1], math.ceil(ttl))
+return 1
+"""
+
+
+class RateLimitedError(TooManyRequestsError):
+    """Raised when a tenant is over a rate limit or concurrency cap."""
+
+    error_code = "rate_limited"
+    message_en = "Too many requests, try again later"
+    message_fa = "درخواست‌های زیادی ارسال شده است، بعداً دوباره تلاش کنید"
+
+    def __init__(self, retry_after: float, **kwargs: object) -> None:
+        """Carry the whole seconds the client should wait."""
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(retry_after=self.retry_after, **kwargs)
+
+
+def rate_limited_exception_handler(
+    request: Request, exc: RateLimitedError
+) -> JSONResponse:
+    """Render the error like any other and add ``Retry-After``."""
+    response = base_http_exception_handler(request, exc)
+    response.headers["Retry-After"] = str(exc.retry_after)
+    return response
+
+
+class LimiterBackend(Protocol):
+    """Storage of token buckets and in-flight counters."""
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        """Take a token; return 0 when admitted, else the seconds to wait."""
+        ...
+
+    async def acquire(self, key: str, limit: int) -> str | None:
+        """Take one of ``limit`` concurrent slots; return its holder or None."""
+        ...
+
+    async def release(self, key: str, holder: str) -> None:
+        """Give back a slot taken by :meth:`acquire`."""
+        ...
+
+
+class MemoryBackend:
+    """
+    Process-local limiter state.
+
+    Buckets are kept in an LRU of ``rate_limit_max_keys`` entries; an
+    evicted bucket simply starts full again. With several workers each
+    process enforces the limits on its own share of the traffic.
+    """
+
+    def __init__(self) -> None:
+        """Start with no buckets and no requests in flight."""
+        self.buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self.active: dict[str, set[str]] = {}
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        """Take a token; return 0 when admitted, else the seconds to wait."""
+        now = time.monotonic()
+        tokens, stamp = self.buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - stamp) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        self.buckets[key] = (tokens, now)
+        while len(self.buckets) > Settings.rate_limit_max_keys:
+            self.buckets.popitem(last=False)
+        return wait
+
+    async def acquire(self, key: str, limit: int) -> str | None:
+        """Take one of ``limit`` concurrent slots; return its holder or None."""
+        holders = self.active.setdefault(key, set())
+        if len(holders) >= limit:
+            return None
+        holder = uuid.uuid4().hex
+        holders.add(holder)
+        return holder
+
+    async def release(self, key: str, holder: str) -> None:
+        """Give back a slot taken by :meth:`acquire`."""
+        holders = self.active.get(key, set())
+        holders.discard(holder)
+        if not holders:
+            self.active.pop(key, None)
+
+
+class RedisBackend:
+    """
+    Limiter state shared by every worker through ``REDIS_URI``.
+
+    Buckets are refilled atomically by a Lua script using the server clock.
+    Each slot is a holder in a sorted set scored by when it was taken, so
+    a slot held by a crashed worker is dropped after ``rate_limit_slot_ttl``
+    seconds without affecting the others.
+    """
+
+    prefix = "shop:ratelimit"
+
+    @property
+    def client(self) -> object:
+        """Async client initialized by the app factory at startup."""
+        from fastapi_mongo_base.db.redis import get_redis_async_client
+
+        return get_redis_async_client()
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        """Take a token; return 0 when admitted, else the seconds to wait."""
+        wait = await self.client.eval(
+            REFILL_SCRIPT, 1, f"{self.prefix}:bucket:{key}", rate, burst
+        )
+        return float(wait)
+
+    async def acquire(self, key: str, limit: int) -> str | None:
+        """Take one of ``limit`` concurrent slots; return its holder or None."""
+        holder = uuid.uuid4().hex
+        taken = await self.client.eval(
+            ACQUIRE_SCRIPT,
+            1,
+            f"{self.prefix}:slots:{key}",
+            limit,
+            holder,
+            Settings.rate_limit_slot_ttl,
+        )
+        return holder if int(taken) else None
+
+    async def release(self, key: str, holder: str) -> None:
+        """Give back a slot taken by :meth:`acquire`."""
+        await self.client.zrem(f"{self.prefix}:slots:{key}", holder)
+
+
+@cache
+def get_backend() -> LimiterBackend:
+    """Get the backend selected by ``RATE_LIMIT_BACKEND``."""
+    if Settings.rate_limit_backend == "redis":
+        return RedisBackend()
+    return MemoryBackend()
+
+
+def parse_rate(value: str) -> tuple[float, float]:
+    """Parse ``"rate/burst"`` (tokens per second, bucket size)."""
+    rate, _, burst = value.partition("/")
+    return float(rate), float(burst or rate)
+
+
+@cache
+def route_rates() -> dict[str, tuple[float, float]]:
+    """Per-route rates from ``RATE_LIMIT_ROUTES``."""
+    return {
+        route: parse_rate(rate)
+        for route, rate in json.loads(Settings.rate_limit_routes or "{}").items()
+    }
+
+
+@cache
+def route_concurrency() -> dict[str, int]:
+    """Per-route concurrency caps from ``RATE_LIMIT_CONCURRENCY``."""
+    return {
+        route: int(limit)
+        for route, limit in json.loads(Settings.rate_limit_concurrency or "{}").items()
+    }
+
+
+def _route_setting[V](settings: dict[str, V], method: str, route: str) -> V | None:
+    """Look a route up as ``"METHOD /route"`` first, then as ``"/route"``."""
+    return settings.get(f"{method} {route}", settings.get(route))
+
+
+@cache
+def callback_routes() -> set[str]:
+    """Anonymous callback routes from ``RATE_LIMIT_CALLBACK_ROUTES``."""
+    return set(json.loads(Settings.rate_limit_callback_routes or "[]"))
+
+
+async def client_key(request: Request, route: str) -> str:
+    """
+    Key limits on the caller's tenant, or its address when anonymous.
+
+    Anonymous calls to callback routes, such as gateways redirecting to
+    ``/purchases/{uid}/verify``, all arrive from a few gateway or load
+    balancer addresses, so they are keyed on the ``uid`` path parameter.
+    """
+    usso = get_usso(raise_exception=False)
+    if usso.get_request_jwt(request) or usso.get_request_api_key(request):
+        user = await usso.usso_access_security_async(request)
+        if user is not None and user.tenant_id:
+            return f"tenant:{user.tenant_id}"
+    if route in callback_routes() and (uid := request.path_params.get("uid")):
+        return f"uid:{uid}"
+    host = request.client.host if request.client else "unknown"
+    return f"ip:{host}"
+
+
+async def admission(request: Request) -> AsyncGenerator[None]:
+    """
+    Admit a request or reject it with ``429`` and ``Retry-After``.
+
+    Runs before the endpoint. Every tenant has one bucket of
+    ``RATE_LIMIT_RATE`` requests per second (``RATE_LIMIT_BURST`` at
+    once); routes listed in ``RATE_LIMIT_ROUTES`` get an additional bucket
+    each, and routes in ``RATE_LIMIT_CONCURRENCY`` hold a slot while they
+    run. Routes are named by their template under the base path, e.g.
+    ``"POST /products"`` or ``"/purchases/{uid}/verify"``.
+    """
+    backend = get_backend()
+    route = request.scope["route"].path.removeprefix(Settings.base_path)
+    key = await client_key(request, route)
+    method = request.method
+
+    if Settings.rate_limit_rate > 0:
+        wait = await backend.take(
+            key, Settings.rate_limit_rate, Settings.rate_limit_burst
+        )
+        if wait:
+            raise RateLimitedError(wait)
+    if rate := _route_setting(route_rates(), method, route):
+        wait = await backend.take(f"{key}:{method} {route}", *rate)
+        if wait:
+            raise RateLimitedError(wait)
+
+    limit = _route_setting(route_concurrency(), method, route)
+    if not limit:
+        yield
+        return
+    slot = f"{key}:{route}"
+    holder = await backend.acquire(slot, limit)
+    if holder is None:
+        raise RateLimitedError(Settings.rate_limit_busy_retry_after)
+    try:
+        yield
+    finally:
+        await backend.release(slot, holder)
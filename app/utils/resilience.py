@@ -0,0 +1,110 @@
+"""Circuit breaker and retry budget for calls to remote services."""
+
+import random
+import time
+from dataclasses import dataclass, field
+from enum import StrEnum
+
+
+class CircuitState(StrEnum):
+    """Circuit breaker states."""
+
+    closed = "closed"
+    half_open = "half_open"
+    open = "open"
+
+    @property
+    def level(self) -> int:
+        """Numeric value used for metrics."""
+        return list(CircuitState).index(self)
+
+
+@dataclass
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` failures the circuit opens and calls fail
+    fast; once ``reset_timeout`` seconds pass a single probe is let
+    through, closing the circuit on success or re-opening it on failure.
+    """
+
+    name: str
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+    state: CircuitState = CircuitState.closed
+    failures: int = 0
+    opened_at: float = 0.0
+    probing: bool = False
+
+    @property
+    def is_open(self) -> bool:
+        """Whether calls would currently be rejected."""
+        if self.state == CircuitState.open:
+            return time.monotonic() - self.opened_at < self.reset_timeout
+        return self.state == CircuitState.half_open and self.probing
+
+    def allow(self) -> bool:
+        """Reserve a call, moving an expired open circuit to half-open."""
+        if self.state == CircuitState.open:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = CircuitState.half_open
+        if self.state == CircuitState.half_open:
+            if self.probing:
+                return False
+            self.probing = True
+        return True
+
+    def record_success(self) -> None:
+        """Close the circuit."""
+        self.failures = 0
+        self.probing = False
+        if self.state != CircuitState.closed:
+            self.state = CircuitState.closed
+
+    def end_probe(self) -> None:
+        """Free the probe slot if the probe ended without an outcome."""
+        self.probing = False
+
+    def record_failure(self) -> None:
+        """Count a failure, opening the circuit past the threshold."""
+        self.failures += 1
+        self.probing = False
+        if (
+            self.state == CircuitState.half_open
+            or self.failures >= self.failure_threshold
+        ):
+            self.opened_at = time.monotonic()
+            self.state = CircuitState.open
+
+
+@dataclass
+class RetryBudget:
+    """
+    Token bucket that caps retries to a fraction of first attempts.
+
+    Every call deposits ``ratio`` tokens and every retry spends one, so a
+    failing dependency sees at most ``ratio`` extra load instead of a
+    retry storm.
+    """
+
+    ratio: float = 0.2
+    capacity: float = 10.0
+    tokens: float = field(default=10.0)
+
+    def deposit(self) -> None:
+        """Credit a first attempt."""
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Withdraw a retry if the budget allows it."""
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff for the given retry attempt."""
+    return random.uniform(0, min(cap, base * 2**attempt))  # ruff:ignore[suspicious-non-cryptographic-random-usage]
@@ -5,6 +5,7 @@ from decimal import Decimal
 from enum import StrEnum
 from typing import Literal, Self
 
+from fastapi_mongo_base.errors import ServiceUnavailableError
 from fastapi_mongo_base.schemas import TenantUserEntitySchema
 from fastapi_mongo_base.utils.bsontools import decimal_amount
 from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
@@ -84,6 +85,7 @@ class EnrollmentCreateSchema(BaseModel):
     meta_data: dict | None = None
 
     due_date: datetime | None = None
+    idempotency_key: str | None = None
 
     model_config = ConfigDict(allow_inf_nan=True)
 
@@ -160,3 +162,41 @@ class EnrollmentDetailSchema(EnrollmentSchema):
     """Schema for an enrollment with leftover bundles."""
 
     leftover_bundles: list[Bundle]
+
+
+class EnrollmentBatchCreateSchema(BaseModel):
+    """Enrollments created in one request."""
+
+    items: list[EnrollmentCreateSchema]
+
+
+class EnrollmentResultSchema(BaseModel):
+    """Outcome of one enrollment of a batch."""
+
+    idempotency_key: str
+    enrollment: EnrollmentSchema | None = None
+    error: str | None = None
+
+
+class EnrollmentBatchResultSchema(BaseModel):
+    """Per-item outcomes of a batch, in request order."""
+
+    results: list[EnrollmentResultSchema]
+
+    @property
+    def enrollments(self) -> list[EnrollmentSchema]:
+        """Enrollments that were created or already existed."""
+        return [result.enrollment for result in self.results if result.enrollment]
+
+    @property
+    def failed(self) -> list[EnrollmentResultSchema]:
+        """Results of the items that were not enrolled."""
+        return [result for result in self.results if result.enrollment is None]
+
+
+class EnrollmentFailedError(ServiceUnavailableError):
+    """Raised when some enrollments of a batch were not created."""
+
+    error_code = "enrollment_failed"
+    message_en = "Enrollment could not be created"
+    message_fa = "ایجاد اشتراک ممکن نشد"
@@ -0,0 +1,47 @@
+"""Compact JSON encoding with an optional orjson fast path."""
+
+import json
+from collections.abc import Callable
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+
+from bson import Decimal128, ObjectId
+
+try:
+    import orjson
+
+    # Datetimes go through ``default`` as with json, and keys are coerced alike.
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def json_default(value: object) -> object:
+    """Encode the BSON and stdlib types Mongo documents carry."""
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    if isinstance(value, Decimal | ObjectId | UUID):
+        return str(value)
+    if isinstance(value, datetime | date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: object, default: Callable[[object], object] = json_default) -> bytes:
+    """
+    Encode a value as compact UTF-8 JSON.
+
+    Both backends write the same separators, keep non-ASCII text, coerce
+    int, float, bool and None keys to strings and hand datetimes to
+    ``default``. What orjson rejects, such as integers beyond 64 bits, is
+    encoded by json instead.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(
+        value, default=default, ensure_ascii=False, separators=(",", ":")
+    ).encode()
@@ -0,0 +1,233 @@
+"""Optional OpenTelemetry tracing of the checkout saga."""
+
+import functools
+import logging
+from collections.abc import Awaitable, Callable, Generator, Mapping
+from contextlib import contextmanager
+from pathlib import Path
+
+import httpx
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from server.config import Settings
+from utils.metrics import MetricsMiddleware
+from utils.transports import WrappedTransport, wrap_transports
+
+try:
+    from opentelemetry import context, propagate, trace
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+
+    tracer = trace.get_tracer("shop")
+except ImportError:  # pragma: no cover - opentelemetry is optional
+    tracer = None
+
+type AttributeValue = str | int | float | bool
+
+
+def setup_tracing() -> None:
+    """
+    Install the span exporter selected by ``TRACING_EXPORTER``.
+
+    ``file`` appends one JSON span per line to ``TRACING_FILE`` and
+    ``otlp`` ships spans to the collector named by the standard
+    ``OTEL_EXPORTER_OTLP_*`` variables. Without an exporter (or without
+    the SDK) spans are no-ops, though trace context still propagates.
+    """
+    if tracer is None or not Settings.tracing_exporter:
+        return
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import (
+            BatchSpanProcessor,
+            ConsoleSpanExporter,
+        )
+        from opentelemetry.sdk.trace.sampling import ParentBasedTraceIdRatio
+
+        if Settings.tracing_exporter == "otlp":
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+                OTLPSpanExporter,
+            )
+
+            exporter = OTLPSpanExporter()
+        else:
+            path = Settings.base_dir / Path(Settings.tracing_file)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            exporter = ConsoleSpanExporter(
+                out=path.open("a", encoding="utf-8"),
+                formatter=lambda span: span.to_json(indent=None) + "\n",
+            )
+    except ImportError:
+        logging.warning(
+            "TRACING_EXPORTER=%s needs the tracing extra", Settings.tracing_exporter
+        )
+        return
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": Settings.project_name}),
+        sampler=ParentBasedTraceIdRatio(Settings.tracing_sample_rate),
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+
+@contextmanager
+def span(name: str, **attributes: AttributeValue | None) -> Generator[None]:
+    """Run the block in a child span tagged with the given attributes."""
+    if tracer is None:
+        yield
+        return
+    with tracer.start_as_current_span(name):
+        annotate(**attributes)
+        yield
+
+
+def traced[**P, R](
+    name: str,
+) -> Callable[[Callable[P, Awaitable[R]]], Callable[P, Awaitable[R]]]:
+    """Run every call of a coroutine function in its own span."""
+
+    def decorator(func: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+        @functools.wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            with span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def annotate(**attributes: AttributeValue | None) -> None:
+    """
+    Tag the current span, e.g. ``annotate(basket_uid=basket.uid)``.
+
+    Attributes are prefixed with ``shop.`` and ``None`` values skipped, so
+    every hop of one purchase can be found by its basket or purchase uid.
+    """
+    if tracer is None:
+        return
+    current = trace.get_current_span()
+    for key, value in attributes.items():
+        if value is not None:
+            current.set_attribute(f"shop.{key}", value)
+
+
+def current_context() -> dict[str, str]:
+    """Serialize the active trace context, e.g. to store with a message."""
+    carrier: dict[str, str] = {}
+    if tracer is not None:
+        propagate.inject(carrier)
+    return carrier
+
+
+@contextmanager
+def continued(carrier: Mapping[str, str]) -> Generator[None]:
+    """Make a context stored by :func:`current_context` the active one."""
+    if tracer is None or not carrier:
+        yield
+        return
+    token = context.attach(propagate.extract(carrier))
+    try:
+        yield
+    finally:
+        context.detach(token)
+
+
+class _TracedTransport(WrappedTransport):
+    """Transport sending every request in its own client span."""
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        target: str | Callable[[httpx.URL], str],
+    ) -> None:
+        super().__init__(transport)
+        self.target = target
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Propagate the span's context and end it however the request ends."""
+        name = self.target(request.url) if callable(self.target) else self.target
+        request_span = tracer.start_span(
+            f"{request.method} {name}",
+            kind=SpanKind.CLIENT,
+            attributes={
+                "http.request.method": request.method,
+                "server.address": request.url.host,
+                "url.path": request.url.path,
+                "peer.service": name,
+            },
+        )
+        propagate.inject(
+            request.headers, context=trace.set_span_in_context(request_span)
+        )
+        try:
+            response = await self.transport.handle_async_request(request)
+            request_span.set_attribute(
+                "http.response.status_code", response.status_code
+            )
+            if response.status_code >= 500:
+                request_span.set_status(Status(StatusCode.ERROR))
+        except BaseException as e:
+            request_span.record_exception(e)
+            request_span.set_status(Status(StatusCode.ERROR, type(e).__name__))
+            raise
+        finally:
+            request_span.end()
+        return response
+
+
+def trace_client[C: httpx.AsyncClient](
+    client: C, target: str | Callable[[httpx.URL], str]
+) -> C:
+    """Wrap a client's requests in client spans and propagate their context."""
+    if tracer is None:
+        return client
+    return wrap_transports(
+        client, lambda transport: _TracedTransport(transport, target)
+    )
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a server span per request."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Wrap the application."""
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Continue the caller's trace and name the span after the route."""
+        if (
+            tracer is None
+            or scope["type"] != "http"
+            or scope["path"] in MetricsMiddleware.excluded_paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        carrier = {
+            key.decode("latin-1"): value.decode("latin-1")
+            for key, value in scope["headers"]
+        }
+        with tracer.start_as_current_span(
+            scope["method"],
+            context=propagate.extract(carrier),
+            kind=SpanKind.SERVER,
+            attributes={"http.request.method": scope["method"]},
+        ) as request_span:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    request_span.set_attribute(
+                        "http.response.status_code", message["status"]
+                    )
+                    if message["status"] >= 500:
+                        request_span.set_status(Status(StatusCode.ERROR))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                if route := getattr(scope.get("route"), "path", None):
+                    request_span.set_attribute("http.route", route)
+                    request_span.update_name(f"{scope['method']} {route}")
@@ -0,0 +1,55 @@
+"""Wrappers around the transports of an httpx client."""
+
+from collections.abc import Callable
+from types import TracebackType
+from typing import Self
+
+import httpx
+
+
+class WrappedTransport(httpx.AsyncBaseTransport):
+    """
+    Transport delegating to another one.
+
+    Subclasses override ``handle_async_request``; unlike event hooks it
+    also sees requests that end in a timeout or connection error.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport) -> None:
+        """Wrap the given transport."""
+        self.transport = transport
+
+    async def __aenter__(self) -> Self:
+        """Open the wrapped transport."""
+        await self.transport.__aenter__()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None = None,
+        exc_value: BaseException | None = None,
+        traceback: TracebackType | None = None,
+    ) -> None:
+        """Close the wrapped transport."""
+        await self.transport.__aexit__(exc_type, exc_value, traceback)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send the request through the wrapped transport."""
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        """Close the wrapped transport."""
+        await self.transport.aclose()
+
+
+def wrap_transports[C: httpx.AsyncClient](
+    client: C, wrapper: Callable[[httpx.AsyncBaseTransport], WrappedTransport]
+) -> C:
+    """Wrap the default and every mounted (e.g. proxy) transport of a client."""
+    # httpx has no public way to swap the transports of a built client.
+    client._transport = wrapper(client._transport)
+    client._mounts = {
+        pattern: None if transport is None else wrapper(transport)
+        for pattern, transport in client._mounts.items()
+    }
+    return client
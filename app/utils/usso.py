@@ -1,16 +1,108 @@
 """USSO authentication helper."""
 
+import hashlib
 import os
+import time
+from collections import OrderedDict
+from functools import cache
 
-from usso import APIHeaderConfig, AuthConfig
+from fastapi import Request
+from fastapi_mongo_base.errors import UnauthorizedError
+from fastapi_mongo_base.i18n.timezone import apply_user_timezone
+from usso import APIHeaderConfig, AuthConfig, UserData
 from usso.integrations.fastapi import USSOAuthentication
 
+from server.config import Settings
 
-def get_usso(raise_exception: bool = False) -> USSOAuthentication:
-    """Get a configured USSOAuthentication instance."""
+
+def _credential_key(kind: str, credential: str) -> str:
+    digest = hashlib.blake2b(credential.encode(), digest_size=16).hexdigest()
+    return f"{kind}:{digest}"
+
+
+class CachedUSSOAuthentication(USSOAuthentication):
+    """
+    USSO authentication that remembers verified credentials.
+
+    Claims of verified JWTs are kept in an LRU keyed by the token hash
+    until the token expires, and API-key lookups for
+    ``usso_api_key_cache_ttl`` seconds. Signing keys are cached per ``kid``
+    by usso itself, so a rotated key is fetched the first time it is seen.
+    """
+
+    def __init__(self, **kwargs: object) -> None:
+        """Start with an empty credential cache."""
+        super().__init__(**kwargs)
+        self._verified: OrderedDict[str, tuple[UserData, float]] = OrderedDict()
+
+    def _recall(self, key: str) -> UserData | None:
+        user, expires_at = self._verified.get(key, (None, 0.0))
+        if user is None:
+            return None
+        if expires_at <= time.time():
+            del self._verified[key]
+            return None
+        self._verified.move_to_end(key)
+        return user
+
+    def _remember(self, key: str, user: UserData, expires_at: float) -> UserData:
+        self._verified[key] = (user, expires_at)
+        self._verified.move_to_end(key)
+        while len(self._verified) > Settings.usso_claims_cache_size:
+            self._verified.popitem(last=False)
+        return user
+
+    def user_data_from_token(
+        self,
+        token: str,
+        *,
+        expected_token_type: str | None = "access",  # ruff:ignore[hardcoded-password-default]
+        raise_exception: bool = True,
+        **kwargs: object,
+    ) -> UserData | None:
+        """Get user data from a JWT, verifying each token once until it expires."""
+        key = _credential_key(f"jwt:{expected_token_type}", token)
+        if user := self._recall(key):
+            return user
+        user = super().user_data_from_token(
+            token,
+            expected_token_type=expected_token_type,
+            raise_exception=raise_exception,
+            **kwargs,
+        )
+        if user is not None and user.exp:
+            self._remember(key, user, user.exp)
+        return user
+
+    def user_data_from_api_key(self, api_key: str) -> UserData:
+        """Get user data from an API key, reusing recent verifications."""
+        key = _credential_key("api_key", api_key)
+        if user := self._recall(key):
+            return user
+        return self._remember(
+            key,
+            super().user_data_from_api_key(api_key),
+            time.time() + Settings.usso_api_key_cache_ttl,
+        )
+
+    async def user_data_from_api_key_async(self, api_key: str) -> UserData:
+        """Get user data from an API key, reusing recent verifications."""
+        key = _credential_key("api_key", api_key)
+        if user := self._recall(key):
+            return user
+        return self._remember(
+            key,
+            await super().user_data_from_api_key_async(api_key),
+            time.time() + Settings.usso_api_key_cache_ttl,
+        )
+
+
+@cache
+def get_usso(raise_exception: bool = False) -> CachedUSSOAuthentication:
+    """Get the process-wide USSOAuthentication instance."""
     usso_base_url = os.getenv("USSO_BASE_URL") or "https://usso.uln.me"
 
-    usso = USSOAuthentication(
+    usso = CachedUSSOAuthentication(
         jwt_config=AuthConfig(
             jwks_url=(f"{usso_base_url}/.well-known/jwks.json"),
             api_key_header=APIHeaderConfig(
@@ -22,3 +114,15 @@ def get_usso(raise_exception: bool = False) -> USSOAuthentication:
         raise_exception=raise_exception,
     )
     return usso
+
+
+class USSOUserMixin:
+    """Resolve route users through the shared authenticator."""
+
+    async def get_user(self, request: Request, **kwargs: object) -> UserData:
+        """Get the authenticated user without blocking on API-key lookups."""
+        user = await get_usso(raise_exception=True).usso_access_security_async(request)
+        if user is None:
+            raise UnauthorizedError()
+        apply_user_timezone(request, user)
+        return user
@@ -1,28 +1,73 @@
 """Wallet utilities."""
 
+import asyncio
+from collections import OrderedDict
+
 from ufaas.services import AccountingClient
 from ufaas.wallet import WalletDetailSchema
 
+from server.config import Settings
+
+type WalletKey = tuple[str, str]
+
+# Default wallet id per (tenant, owner); default wallets are never replaced.
+_default_wallets: OrderedDict[WalletKey, str] = OrderedDict()
+_wallet_locks: dict[WalletKey, asyncio.Lock] = {}
+
+
+def _remember_default(key: WalletKey, wallet_id: str) -> str:
+    _default_wallets[key] = wallet_id
+    _default_wallets.move_to_end(key)
+    while len(_default_wallets) > Settings.wallet_cache_size:
+        _default_wallets.popitem(last=False)
+    return wallet_id
+
 
 async def get_wallets(
     client: AccountingClient, owner_id: str
 ) -> list[WalletDetailSchema]:
-    """Get all wallets for an owner (workspace)."""
-    return await client.get_wallets(owner_id=owner_id)
+    """Get all wallets for an owner (workspace), remembering the default."""
+    wallets = await client.get_wallets(workspace_id=owner_id)
+    for wallet in wallets:
+        if wallet.is_default:
+            _remember_default((client.tenant_id, owner_id), wallet.uid)
+    return wallets
 
 
 async def get_or_create_owner_wallet(
     client: AccountingClient, owner_id: str
 ) -> WalletDetailSchema:
     """Get the default wallet for an owner (workspace) or create one."""
-    wallets = await client.get_wallets(owner_id=owner_id)
+    wallets = await get_wallets(client, owner_id)
     for wallet in wallets:
         if wallet.is_default:
             return wallet
 
+    await client.get_token("create:finance/accounting/wallet")
     response = await client.post(
         url="/wallets",
         json={"owner_id": owner_id},
     )
     response.raise_for_status()
-    return WalletDetailSchema.model_validate(response.json())
+    return WalletDetailSchema.model_validate_json(response.content)
+
+
+async def get_default_wallet_id(client: AccountingClient, owner_id: str) -> str:
+    """
+    Get the id of an owner's default wallet, creating it if needed.
+
+    Resolved ids are cached per tenant and owner, and lookups that miss
+    are serialized per owner so concurrent checkouts create one wallet.
+    """
+    key = (client.tenant_id, owner_id)
+    if wallet_id := _default_wallets.get(key):
+        return wallet_id
+
+    try:
+        async with _wallet_locks.setdefault(key, asyncio.Lock()):
+            if wallet_id := _default_wallets.get(key):
+                return wallet_id
+            wallet = await get_or_create_owner_wallet(client, owner_id)
+            return _remember_default(key, wallet.uid)
+    finally:
+        _wallet_locks.pop(key, None)